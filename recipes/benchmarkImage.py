@@ -0,0 +1,960 @@
+import argparse
+import array
+import hashlib
+import json
+import math
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+import zipfile
+
+
+OPENRECON_PORT = 9002
+DEFAULT_COLD_START_SAMPLES = 5
+DEFAULT_COLD_START_TIMEOUT_SECONDS = 300
+# The budget is checked against this percentile of the handshake samples.
+COLD_START_BUDGET_PERCENTILE = 'p90'
+CONNECT_RETRY_SECONDS = 0.05
+# A connection the server keeps open this long counts as accepted. Docker's
+# userland proxy accepts on the published port before anything listens in the
+# container, and then closes the connection straight away.
+ACCEPT_HOLD_SECONDS = 0.2
+CONTAINER_STATE_POLL_SECONDS = 1
+# Starts without bytecode use a copy of the image whose baked server and config
+# module __pycache__ directories are removed and which writes no bytecode, like
+# a read-only rootfs built without the bake. Stdlib and site-packages bytecode
+# is kept, so the difference is what the bake adds.
+NO_BYTECODE_IMAGE_REPOSITORY = 'openrecon-benchmark-no-bytecode'
+
+DEFAULT_THROUGHPUT_SAMPLES = 3
+DEFAULT_THROUGHPUT_WARMUP = 1
+DEFAULT_SESSION_TIMEOUT_SECONDS = 600
+DEFAULT_SYNTHETIC_MATRIX = 256
+DEFAULT_SYNTHETIC_SLICES = 32
+DEFAULT_SYNTHETIC_CHANNELS = 8
+EMITTER_TYPES = ('raw', 'image')
+# Declared resources this many times above or below the measured ones are
+# reported; a CPU count whose wall time is within the tolerance of the best
+# one counts as enough.
+RESOURCE_FAR_OFF_FACTOR = 2
+CPU_SCALING_TOLERANCE = 0.1
+# Memory caps below this are not worth starting a Python server under.
+MIN_MEMORY_CAP_MB = 256
+PEAK_MEMORY_SCRIPT = (
+    'cat /sys/fs/cgroup/memory.peak 2>/dev/null'
+    ' || cat /sys/fs/cgroup/memory/memory.max_usage_in_bytes 2>/dev/null'
+)
+
+# MRD streaming protocol message IDs (uint16, little endian).
+MRD_MESSAGE_CONFIG_FILE = 1
+MRD_MESSAGE_CONFIG_TEXT = 2
+MRD_MESSAGE_METADATA_XML_TEXT = 3
+MRD_MESSAGE_CLOSE = 4
+MRD_MESSAGE_TEXT = 5
+MRD_MESSAGE_ISMRMRD_ACQUISITION = 1008
+MRD_MESSAGE_ISMRMRD_IMAGE = 1022
+MRD_CONFIG_FILE_BYTES = 1024
+MRD_MESSAGE_ID_STRUCT = struct.Struct('<H')
+MRD_LENGTH_STRUCT = struct.Struct('<I')
+MRD_ATTRIBUTE_LENGTH_STRUCT = struct.Struct('<Q')
+# ISMRMRD v1 AcquisitionHeader and ImageHeader, packed little endian.
+MRD_ACQUISITION_HEADER_STRUCT = struct.Struct('<HQIII3IHHH16QHHHHHf3f3f3f3f3f17H8i8f')
+MRD_IMAGE_HEADER_STRUCT = struct.Struct('<HHQI3H3fH3f3f3f3f3f6HI3IHHH8i8fI')
+MRD_IMAGE_DATA_TYPE_BYTES = {1: 2, 2: 2, 3: 4, 4: 4, 5: 4, 6: 8, 7: 8, 8: 16}
+MRD_IMAGE_DATA_TYPE_USHORT = 1
+MRD_IMAGE_TYPE_MAGNITUDE = 1
+MRD_ACQ_FIRST_IN_SLICE = 1 << 6
+MRD_ACQ_LAST_IN_SLICE = 1 << 7
+MRD_ACQ_LAST_IN_MEASUREMENT = 1 << 24
+SYNTHETIC_FIELD_OF_VIEW_MM = (256.0, 256.0, 5.0)
+SYNTHETIC_IMAGE_META_XML = (
+    '<?xml version="1.0"?><ismrmrdMeta>'
+    '<meta><name>DataRole</name><value>Image</value></meta>'
+    '<meta><name>ImageRowDir</name><value>1</value><value>0</value><value>0</value></meta>'
+    '<meta><name>ImageColumnDir</name><value>0</value><value>1</value><value>0</value></meta>'
+    '<meta><name>SequenceDescription</name><value>openrecon_benchmark</value></meta>'
+    '</ismrmrdMeta>'
+)
+MINIMAL_METADATA_XML = '<?xml version="1.0" encoding="UTF-8"?>\n<ismrmrdHeader xmlns="http://www.ismrm.org/ISMRMRD"/>\n'
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of values."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[max(1, math.ceil(len(ordered) * fraction)) - 1]
+
+
+def summarize_samples(values):
+    return {
+        'values': [round(value, 3) for value in values],
+        'p50': round(percentile(values, 0.5), 3),
+        'p90': round(percentile(values, 0.9), 3),
+        'max': round(max(values), 3),
+    }
+
+
+def create_handshake_messages(config_name, metadata_xml=MINIMAL_METADATA_XML):
+    """Encode the config, metadata and close messages a scanner opens a session with."""
+    config_bytes = config_name.encode('utf-8')
+    if len(config_bytes) >= MRD_CONFIG_FILE_BYTES:
+        raise ValueError(f'Config name must be shorter than {MRD_CONFIG_FILE_BYTES} bytes: {config_name!r}')
+    metadata_bytes = metadata_xml.encode('utf-8')
+    return b''.join([
+        MRD_MESSAGE_ID_STRUCT.pack(MRD_MESSAGE_CONFIG_FILE),
+        config_bytes.ljust(MRD_CONFIG_FILE_BYTES, b'\0'),
+        MRD_MESSAGE_ID_STRUCT.pack(MRD_MESSAGE_METADATA_XML_TEXT),
+        MRD_LENGTH_STRUCT.pack(len(metadata_bytes)),
+        metadata_bytes,
+        MRD_MESSAGE_ID_STRUCT.pack(MRD_MESSAGE_CLOSE),
+    ])
+
+
+def create_config_text_message(config_name, parameters=None):
+    """Encode the JSON config OpenRecon sends with the selected parameter values."""
+    text = json.dumps({'parameters': {**(parameters or {}), 'config': config_name}}).encode('utf-8')
+    return MRD_MESSAGE_ID_STRUCT.pack(MRD_MESSAGE_CONFIG_TEXT) + MRD_LENGTH_STRUCT.pack(len(text)) + text
+
+
+def create_synthetic_metadata_xml(matrix, lines, slices, channels):
+    return textwrap.dedent(
+        f'''\
+        <?xml version="1.0" encoding="UTF-8"?>
+        <ismrmrdHeader xmlns="http://www.ismrm.org/ISMRMRD">
+          <measurementInformation>
+            <measurementID>openrecon_benchmark</measurementID>
+            <patientPosition>HFS</patientPosition>
+            <protocolName>openrecon_benchmark</protocolName>
+          </measurementInformation>
+          <acquisitionSystemInformation>
+            <systemFieldStrength_T>3.0</systemFieldStrength_T>
+            <receiverChannels>{channels}</receiverChannels>
+          </acquisitionSystemInformation>
+          <experimentalConditions>
+            <H1resonanceFrequency_Hz>123200000</H1resonanceFrequency_Hz>
+          </experimentalConditions>
+          <encoding>
+            <encodedSpace>
+              <matrixSize><x>{matrix}</x><y>{lines}</y><z>1</z></matrixSize>
+              <fieldOfView_mm><x>{SYNTHETIC_FIELD_OF_VIEW_MM[0]}</x><y>{SYNTHETIC_FIELD_OF_VIEW_MM[1]}</y><z>{SYNTHETIC_FIELD_OF_VIEW_MM[2]}</z></fieldOfView_mm>
+            </encodedSpace>
+            <reconSpace>
+              <matrixSize><x>{matrix}</x><y>{lines}</y><z>1</z></matrixSize>
+              <fieldOfView_mm><x>{SYNTHETIC_FIELD_OF_VIEW_MM[0]}</x><y>{SYNTHETIC_FIELD_OF_VIEW_MM[1]}</y><z>{SYNTHETIC_FIELD_OF_VIEW_MM[2]}</z></fieldOfView_mm>
+            </reconSpace>
+            <encodingLimits>
+              <kspace_encoding_step_1><minimum>0</minimum><maximum>{lines - 1}</maximum><center>{lines // 2}</center></kspace_encoding_step_1>
+              <slice><minimum>0</minimum><maximum>{slices - 1}</maximum><center>0</center></slice>
+            </encodingLimits>
+            <trajectory>cartesian</trajectory>
+          </encoding>
+        </ismrmrdHeader>
+        '''
+    )
+
+
+def create_synthetic_acquisitions(matrix, slices, channels):
+    """Encode Cartesian k-space lines of a centred blob, one slice after another."""
+    channel_mask = [0] * 16
+    for channel in range(channels):
+        channel_mask[channel // 64] |= 1 << (channel % 64)
+    line_data = []
+    for line in range(matrix):
+        ky = line - matrix // 2
+        samples = array.array('f')
+        for kx in range(-(matrix // 2), matrix - matrix // 2):
+            samples.extend((1.0 / (1.0 + kx * kx + ky * ky), 0.0))
+        if sys.byteorder != 'little':
+            samples.byteswap()
+        line_data.append(samples.tobytes() * channels)
+
+    messages = []
+    for slice_index in range(slices):
+        for line in range(matrix):
+            flags = MRD_ACQ_FIRST_IN_SLICE if line == 0 else 0
+            if line == matrix - 1:
+                flags |= MRD_ACQ_LAST_IN_SLICE
+                if slice_index == slices - 1:
+                    flags |= MRD_ACQ_LAST_IN_MEASUREMENT
+            scan_counter = slice_index * matrix + line
+            header = MRD_ACQUISITION_HEADER_STRUCT.pack(
+                1, flags, 0, scan_counter, scan_counter, 0, 0, 0,
+                matrix, channels, channels, *channel_mask,
+                0, 0, matrix // 2, 0, 0, 2.0,
+                0.0, 0.0, slice_index * SYNTHETIC_FIELD_OF_VIEW_MM[2],
+                1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0,
+                line, 0, 0, slice_index, 0, 0, 0, 0, 0, *([0] * 8),
+                *([0] * 8), *([0.0] * 8),
+            )
+            messages.append(MRD_MESSAGE_ID_STRUCT.pack(MRD_MESSAGE_ISMRMRD_ACQUISITION) + header + line_data[line])
+    return messages
+
+
+def create_synthetic_images(matrix, slices):
+    """Encode unsigned 16-bit magnitude slices of a disc phantom."""
+    pixels = array.array('H')
+    radius_squared = (matrix / 3) ** 2
+    for y in range(matrix):
+        for x in range(matrix):
+            inside = (x - matrix / 2) ** 2 + (y - matrix / 2) ** 2 <= radius_squared
+            pixels.append(1000 + x if inside else x // 4)
+    if sys.byteorder != 'little':
+        pixels.byteswap()
+    data = pixels.tobytes()
+    attributes = SYNTHETIC_IMAGE_META_XML.encode('utf-8')
+    messages = []
+    for slice_index in range(slices):
+        header = MRD_IMAGE_HEADER_STRUCT.pack(
+            1, MRD_IMAGE_DATA_TYPE_USHORT, 0, 0, matrix, matrix, 1, *SYNTHETIC_FIELD_OF_VIEW_MM, 1,
+            0.0, 0.0, slice_index * SYNTHETIC_FIELD_OF_VIEW_MM[2],
+            1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0,
+            0, slice_index, 0, 0, 0, 0, slice_index, 0, 0, 0,
+            MRD_IMAGE_TYPE_MAGNITUDE, slice_index + 1, 1, *([0] * 8), *([0.0] * 8), len(attributes),
+        )
+        messages.append(
+            MRD_MESSAGE_ID_STRUCT.pack(MRD_MESSAGE_ISMRMRD_IMAGE) + header
+            + MRD_ATTRIBUTE_LENGTH_STRUCT.pack(len(attributes)) + attributes + data
+        )
+    return messages
+
+
+def create_synthetic_inputs(emitter, matrix=DEFAULT_SYNTHETIC_MATRIX, slices=DEFAULT_SYNTHETIC_SLICES, channels=DEFAULT_SYNTHETIC_CHANNELS):
+    """Return (metadata XML, encoded input messages) for a label emitter type."""
+    if emitter not in EMITTER_TYPES:
+        raise ValueError(f'Emitter must be one of {sorted(EMITTER_TYPES)}, got: {emitter}')
+    if emitter == 'raw':
+        return create_synthetic_metadata_xml(matrix, matrix, slices, channels), create_synthetic_acquisitions(matrix, slices, channels)
+    return create_synthetic_metadata_xml(matrix, matrix, slices, 1), create_synthetic_images(matrix, slices)
+
+
+def read_exactly(reader, size):
+    data = reader.read(size)
+    if len(data) != size:
+        raise EOFError('the OpenRecon server closed the connection mid-message')
+    return data
+
+
+def read_mrd_message(reader):
+    """Read one server message; return its ID, or None at the end of the stream."""
+    message_id_bytes = reader.read(MRD_MESSAGE_ID_STRUCT.size)
+    if not message_id_bytes:
+        return None
+    if len(message_id_bytes) != MRD_MESSAGE_ID_STRUCT.size:
+        raise EOFError('the OpenRecon server closed the connection mid-message')
+    message_id = MRD_MESSAGE_ID_STRUCT.unpack(message_id_bytes)[0]
+    if message_id == MRD_MESSAGE_ISMRMRD_IMAGE:
+        header = MRD_IMAGE_HEADER_STRUCT.unpack(read_exactly(reader, MRD_IMAGE_HEADER_STRUCT.size))
+        data_type, matrix_size, channels = header[1], header[4:7], header[10]
+        attribute_length = MRD_ATTRIBUTE_LENGTH_STRUCT.unpack(read_exactly(reader, MRD_ATTRIBUTE_LENGTH_STRUCT.size))[0]
+        read_exactly(reader, attribute_length)
+        read_exactly(reader, matrix_size[0] * matrix_size[1] * matrix_size[2] * channels * MRD_IMAGE_DATA_TYPE_BYTES[data_type])
+    elif message_id == MRD_MESSAGE_ISMRMRD_ACQUISITION:
+        header = MRD_ACQUISITION_HEADER_STRUCT.unpack(read_exactly(reader, MRD_ACQUISITION_HEADER_STRUCT.size))
+        samples, active_channels, trajectory_dimensions = header[8], header[10], header[31]
+        read_exactly(reader, samples * (trajectory_dimensions + active_channels * 2) * 4)
+    elif message_id in (MRD_MESSAGE_TEXT, MRD_MESSAGE_CONFIG_TEXT, MRD_MESSAGE_METADATA_XML_TEXT):
+        read_exactly(reader, MRD_LENGTH_STRUCT.unpack(read_exactly(reader, MRD_LENGTH_STRUCT.size))[0])
+    elif message_id != MRD_MESSAGE_CLOSE:
+        raise ValueError(f'Unsupported MRD message ID {message_id} from the OpenRecon server')
+    return message_id
+
+
+def run_throughput_session(host, port, config_name, metadata_xml, inputs, parameters=None, timeout=DEFAULT_SESSION_TIMEOUT_SECONDS):
+    """Stream inputs through one session while collecting the returned images."""
+    send_times = {}
+    send_errors = []
+
+    with socket.create_connection((host, port), timeout=timeout) as connection:
+        def send_inputs():
+            try:
+                send_times['start'] = time.monotonic()
+                connection.sendall(create_config_text_message(config_name, parameters))
+                metadata_bytes = metadata_xml.encode('utf-8')
+                connection.sendall(
+                    MRD_MESSAGE_ID_STRUCT.pack(MRD_MESSAGE_METADATA_XML_TEXT)
+                    + MRD_LENGTH_STRUCT.pack(len(metadata_bytes)) + metadata_bytes
+                )
+                for message in inputs:
+                    connection.sendall(message)
+                send_times['last_input'] = time.monotonic()
+                connection.sendall(MRD_MESSAGE_ID_STRUCT.pack(MRD_MESSAGE_CLOSE))
+            except OSError as exc:
+                send_errors.append(exc)
+
+        sender = threading.Thread(target=send_inputs, daemon=True)
+        sender.start()
+        images = 0
+        last_image = None
+        with connection.makefile('rb') as reader:
+            while True:
+                message_id = read_mrd_message(reader)
+                if message_id is None or message_id == MRD_MESSAGE_CLOSE:
+                    break
+                if message_id == MRD_MESSAGE_ISMRMRD_IMAGE:
+                    images += 1
+                    last_image = time.monotonic()
+        ended = time.monotonic()
+        sender.join(timeout)
+    if send_errors or 'last_input' not in send_times:
+        raise RuntimeError(f'the OpenRecon server stopped reading inputs: {send_errors[0] if send_errors else "timed out"}')
+
+    input_seconds = max(send_times['last_input'] - send_times['start'], 1e-6)
+    result = {
+        'inputs': len(inputs),
+        'images': images,
+        'inputs_per_second': len(inputs) / input_seconds,
+        'session_seconds': ended - send_times['start'],
+    }
+    if last_image is not None:
+        result['images_per_second'] = images / max(last_image - send_times['start'], 1e-6)
+        result['latency_seconds'] = max(last_image - send_times['last_input'], 0.0)
+    return result
+
+
+def try_accept(host, port):
+    """Return True when the server accepts a connection and keeps it open."""
+    try:
+        with socket.create_connection((host, port), timeout=ACCEPT_HOLD_SECONDS) as connection:
+            try:
+                return connection.recv(1) != b''
+            except socket.timeout:
+                return True
+    except OSError:
+        return False
+
+
+def run_handshake(host, port, config_name, timeout):
+    """Open one session and wait until the server answers or ends it."""
+    with socket.create_connection((host, port), timeout=timeout) as connection:
+        connection.sendall(create_handshake_messages(config_name))
+        connection.recv(MRD_MESSAGE_ID_STRUCT.size)
+
+
+def wait_until(condition, deadline, is_running=None):
+    while True:
+        if condition():
+            return
+        if time.monotonic() > deadline:
+            raise TimeoutError('timed out waiting for the OpenRecon server')
+        if is_running is not None and not is_running():
+            raise RuntimeError('container exited before the OpenRecon server accepted a connection')
+        time.sleep(CONNECT_RETRY_SECONDS)
+
+
+def get_published_port(container_id, port=OPENRECON_PORT):
+    output = subprocess.check_output(['docker', 'port', container_id, f'{port}/tcp'], text=True)
+    host, _, host_port = output.splitlines()[0].strip().rpartition(':')
+    return host.strip('[]'), int(host_port)
+
+
+def create_container_state_check(container_id):
+    last_checked = [0.0]
+
+    def is_running():
+        now = time.monotonic()
+        if now - last_checked[0] < CONTAINER_STATE_POLL_SECONDS:
+            return True
+        last_checked[0] = now
+        result = subprocess.run(
+            ['docker', 'inspect', '--format', '{{.State.Running}}', container_id],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        return result.stdout.strip() == 'true'
+
+    return is_running
+
+
+def start_openrecon_container(image, platform='linux/amd64', cpus=None, memory_mb=None):
+    """Start image detached with port 9002 published on localhost."""
+    run_args = []
+    if cpus is not None:
+        run_args.extend(['--cpus', str(cpus)])
+    if memory_mb is not None:
+        # Without swap, exceeding the cap is an OOM kill rather than a slowdown.
+        run_args.extend(['--memory', f'{memory_mb}m', '--memory-swap', f'{memory_mb}m'])
+    container_id = subprocess.check_output(
+        ['docker', 'run', '-d', '--platform', platform, *run_args, '-p', f'127.0.0.1::{OPENRECON_PORT}', image],
+        text=True,
+    ).strip()
+    return container_id
+
+
+def get_container_failure(image, container_id, exc):
+    logs = subprocess.run(['docker', 'logs', '--tail', '20', container_id], capture_output=True, text=True)
+    return RuntimeError(f'Benchmark of {image} failed: {exc}\n{logs.stdout}{logs.stderr}')
+
+
+def remove_container(container_id):
+    subprocess.run(['docker', 'rm', '-f', container_id], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def measure_cold_start(image, config_name, timeout=DEFAULT_COLD_START_TIMEOUT_SECONDS, platform='linux/amd64'):
+    """Start image once and time its server until the first accept and handshake."""
+    started = time.monotonic()
+    deadline = started + timeout
+    container_id = start_openrecon_container(image, platform)
+    try:
+        host, port = get_published_port(container_id)
+        wait_until(lambda: try_accept(host, port), deadline, create_container_state_check(container_id))
+        accepted = time.monotonic()
+        run_handshake(host, port, config_name, max(deadline - time.monotonic(), 1))
+        handshaken = time.monotonic()
+    except (OSError, RuntimeError) as exc:
+        raise get_container_failure(image, container_id, exc) from exc
+    finally:
+        remove_container(container_id)
+    return {'accept_seconds': accepted - started, 'handshake_seconds': handshaken - started}
+
+
+def summarize_cold_starts(runs):
+    return {
+        'accept_seconds': summarize_samples([run['accept_seconds'] for run in runs]),
+        'handshake_seconds': summarize_samples([run['handshake_seconds'] for run in runs]),
+    }
+
+
+def create_no_bytecode_dockerfile(image):
+    from build import OPENRECON_BAKED_BYTECODE_PATHS_PATH
+
+    return textwrap.dedent(
+        f'''\
+        FROM {image}
+        RUN test -f {OPENRECON_BAKED_BYTECODE_PATHS_PATH} || {{ echo "{image} has no baked bytecode" >&2; exit 1; }}; \\
+            while read -r path; do \\
+                if [ -d "$path" ]; then \\
+                    find "$path" -depth -type d -name __pycache__ -exec rm -rf {{}} +; \\
+                else \\
+                    rm -f "${{path%/*}}/__pycache__/$(basename "$path" .py)".*.pyc; \\
+                fi; \\
+            done < {OPENRECON_BAKED_BYTECODE_PATHS_PATH}
+        ENV PYTHONDONTWRITEBYTECODE=1
+        '''
+    )
+
+
+def create_no_bytecode_image(image, platform='linux/amd64'):
+    """Build a copy of image without the bytecode its bake step compiled and return its tag."""
+    dockerfile = create_no_bytecode_dockerfile(image)
+    no_bytecode_image = f'{NO_BYTECODE_IMAGE_REPOSITORY}:{hashlib.sha256(image.encode("utf-8")).hexdigest()[:12]}'
+    result = subprocess.run(
+        ['docker', 'build', '--platform', platform, '-t', no_bytecode_image, '-'],
+        input=dockerfile,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f'Could not create a copy of {image} without bytecode:\n{result.stdout}{result.stderr}')
+    return no_bytecode_image
+
+
+def benchmark_cold_start(
+    image,
+    config_name,
+    samples=DEFAULT_COLD_START_SAMPLES,
+    timeout=DEFAULT_COLD_START_TIMEOUT_SECONDS,
+    compare_bytecode=False,
+):
+    """Start image samples times and report cold-start percentiles.
+
+    With compare_bytecode every start is followed by one of a copy of the
+    image without its baked bytecode, and the report gains the p50 handshake
+    difference.
+    """
+    if samples < 1:
+        raise ValueError(f'Cold-start samples must be at least 1, got: {samples}')
+    variants = [('', image)]
+    if compare_bytecode:
+        variants.append((' without bytecode', create_no_bytecode_image(image)))
+    runs = {suffix: [] for suffix, _ in variants}
+    try:
+        for index in range(samples):
+            for suffix, variant_image in variants:
+                run = measure_cold_start(variant_image, config_name, timeout=timeout)
+                print(
+                    f'   sample {index + 1}/{samples}{suffix}: accept {run["accept_seconds"]:.2f} s, '
+                    f'handshake {run["handshake_seconds"]:.2f} s',
+                    file=sys.stderr,
+                )
+                runs[suffix].append(run)
+    finally:
+        for _, variant_image in variants[1:]:
+            subprocess.run(['docker', 'image', 'rm', variant_image], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    report = {'image': image, 'config': config_name, 'samples': samples, **summarize_cold_starts(runs[''])}
+    if compare_bytecode:
+        report['without_bytecode'] = summarize_cold_starts(runs[' without bytecode'])
+        report['bytecode_gain_seconds'] = (
+            report['without_bytecode']['handshake_seconds']['p50'] - report['handshake_seconds']['p50']
+        )
+    return report
+
+
+def check_cold_start_budget(report, budget_seconds):
+    """Record the budget in report; return an error message when it is exceeded."""
+    measured = report['handshake_seconds'][COLD_START_BUDGET_PERCENTILE]
+    report['budget'] = {'seconds': budget_seconds, 'percentile': COLD_START_BUDGET_PERCENTILE}
+    if measured > budget_seconds:
+        return (
+            f'{COLD_START_BUDGET_PERCENTILE} cold start of {report["image"]} took {measured:.2f} s, '
+            f'over the {budget_seconds:g} s budget'
+        )
+    return None
+
+
+def print_cold_start_report(report, stream=sys.stderr):
+    for metric, label in (('accept_seconds', 'first accept'), ('handshake_seconds', 'first handshake')):
+        summary = report[metric]
+        print(
+            f'   {label}: p50 {summary["p50"]:.2f} s, p90 {summary["p90"]:.2f} s, '
+            f'max {summary["max"]:.2f} s ({report["samples"]} samples)',
+            file=stream,
+        )
+    if 'without_bytecode' in report:
+        print(
+            f'   first handshake without precompiled bytecode: p50 '
+            f'{report["without_bytecode"]["handshake_seconds"]["p50"]:.2f} s '
+            f'(bytecode saves {report["bytecode_gain_seconds"]:.2f} s at p50)',
+            file=stream,
+        )
+    if report.get('budget'):
+        print(f'   budget: {report["budget"]["percentile"]} handshake within {report["budget"]["seconds"]:g} s', file=stream)
+
+
+def get_label_benchmark_plan(json_data):
+    """Return the config modules, emitter type, parameter defaults and declared resources of a label."""
+    from build import get_openrecon_config_module_names, get_openrecon_parameter_defaults
+
+    reconstruction = json_data.get('reconstruction', {})
+    return {
+        'configs': get_openrecon_config_module_names(json_data),
+        'emitter': reconstruction.get('emitter', 'image'),
+        'parameters': get_openrecon_parameter_defaults(json_data),
+        'min_required_memory': reconstruction.get('min_required_memory'),
+        'min_count_required_cpu_cores': reconstruction.get('min_count_required_cpu_cores'),
+    }
+
+
+def summarize_throughput(sessions):
+    summary = {'images': sessions[-1]['images']}
+    for metric in ('inputs_per_second', 'images_per_second', 'latency_seconds'):
+        values = [session[metric] for session in sessions if metric in session]
+        if values:
+            summary[metric] = summarize_samples(values)
+    return summary
+
+
+def benchmark_throughput(
+    image,
+    config_names,
+    emitter,
+    parameters=None,
+    samples=DEFAULT_THROUGHPUT_SAMPLES,
+    warmup=DEFAULT_THROUGHPUT_WARMUP,
+    matrix=DEFAULT_SYNTHETIC_MATRIX,
+    slices=DEFAULT_SYNTHETIC_SLICES,
+    channels=DEFAULT_SYNTHETIC_CHANNELS,
+    timeout=DEFAULT_SESSION_TIMEOUT_SECONDS,
+):
+    """Stream synthetic data through every config module of one running container.
+
+    The first `warmup` sessions of each module are not measured, so module
+    imports and model loading count towards the cold start instead.
+    """
+    if samples < 1:
+        raise ValueError(f'Throughput samples must be at least 1, got: {samples}')
+    if not config_names:
+        raise ValueError('No config modules to benchmark')
+    metadata_xml, inputs = create_synthetic_inputs(emitter, matrix=matrix, slices=slices, channels=channels)
+    report = {
+        'image': image,
+        'emitter': emitter,
+        'inputs': len(inputs),
+        'input_kind': 'acquisitions' if emitter == 'raw' else 'images',
+        'samples': samples,
+        'warmup': warmup,
+        'configs': {},
+    }
+    container_id = start_openrecon_container(image)
+    try:
+        host, port = get_published_port(container_id)
+        wait_until(
+            lambda: try_accept(host, port),
+            time.monotonic() + DEFAULT_COLD_START_TIMEOUT_SECONDS,
+            create_container_state_check(container_id),
+        )
+        for config_name in config_names:
+            sessions = []
+            for index in range(warmup + samples):
+                session = run_throughput_session(host, port, config_name, metadata_xml, inputs, parameters, timeout)
+                if index >= warmup:
+                    sessions.append(session)
+            report['configs'][config_name] = summarize_throughput(sessions)
+            print(f'   {config_name}: {format_throughput(report, config_name)}', file=sys.stderr)
+    except (OSError, RuntimeError, ValueError) as exc:
+        raise get_container_failure(image, container_id, exc) from exc
+    finally:
+        remove_container(container_id)
+    return report
+
+
+def format_throughput(report, config_name):
+    summary = report['configs'][config_name]
+    text = f'{summary["inputs_per_second"]["p50"]:.1f} {report["input_kind"]}/s in'
+    if 'images_per_second' in summary:
+        text += (
+            f', {summary["images_per_second"]["p50"]:.1f} images/s out ({summary["images"]} images),'
+            f' last {report["input_kind"][:-1]} to last image p50 {summary["latency_seconds"]["p50"]:.2f} s'
+            f' / p90 {summary["latency_seconds"]["p90"]:.2f} s'
+        )
+    else:
+        text += ', no images returned'
+    return text
+
+
+def print_throughput_report(report, stream=sys.stderr):
+    print(f'   {report["inputs"]} synthetic {report["input_kind"]} per session, {report["samples"]} measured sessions:', file=stream)
+    for config_name in report['configs']:
+        print(f'   {config_name}: {format_throughput(report, config_name)}', file=stream)
+
+
+def get_cpu_sweep(max_cpus):
+    """Return 1, 2, 4, ... CPUs up to and including max_cpus."""
+    counts = []
+    count = 1
+    while count < max_cpus:
+        counts.append(count)
+        count *= 2
+    counts.append(max_cpus)
+    return counts
+
+
+def get_docker_host_resources():
+    """Return (CPUs, memory in MiB) available to containers."""
+    output = subprocess.check_output(['docker', 'info', '--format', '{{.NCPU}} {{.MemTotal}}'], text=True)
+    cpus, memory_bytes = output.split()
+    return int(cpus), int(memory_bytes) // (1024 * 1024)
+
+
+def read_container_peak_memory_mb(container_id):
+    """Return the container cgroup's peak memory in MiB, or None if the kernel does not track it."""
+    result = subprocess.run(
+        ['docker', 'exec', container_id, 'sh', '-c', PEAK_MEMORY_SCRIPT],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    value = result.stdout.strip()
+    return round(int(value) / (1024 * 1024)) if value.isdigit() else None
+
+
+def is_container_oom_killed(container_id):
+    result = subprocess.run(
+        ['docker', 'inspect', '--format', '{{.State.OOMKilled}}', container_id],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    return result.stdout.strip() == 'true'
+
+
+def measure_resource_point(image, config_name, metadata_xml, inputs, parameters=None, cpus=None, memory_mb=None,
+                           samples=1, warmup=DEFAULT_THROUGHPUT_WARMUP, timeout=DEFAULT_SESSION_TIMEOUT_SECONDS):
+    """Run the workload in a fresh container under one set of limits.
+
+    Records the median session wall time and the container's peak memory,
+    which includes the warm-up session. A workload that fails records the
+    error and whether the container was OOM killed instead.
+    """
+    point = {'cpus': cpus, 'memory_mb': memory_mb}
+    container_id = start_openrecon_container(image, cpus=cpus, memory_mb=memory_mb)
+    try:
+        host, port = get_published_port(container_id)
+        wait_until(
+            lambda: try_accept(host, port),
+            time.monotonic() + DEFAULT_COLD_START_TIMEOUT_SECONDS,
+            create_container_state_check(container_id),
+        )
+        sessions = [
+            run_throughput_session(host, port, config_name, metadata_xml, inputs, parameters, timeout)
+            for _ in range(warmup + samples)
+        ][warmup:]
+        point['wall_seconds'] = round(percentile([session['session_seconds'] for session in sessions], 0.5), 3)
+        point['peak_memory_mb'] = read_container_peak_memory_mb(container_id)
+    except (OSError, RuntimeError, ValueError) as exc:
+        point['oom_killed'] = is_container_oom_killed(container_id)
+        point['error'] = str(exc)
+    finally:
+        remove_container(container_id)
+    return point
+
+
+def get_memory_caps(declared_memory_mb, peak_memory_mb, host_memory_mb):
+    """Caps around the measured peak, plus the declared value, that the host can enforce."""
+    caps = {declared_memory_mb} if declared_memory_mb else set()
+    if peak_memory_mb:
+        caps.update({round(peak_memory_mb * 0.5), round(peak_memory_mb * 1.25)})
+    return sorted(cap for cap in caps if MIN_MEMORY_CAP_MB <= cap < host_memory_mb)
+
+
+def get_resource_warnings(declared_memory_mb, declared_cpus, peak_memory_mb, effective_cpus, max_swept_cpus):
+    warnings = []
+    if declared_memory_mb and peak_memory_mb:
+        if peak_memory_mb > declared_memory_mb:
+            warnings.append(
+                f'min_required_memory is {declared_memory_mb} MB, but the container peaked at {peak_memory_mb} MB'
+            )
+        elif declared_memory_mb > peak_memory_mb * RESOURCE_FAR_OFF_FACTOR:
+            warnings.append(
+                f'min_required_memory is {declared_memory_mb} MB, over {RESOURCE_FAR_OFF_FACTOR}x the '
+                f'measured peak of {peak_memory_mb} MB'
+            )
+    if declared_cpus and effective_cpus:
+        if effective_cpus < max_swept_cpus and declared_cpus > effective_cpus * RESOURCE_FAR_OFF_FACTOR:
+            warnings.append(
+                f'min_count_required_cpu_cores is {declared_cpus}, but wall time stops improving '
+                f'beyond {effective_cpus} CPUs'
+            )
+        elif declared_cpus * RESOURCE_FAR_OFF_FACTOR < effective_cpus:
+            warnings.append(
+                f'min_count_required_cpu_cores is {declared_cpus}, but wall time keeps improving '
+                f'up to {effective_cpus} CPUs'
+            )
+    return warnings
+
+
+def profile_resources(
+    image,
+    config_name,
+    emitter,
+    parameters=None,
+    declared_memory_mb=None,
+    declared_cpus=None,
+    cpu_counts=None,
+    memory_caps_mb=None,
+    samples=1,
+    warmup=DEFAULT_THROUGHPUT_WARMUP,
+    matrix=DEFAULT_SYNTHETIC_MATRIX,
+    slices=DEFAULT_SYNTHETIC_SLICES,
+    channels=DEFAULT_SYNTHETIC_CHANNELS,
+    timeout=DEFAULT_SESSION_TIMEOUT_SECONDS,
+):
+    """Sweep CPU and memory limits under a synthetic workload.
+
+    The CPU sweep runs without a memory cap and gives the scaling curve and
+    the peak memory; the memory sweep then runs at the highest CPU count.
+    Declared label resources far from the measured ones are returned as
+    warnings.
+    """
+    metadata_xml, inputs = create_synthetic_inputs(emitter, matrix=matrix, slices=slices, channels=channels)
+    host_cpus, host_memory_mb = get_docker_host_resources()
+    cpu_counts = cpu_counts or get_cpu_sweep(host_cpus)
+    point_args = {'parameters': parameters, 'samples': samples, 'warmup': warmup, 'timeout': timeout}
+
+    cpu_sweep = []
+    for cpus in cpu_counts:
+        point = measure_resource_point(image, config_name, metadata_xml, inputs, cpus=cpus, **point_args)
+        print(f'   {format_resource_point(point)}', file=sys.stderr)
+        cpu_sweep.append(point)
+    measured = [point for point in cpu_sweep if 'wall_seconds' in point]
+    if not measured:
+        raise RuntimeError(f'the workload failed at every CPU count: {cpu_sweep[-1]["error"]}')
+    best_seconds = min(point['wall_seconds'] for point in measured)
+    for point in measured:
+        point['speedup'] = round(measured[0]['wall_seconds'] / point['wall_seconds'], 2)
+    effective_cpus = min(
+        point['cpus'] for point in measured if point['wall_seconds'] <= best_seconds * (1 + CPU_SCALING_TOLERANCE)
+    )
+    peaks = [point['peak_memory_mb'] for point in measured if point.get('peak_memory_mb') is not None]
+    peak_memory_mb = max(peaks) if peaks else None
+
+    if memory_caps_mb is None:
+        memory_caps_mb = get_memory_caps(declared_memory_mb, peak_memory_mb, host_memory_mb)
+    memory_sweep = []
+    for memory_mb in memory_caps_mb:
+        point = measure_resource_point(image, config_name, metadata_xml, inputs, cpus=max(cpu_counts), memory_mb=memory_mb, **point_args)
+        print(f'   {format_resource_point(point)}', file=sys.stderr)
+        memory_sweep.append(point)
+    working_caps = [point['memory_mb'] for point in memory_sweep if 'wall_seconds' in point]
+
+    return {
+        'image': image,
+        'config': config_name,
+        'emitter': emitter,
+        'inputs': len(inputs),
+        'cpu_sweep': cpu_sweep,
+        'memory_sweep': memory_sweep,
+        'measured': {
+            'peak_memory_mb': peak_memory_mb,
+            'effective_cpus': effective_cpus,
+            'min_working_memory_mb': min(working_caps) if working_caps else None,
+        },
+        'declared': {'min_required_memory': declared_memory_mb, 'min_count_required_cpu_cores': declared_cpus},
+        'warnings': get_resource_warnings(declared_memory_mb, declared_cpus, peak_memory_mb, effective_cpus, max(cpu_counts)),
+    }
+
+
+def format_resource_point(point):
+    text = f'{point["cpus"]} CPU' + ('s' if point['cpus'] != 1 else '')
+    if point['memory_mb'] is not None:
+        text += f', {point["memory_mb"]} MB cap'
+    if 'wall_seconds' not in point:
+        return text + (': OOM killed' if point.get('oom_killed') else f': failed ({point["error"].splitlines()[0]})')
+    text += f': {point["wall_seconds"]:.2f} s'
+    if 'speedup' in point:
+        text += f' ({point["speedup"]:.2f}x)'
+    if point.get('peak_memory_mb') is not None:
+        text += f', peak {point["peak_memory_mb"]} MB'
+    return text
+
+
+def print_resource_profile(report, stream=sys.stderr):
+    print(f'   {report["config"]} with {report["inputs"]} synthetic inputs per session:', file=stream)
+    for point in report['cpu_sweep'] + report['memory_sweep']:
+        print(f'   {format_resource_point(point)}', file=stream)
+    measured = report['measured']
+    declared = report['declared']
+    print(
+        f'   measured: peak {measured["peak_memory_mb"]} MB, {measured["effective_cpus"]} CPUs effective; '
+        f'declared: {declared["min_required_memory"]} MB, {declared["min_count_required_cpu_cores"]} cores',
+        file=stream,
+    )
+    for warning in report['warnings']:
+        print(f'⚠️  {warning}', file=stream)
+
+
+def load_image_from_zip(zip_path, entry_name):
+    """Stream an image tar from an OpenRecon zip into `docker load`."""
+    load_cmd = ['docker', 'load']
+    process = subprocess.Popen(load_cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    try:
+        with zipfile.ZipFile(zip_path) as archive, archive.open(entry_name) as entry:
+            shutil.copyfileobj(entry, process.stdin, 1024 * 1024)
+    finally:
+        process.stdin.close()
+        output = process.stdout.read().decode('utf-8', errors='replace')
+        process.wait()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, load_cmd, output)
+    return output.strip()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark a built OpenRecon image with a local MRD client.')
+    common_parser = argparse.ArgumentParser(add_help=False)
+    common_parser.add_argument('image', help='OpenRecon image to start')
+    common_parser.add_argument('--zip', help='Load the image from this OpenRecon zip first')
+    common_parser.add_argument('--entry-name', help='Image tar entry in --zip (default: the only .tar entry)')
+    common_parser.add_argument('--json', help='Write the report to this path')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    cold_start_parser = subparsers.add_parser(
+        'cold-start', parents=[common_parser], help='Time container start to first accept and handshake on port 9002',
+    )
+    cold_start_parser.add_argument('--config', required=True, help='Config name sent in the handshake')
+    cold_start_parser.add_argument('--samples', type=int, default=DEFAULT_COLD_START_SAMPLES, help='Container starts to sample')
+    cold_start_parser.add_argument('--timeout', type=float, default=DEFAULT_COLD_START_TIMEOUT_SECONDS, help='Seconds to wait for one start')
+    cold_start_parser.add_argument(
+        '--compare-bytecode', action='store_true', help='Also time starts of a copy without the baked bytecode',
+    )
+    cold_start_parser.add_argument('--budget', type=float, help=f'Fail when the {COLD_START_BUDGET_PERCENTILE} handshake exceeds this many seconds')
+
+    workload_parser = argparse.ArgumentParser(add_help=False)
+    workload_parser.add_argument('--label', help='OpenReconLabel.json to take configs, emitter, parameter defaults and resources from')
+    workload_parser.add_argument('--config', action='append', default=[], help='Config module to run (repeatable)')
+    workload_parser.add_argument('--emitter', choices=EMITTER_TYPES, help='Synthetic input type (default: from --label, else image)')
+    workload_parser.add_argument('--warmup', type=int, default=DEFAULT_THROUGHPUT_WARMUP, help='Unmeasured sessions per run')
+    workload_parser.add_argument('--matrix', type=int, default=DEFAULT_SYNTHETIC_MATRIX, help='Readout samples and phase encodes, or image size')
+    workload_parser.add_argument('--slices', type=int, default=DEFAULT_SYNTHETIC_SLICES, help='Slices per session')
+    workload_parser.add_argument('--channels', type=int, default=DEFAULT_SYNTHETIC_CHANNELS, help='Receiver channels of raw inputs')
+
+    throughput_parser = subparsers.add_parser(
+        'throughput', parents=[common_parser, workload_parser], help='Stream synthetic data through each config module',
+    )
+    throughput_parser.add_argument('--samples', type=int, default=DEFAULT_THROUGHPUT_SAMPLES, help='Measured sessions per config')
+
+    resources_parser = subparsers.add_parser(
+        'resources', parents=[common_parser, workload_parser], help='Sweep CPU and memory limits and compare with the label',
+    )
+    resources_parser.add_argument('--samples', type=int, default=1, help='Measured sessions per limit')
+    resources_parser.add_argument('--cpus', type=float, action='append', default=[], help='CPU limit to measure (repeatable, default: 1, 2, 4, ... all)')
+    resources_parser.add_argument('--memory-mb', type=int, action='append', default=None, help='Memory cap to measure (repeatable)')
+    args = parser.parse_args(argv)
+
+    if args.zip:
+        entry_name = args.entry_name
+        if entry_name is None:
+            with zipfile.ZipFile(args.zip) as archive:
+                tar_entries = [name for name in archive.namelist() if name.endswith('.tar')]
+            if len(tar_entries) != 1:
+                parser.error(f'--entry-name is required: {args.zip} has {len(tar_entries)} .tar entries')
+            entry_name = tar_entries[0]
+        print(load_image_from_zip(args.zip, entry_name), file=sys.stderr)
+
+    error = None
+    try:
+        if args.command == 'cold-start':
+            print(f'⏱️  Cold-start benchmark of {args.image}:', file=sys.stderr)
+            report = benchmark_cold_start(
+                args.image, args.config, samples=args.samples, timeout=args.timeout, compare_bytecode=args.compare_bytecode,
+            )
+            error = check_cold_start_budget(report, args.budget) if args.budget is not None else None
+            print_cold_start_report(report)
+        else:
+            plan = {'configs': [], 'emitter': 'image', 'parameters': {}, 'min_required_memory': None, 'min_count_required_cpu_cores': None}
+            if args.label:
+                with open(args.label, 'r', encoding='utf-8') as handle:
+                    plan = get_label_benchmark_plan(json.load(handle))
+            config_names = args.config or plan['configs']
+        if args.command == 'resources':
+            if not config_names:
+                parser.error('--config or --label is required')
+            print(f'📏 Resource profile of {args.image}:', file=sys.stderr)
+            report = profile_resources(
+                args.image,
+                config_names[0],
+                args.emitter or plan['emitter'],
+                parameters=plan['parameters'],
+                declared_memory_mb=plan['min_required_memory'],
+                declared_cpus=plan['min_count_required_cpu_cores'],
+                cpu_counts=[int(cpus) if cpus.is_integer() else cpus for cpus in args.cpus] or None,
+                memory_caps_mb=args.memory_mb,
+                samples=args.samples,
+                warmup=args.warmup,
+                matrix=args.matrix,
+                slices=args.slices,
+                channels=args.channels,
+            )
+            print_resource_profile(report)
+        elif args.command == 'throughput':
+            print(f'🚚 Throughput benchmark of {args.image}:', file=sys.stderr)
+            report = benchmark_throughput(
+                args.image,
+                config_names,
+                args.emitter or plan['emitter'],
+                parameters=plan['parameters'],
+                samples=args.samples,
+                warmup=args.warmup,
+                matrix=args.matrix,
+                slices=args.slices,
+                channels=args.channels,
+            )
+            print_throughput_report(report)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2)
+    if error:
+        print(f'❌ {error}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
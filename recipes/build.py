@@ -1,15 +1,24 @@
+import argparse
 import base64
+import contextlib
+import errno
+import hashlib
 import json
 import jsonschema
 import os
 import platform
+import re
 import shlex
 import shutil
+import signal
 import subprocess
 import sys
 import tempfile
 import textwrap
 import time
+import urllib.error
+import urllib.parse
+import urllib.request
 import uuid
 from pathlib import Path
 
@@ -23,7 +32,70 @@ FIRE_STARTUP_VALIDATION_ENV = 'OPENRECON_FIRE_VALIDATE_STARTUP'
 OPENRECON_JSON_CONFIG_VERSION = '1.1.0'
 DIND_RUN_ATTEMPTS_ENV = 'OPENRECON_DIND_RUN_ATTEMPTS'
 DIND_RETRY_DELAY_SECONDS_ENV = 'OPENRECON_DIND_RETRY_DELAY_SECONDS'
+BUILD_PHASE_MARKER = '##openrecon-phase'
+BUILD_REPORT_ENV = 'OPENRECON_BUILD_REPORT'
 OPENRECON_PYTHON_CANDIDATES = ('python3', 'python', 'python3.11')
+# Written at build time so container and FIRE starts can skip interpreter probing and ldconfig.
+OPENRECON_BAKED_PYTHON_PATH = '/etc/openrecon-python'
+OPENRECON_BAKED_LD_DIRS_PATH = '/etc/openrecon-ld-dirs'
+OPENRECON_BAKED_BYTECODE_PATHS_PATH = '/etc/openrecon-bytecode-paths'
+OPENRECON_METADATA_LABEL_NAME = 'com.siemens-healthineers.magneticresonance.openrecon.metadata:1.1.0'
+OPENRECON_TAR_BUILDER_ENV = 'OPENRECON_TAR_BUILDER'
+OPENRECON_ZIP_PACKAGER_ENV = 'OPENRECON_ZIP_PACKAGER'
+OPENRECON_ZIP_THREADS_ENV = 'OPENRECON_ZIP_THREADS'
+BENCHMARK_COMPRESSION_ENV = 'OPENRECON_BENCHMARK_COMPRESSION'
+BENCHMARK_COLD_START_ENV = 'OPENRECON_BENCHMARK_COLD_START'
+BENCHMARK_THROUGHPUT_ENV = 'OPENRECON_BENCHMARK_THROUGHPUT'
+PROFILE_RESOURCES_ENV = 'OPENRECON_PROFILE_RESOURCES'
+IMAGE_PROBE_ENV = 'OPENRECON_IMAGE_PROBE'
+DIND_IMAGE = 'docker:24.0-dind'
+BUILD_TOOLS_IMAGE_REPOSITORY = 'openrecon-build-tools'
+BUILD_TOOLS_IMAGE_PACKAGES = ('e2fsprogs', 'e2fsprogs-extra', 'python3')
+DIND_BUILDER_ENV = 'OPENRECON_DIND_BUILDER'
+DIND_BUILDER_NAME_ENV = 'OPENRECON_DIND_BUILDER_NAME'
+DIND_BUILDER_MAX_GB_ENV = 'OPENRECON_DIND_BUILDER_MAX_GB'
+DIND_BUILDER_EVICTION_ENV = 'OPENRECON_DIND_BUILDER_EVICTION'
+MULTI_RECIPE_TERMINATE_TIMEOUT_SECONDS = 30
+DIND_BUILDER_SOCKET_DIR = '/var/run/openrecon'
+DIND_BUILDER_DOCKER_HOST = f'unix://{DIND_BUILDER_SOCKET_DIR}/docker.sock'
+DIND_BUILDER_REGISTRY_MIRROR_LABEL = 'org.neurodesk.openrecon.dind-builder.registry-mirror'
+REGISTRY_MIRROR_ENV = 'OPENRECON_REGISTRY_MIRROR'
+REGISTRY_MIRROR_PORT_ENV = 'OPENRECON_REGISTRY_MIRROR_PORT'
+REGISTRY_MIRROR_IMAGE = 'registry:2'
+REGISTRY_MIRROR_NAME = 'openrecon-registry-mirror'
+REGISTRY_MIRROR_NETWORK = 'openrecon-build'
+DOCKER_HUB_REGISTRY_NAMES = ('docker.io', 'index.docker.io', 'registry-1.docker.io')
+REGISTRY_MANIFEST_MEDIA_TYPES = (
+    'application/vnd.docker.distribution.manifest.v2+json',
+    'application/vnd.docker.distribution.manifest.list.v2+json',
+    'application/vnd.oci.image.manifest.v1+json',
+    'application/vnd.oci.image.index.v1+json',
+)
+BUILD_CACHE_ENV = 'OPENRECON_BUILD_CACHE'
+BUILD_CACHE_DIR_ENV = 'OPENRECON_BUILD_CACHE_DIR'
+BUILD_CACHE_MANIFEST_NAME = 'manifest.json'
+BUILD_CACHE_GENERATOR_FILES = ('build.py', 'imageArchive.py', 'fireImageSize.py', 'rootfsPrune.py', 'zipStream.py')
+# The recipes directory is mounted read-only at this path in build containers
+# so shell scripts can run helper modules such as fireImageSize.py.
+BUILD_TOOLS_DIR = '/opt/openrecon-build'
+FIRE_OVERRIDE_ENV_NAMES = (
+    'fireFreeSpaceMb',
+    'fireShrinkToFit',
+    'fireStartupCommand',
+    'fireSearchString',
+    'fireHostname',
+    'firePort',
+    'fireBundleName',
+)
+PRUNE_ENV_NAMES = ('pruneRules', 'pruneOpenRecon')
+PRUNE_RULES_FILE_NAME = 'prune.rules'
+# Per-recipe compression profiles for the OpenRecon zip and the FIRE bundle zip.
+COMPRESSION_PROFILE_ENV_NAMES = ('compressionProfile', 'fireCompressionProfile')
+# 7-Zip's -bsp1 progress output: percentages rewritten in place with backspaces.
+SEVEN_ZIP_PROGRESS_PATTERN = re.compile(rb'^\s*(\d{1,3})%')
+SEVEN_ZIP_OUTPUT_SEPARATOR_PATTERN = re.compile(rb'[\b\r\n]')
+# Linux FICLONE ioctl: share the source file's extents instead of copying data.
+FICLONE_IOCTL = 0x40049409
 
 
 def get_positive_int_env(name, default):
@@ -66,7 +138,232 @@ def is_transient_dind_wrapper_start_failure(output):
     )
 
 
-def run_dind_build_process(args, max_attempts=None, retry_delay_seconds=None):
+def create_build_report(name=None):
+    return {'name': name, 'started_at': time.time(), 'phases': []}
+
+
+def record_build_phase(report, name, started_at, ended_at, bytes_processed=None, status='ok'):
+    duration = max(ended_at - started_at, 0.0)
+    phase = {
+        'name': name,
+        'status': status,
+        'start': round(started_at, 3),
+        'end': round(ended_at, 3),
+        'duration_seconds': round(duration, 3),
+    }
+    if bytes_processed is not None:
+        phase['bytes'] = bytes_processed
+        if duration > 0:
+            phase['throughput_mb_per_second'] = round(bytes_processed / duration / 1e6, 2)
+    if report is not None:
+        report['phases'].append(phase)
+    return phase
+
+
+@contextlib.contextmanager
+def build_phase(report, name):
+    """Time a block of the Python build flow as a named report phase.
+
+    The yielded dict may be given a 'bytes' entry to record throughput.
+    """
+    phase_info = {}
+    started_at = time.time()
+    status = 'failed'
+    try:
+        yield phase_info
+        status = 'ok'
+    finally:
+        record_build_phase(report, name, started_at, time.time(), phase_info.get('bytes'), status=status)
+
+
+def parse_build_phase_marker(line):
+    parts = line.split()
+    if len(parts) < 3 or parts[0] != BUILD_PHASE_MARKER or parts[1] not in {'start', 'end', 'metric'}:
+        return None
+    bytes_processed = int(parts[3]) if len(parts) > 3 and parts[3].isdigit() else None
+    return parts[1], parts[2], bytes_processed
+
+
+def format_build_phase(phase):
+    text = f'{phase["name"]}: {phase["duration_seconds"]:.1f}s'
+    if 'bytes' in phase:
+        text += f' ({phase["bytes"] / 1e9:.2f} GB'
+        if 'throughput_mb_per_second' in phase:
+            text += f', {phase["throughput_mb_per_second"]:.1f} MB/s'
+        text += ')'
+    return text
+
+
+def run_compression_benchmark(build_report, kind, paths):
+    """Sample a finished package with every compression profile."""
+    from zipStream import benchmark_compression, print_compression_benchmark
+
+    print(f'🧪 Compression benchmark for the {kind} package:')
+    results = benchmark_compression(paths, threads=get_openrecon_zip_threads())
+    print_compression_benchmark(results, stream=sys.stdout)
+    build_report.setdefault('compression_benchmark', {})[kind] = results
+    return results
+
+
+def get_cold_start_budget_seconds():
+    raw_value = os.getenv('coldStartBudgetSeconds')
+    if raw_value is None or raw_value.strip() == '':
+        return None
+    try:
+        value = float(raw_value)
+    except ValueError as exc:
+        raise ValueError(f'Environment variable coldStartBudgetSeconds must be a number, got: {raw_value}') from exc
+    if value <= 0:
+        raise ValueError(f'Environment variable coldStartBudgetSeconds must be positive, got: {raw_value}')
+    return value
+
+
+def run_image_benchmarks(
+    build_report,
+    docker_image_name,
+    zip_path,
+    tar_entry_name,
+    json_data,
+    cold_start=False,
+    throughput=False,
+    resources=False,
+    budget_seconds=None,
+):
+    """Load the packaged image once and benchmark its server.
+
+    The cold start is timed against the default config; the throughput
+    benchmark streams synthetic data through every config module; the
+    resource profile sweeps CPU and memory limits for the default config.
+    Raises when budget_seconds is set and the measured cold start exceeds it.
+    """
+    from benchmarkImage import (
+        benchmark_cold_start,
+        benchmark_throughput,
+        check_cold_start_budget,
+        get_label_benchmark_plan,
+        load_image_from_zip,
+        print_cold_start_report,
+        print_resource_profile,
+        print_throughput_report,
+        profile_resources,
+    )
+
+    previous_image_id = resolve_docker_image_id(docker_image_name)
+    print(f'📥 Loading {docker_image_name} from the OpenRecon package for benchmarking...')
+    load_image_from_zip(zip_path, tar_entry_name)
+    error = None
+    try:
+        if cold_start:
+            print(f'⏱️  Cold-start benchmark of {docker_image_name}:')
+            report = benchmark_cold_start(
+                docker_image_name,
+                get_default_openrecon_config_id(json_data),
+                samples=parse_int_env('coldStartSamples', 5),
+                compare_bytecode=os.getenv('coldStartCompareBytecode', 'false').lower() == 'true',
+            )
+            error = check_cold_start_budget(report, budget_seconds) if budget_seconds is not None else None
+            print_cold_start_report(report, stream=sys.stdout)
+            build_report['cold_start_benchmark'] = report
+        if throughput:
+            plan = get_label_benchmark_plan(json_data)
+            print(f'🚚 Throughput benchmark of {docker_image_name} ({plan["emitter"]} input):')
+            report = benchmark_throughput(
+                docker_image_name,
+                plan['configs'],
+                plan['emitter'],
+                parameters=plan['parameters'],
+                samples=parse_int_env('throughputSamples', 3),
+            )
+            print_throughput_report(report, stream=sys.stdout)
+            build_report['throughput_benchmark'] = report
+        if resources:
+            plan = get_label_benchmark_plan(json_data)
+            print(f'📏 Resource profile of {docker_image_name}:')
+            report = profile_resources(
+                docker_image_name,
+                get_default_openrecon_config_id(json_data),
+                plan['emitter'],
+                parameters=plan['parameters'],
+                declared_memory_mb=plan['min_required_memory'],
+                declared_cpus=plan['min_count_required_cpu_cores'],
+            )
+            print_resource_profile(report, stream=sys.stdout)
+            build_report['resource_profile'] = report
+    finally:
+        remove_benchmark_image(docker_image_name, previous_image_id)
+    if error:
+        raise Exception(f'Cold-start budget exceeded: {error}')
+
+
+def remove_benchmark_image(docker_image_name, previous_image_id):
+    """Undo the benchmark's `docker load` without removing images the host already had.
+
+    A tag that did not exist before the load is removed. When the load moved an
+    existing tag to a new image, the tag is pointed back at the previous image
+    and only the loaded image is removed.
+    """
+    loaded_image_id = resolve_docker_image_id(docker_image_name)
+    if loaded_image_id is None or loaded_image_id == previous_image_id:
+        return
+    if previous_image_id is None:
+        remove_cmd = ['docker', 'image', 'rm', docker_image_name]
+    else:
+        subprocess.run(['docker', 'tag', previous_image_id, docker_image_name], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        remove_cmd = ['docker', 'image', 'rm', loaded_image_id]
+    subprocess.run(remove_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def check_cached_cold_start_budget(entry_dir, budget_seconds):
+    """Apply the cold-start budget to the benchmark stored with a build cache entry.
+
+    Returns the stored report, or None when the entry was built without a
+    cold-start benchmark. Raises when the stored p90 handshake exceeds the budget.
+    """
+    from benchmarkImage import check_cold_start_budget, print_cold_start_report
+
+    report = read_build_cache_manifest(entry_dir).get('cold_start_benchmark')
+    if report is None:
+        return None
+    error = check_cold_start_budget(report, budget_seconds)
+    print(f'⏱️  Cached cold-start benchmark of {report["image"]}:')
+    print_cold_start_report(report, stream=sys.stdout)
+    if error:
+        raise Exception(f'Cold-start budget exceeded: {error}')
+    return report
+
+
+def format_packaging_record(record):
+    text = f'{record["name"]} ({record["engine"]}'
+    if record.get('profile'):
+        text += f', {record["profile"]}'
+    text += f'): {record["input_bytes"] / 1e9:.2f} GB in {record["seconds"]:.1f}s'
+    if record.get('throughput_mb_per_second') is not None:
+        text += f', {record["throughput_mb_per_second"]:.1f} MB/s'
+    if record.get('ratio') is not None:
+        text += f', ratio {record["ratio"]:.3f}'
+    return text
+
+
+def get_build_report_path(report_name):
+    configured_path = os.getenv(BUILD_REPORT_ENV, '').strip()
+    if configured_path:
+        return Path(configured_path)
+    timestamp = time.strftime('%Y%m%d-%H%M%S')
+    return get_openrecon_cache_root() / 'build-reports' / f'{report_name}-{timestamp}.json'
+
+
+def write_build_report(report, report_path):
+    report = dict(report)
+    report['phases'] = sorted(report['phases'], key=lambda phase: phase['start'])
+    report['ended_at'] = time.time()
+    report['duration_seconds'] = round(report['ended_at'] - report['started_at'], 3)
+    report_path = Path(report_path)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, indent=2) + '\n')
+    return report_path
+
+
+def run_dind_build_process(args, max_attempts=None, retry_delay_seconds=None, stdin_command=None, build_report=None):
     if max_attempts is None:
         max_attempts = get_positive_int_env(DIND_RUN_ATTEMPTS_ENV, 3)
     if retry_delay_seconds is None:
@@ -77,23 +374,51 @@ def run_dind_build_process(args, max_attempts=None, retry_delay_seconds=None):
         if max_attempts > 1:
             print(f'🐳 Starting DinD build container (attempt {attempt}/{max_attempts})...')
 
+        # The stdin producer (for example `docker save`) is restarted on every
+        # attempt because a failed DinD container may have consumed part of it.
+        stdin_process = None
+        if stdin_command:
+            stdin_process = subprocess.Popen(stdin_command, stdout=subprocess.PIPE)
+
         process = subprocess.Popen(
             args,
+            stdin=stdin_process.stdout if stdin_process else None,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
             bufsize=1,
             universal_newlines=True,
         )
+        if stdin_process:
+            stdin_process.stdout.close()
 
         output_lines = []
+        open_phases = {}
         try:
             for line in process.stdout:
                 output_lines.append(line)
                 combined_output_lines.append(line)
-                print(line, end='')
+                marker = parse_build_phase_marker(line)
+                if marker is None:
+                    print(line, end='')
+                    continue
+                event, phase_name, bytes_processed = marker
+                if event == 'metric':
+                    if build_report is not None and bytes_processed is not None:
+                        build_report.setdefault('metrics', {})[phase_name] = bytes_processed
+                elif event == 'start':
+                    open_phases[phase_name] = time.time()
+                elif phase_name in open_phases:
+                    phase = record_build_phase(build_report, phase_name, open_phases.pop(phase_name), time.time(), bytes_processed)
+                    print(f'⏱️  {format_build_phase(phase)}')
 
             process.wait()
             output = ''.join(output_lines)
+            if process.returncode == 0 and stdin_process and stdin_process.wait() != 0:
+                raise subprocess.CalledProcessError(
+                    stdin_process.returncode,
+                    stdin_command,
+                    output=''.join(combined_output_lines),
+                )
             if process.returncode == 0:
                 return ''.join(combined_output_lines)
 
@@ -112,13 +437,18 @@ def run_dind_build_process(args, max_attempts=None, retry_delay_seconds=None):
                 output=''.join(combined_output_lines),
             )
         finally:
+            for phase_name, started_at in open_phases.items():
+                record_build_phase(build_report, phase_name, started_at, time.time(), status='failed')
             if process.stdout:
                 process.stdout.close()
+            if stdin_process and stdin_process.poll() is None:
+                stdin_process.kill()
+                stdin_process.wait()
 
     raise subprocess.CalledProcessError(1, args, output=''.join(combined_output_lines))
 
 
-def create_openrecon_python_resolver_script():
+def create_openrecon_python_resolver_functions():
     candidates = ' '.join(shlex.quote(candidate) for candidate in OPENRECON_PYTHON_CANDIDATES)
     return textwrap.dedent(
         f'''\
@@ -142,18 +472,141 @@ def create_openrecon_python_resolver_script():
             done
             return 1
         }}
+        '''
+    )
+
+
+def create_openrecon_python_resolver_script():
+    return create_openrecon_python_resolver_functions() + textwrap.dedent(
+        '''\
         OPENRECON_PYTHON="$(resolve_openrecon_python)"
         export OPENRECON_PYTHON
         '''
     )
 
 
+def create_openrecon_bytecode_python():
+    return textwrap.dedent(
+        '''\
+        import compileall
+        import importlib.util
+        import json
+        import os
+        import py_compile
+        import sys
+
+        server_dir = "/opt/code/python-ismrmrd-server"
+        # Hash-checked pycs do not depend on source mtimes, so they stay valid
+        # in read-only chroots and give reproducible image contents.
+        invalidation_mode = py_compile.PycInvalidationMode.CHECKED_HASH
+        sys.path.insert(0, server_dir)
+        compiled_paths = []
+        ok = True
+
+        if os.path.isdir(server_dir):
+            ok = compileall.compile_dir(server_dir, quiet=1, invalidation_mode=invalidation_mode)
+            compiled_paths.append(server_dir)
+
+        for config_module_name in json.loads(sys.argv[1]):
+            try:
+                spec = importlib.util.find_spec(config_module_name)
+            except Exception:
+                spec = None
+            if spec is None or not spec.has_location or not spec.origin.endswith(".py"):
+                continue
+            path = os.path.dirname(spec.origin) if spec.submodule_search_locations else spec.origin
+            if path == server_dir or path.startswith(server_dir + os.sep):
+                continue
+            if os.path.isdir(path):
+                ok = compileall.compile_dir(path, quiet=1, invalidation_mode=invalidation_mode) and ok
+            else:
+                ok = compileall.compile_file(path, quiet=1, invalidation_mode=invalidation_mode) and ok
+            compiled_paths.append(path)
+
+        with open(sys.argv[2], "w") as paths_file:
+            paths_file.write("".join(path + "\\n" for path in compiled_paths))
+        print("Precompiled bytecode for: " + (", ".join(compiled_paths) or "nothing"))
+        sys.exit(0 if ok else 1)
+        '''
+    )
+
+
+def create_openrecon_bake_script(config_module_names=()):
+    """Return shell code that bakes the runtime lookups into the current rootfs.
+
+    It refreshes ld.so.cache, records the library directories ldconfig scanned
+    and writes the absolute path of the resolved interpreter. Runs with the
+    image environment, inside the image (Dockerfile RUN) or a FIRE chroot. A
+    rootfs without a usable interpreter only gets the linker cache, so the
+    runtime falls back to the resolver and reports the failure itself. With a
+    usable interpreter the server tree and config_module_names are compiled
+    to bytecode for it, and the compiled paths are recorded; files that do not
+    compile are left to the import.
+    """
+    bytecode_python_quoted = shlex.quote(create_openrecon_bytecode_python())
+    config_modules_json = shlex.quote(json.dumps(list(config_module_names)))
+    return create_openrecon_python_resolver_functions() + textwrap.dedent(
+        f'''\
+        /usr/sbin/ldconfig -v 2>/dev/null | sed -n 's/^\\(\\/[^:]*\\):.*/\\1/p' > {OPENRECON_BAKED_LD_DIRS_PATH}
+        for ld_conf in /etc/ld.so.conf /etc/ld.so.conf.d; do
+            if [ -e "$ld_conf" ]; then
+                printf "%s\\n" "$ld_conf" >> {OPENRECON_BAKED_LD_DIRS_PATH}
+            fi
+        done
+        if openrecon_python="$(resolve_openrecon_python)" && openrecon_python="$(command -v "$openrecon_python")"; then
+            printf "%s\\n" "$openrecon_python" > {OPENRECON_BAKED_PYTHON_PATH}
+            echo "Baked OpenRecon Python interpreter: $openrecon_python"
+            if ! "$openrecon_python" -c {bytecode_python_quoted} {config_modules_json} {OPENRECON_BAKED_BYTECODE_PATHS_PATH}; then
+                echo "Some Python files could not be precompiled; they are compiled on import instead"
+            fi
+        else
+            rm -f {OPENRECON_BAKED_PYTHON_PATH} {OPENRECON_BAKED_BYTECODE_PATHS_PATH}
+            echo "No Python interpreter with ismrmrd found; the runtime will resolve it on start"
+        fi
+        '''
+    )
+
+
+def create_openrecon_runtime_setup_script():
+    """Return shell code that prepares the linker cache and OPENRECON_PYTHON.
+
+    ldconfig only runs when a library directory recorded at build time is
+    newer than ld.so.cache, and the baked interpreter is used unless
+    OPENRECON_PYTHON is set or the baked path is missing, in which case the
+    resolver probes the candidates as before.
+    """
+    return create_openrecon_python_resolver_functions() + textwrap.dedent(
+        f'''\
+        openrecon_ld_cache_is_fresh() {{
+            [ -f /etc/ld.so.cache ] && [ -f {OPENRECON_BAKED_LD_DIRS_PATH} ] || return 1
+            while IFS= read -r ld_dir; do
+                if [ -n "$ld_dir" ] && [ "$ld_dir" -nt /etc/ld.so.cache ]; then
+                    return 1
+                fi
+            done < {OPENRECON_BAKED_LD_DIRS_PATH}
+        }}
+        if ! openrecon_ld_cache_is_fresh; then
+            /usr/sbin/ldconfig
+        fi
+        openrecon_baked_python=""
+        if [ -z "${{OPENRECON_PYTHON:-}}" ] && [ -r {OPENRECON_BAKED_PYTHON_PATH} ]; then
+            openrecon_baked_python="$(cat {OPENRECON_BAKED_PYTHON_PATH})"
+        fi
+        if [ -n "$openrecon_baked_python" ] && [ -x "$openrecon_baked_python" ]; then
+            OPENRECON_PYTHON="$openrecon_baked_python"
+        else
+            OPENRECON_PYTHON="$(resolve_openrecon_python)"
+        fi
+        export OPENRECON_PYTHON
+        '''
+    )
+
+
 def create_openrecon_python_runtime_command(log_path):
     return textwrap.dedent(
         f'''\
         set -eu
-        /usr/sbin/ldconfig
-        {create_openrecon_python_resolver_script()}
+        {create_openrecon_runtime_setup_script()}
         exec "$OPENRECON_PYTHON" /opt/code/python-ismrmrd-server/main.py -v -H=0.0.0.0 -p=9002 -l={log_path}
         '''
     )
@@ -275,15 +728,8 @@ def should_run_direct_config_validation():
     return platform.machine().lower() in ('amd64', 'x86_64')
 
 
-def create_config_module_validation_script(
-    docker_image_name,
-    config_module_names,
-    run_direct_validation=True,
-):
-    config_modules_json = shlex.quote(json.dumps(config_module_names))
-    docker_image_name_quoted = shlex.quote(docker_image_name)
-    run_direct_validation_flag = '1' if run_direct_validation else '0'
-    validation_python = textwrap.dedent(
+def create_config_module_validation_python():
+    return textwrap.dedent(
         '''\
         import importlib
         import importlib.util
@@ -323,6 +769,17 @@ def create_config_module_validation_script(
         print("OpenRecon config module validation passed for: " + ", ".join(config_module_names))
         '''
     )
+
+
+def create_config_module_validation_script(
+    docker_image_name,
+    config_module_names,
+    run_direct_validation=True,
+):
+    config_modules_json = shlex.quote(json.dumps(config_module_names))
+    docker_image_name_quoted = shlex.quote(docker_image_name)
+    run_direct_validation_flag = '1' if run_direct_validation else '0'
+    validation_python = create_config_module_validation_python()
     return textwrap.dedent(
         f'''\
         echo "🔍 Validating OpenRecon config modules inside image..."
@@ -330,10 +787,10 @@ def create_config_module_validation_script(
         run_direct_config_validation={run_direct_validation_flag}
         direct_validation_log=/tmp/openrecon_config_direct_validation.log
         rm -f "${{direct_validation_log}}"
-        use_copied_rootfs_validation=0
+        use_chroot_validation=0
         if [ "$run_direct_config_validation" -eq 0 ]; then
-            echo "ℹ️  Compatibility mode: using copied-rootfs validation because nested AMD64 containers are unreliable on non-AMD64 build hosts."
-            use_copied_rootfs_validation=1
+            echo "ℹ️  Compatibility mode: using chroot validation because nested AMD64 containers are unreliable on non-AMD64 build hosts."
+            use_chroot_validation=1
         elif docker run --rm --platform linux/amd64 --entrypoint /bin/sh {docker_image_name_quoted} -c '{create_openrecon_python_resolver_script()}cd /opt/code/python-ismrmrd-server && "$OPENRECON_PYTHON" - "$@"' sh "$config_modules_json" >"${{direct_validation_log}}" 2>&1 <<'PY'
 {validation_python}PY
         then
@@ -342,25 +799,50 @@ def create_config_module_validation_script(
             echo "✓ OpenRecon config modules are valid (direct container path)"
         else
             direct_validation_status=$?
-            use_copied_rootfs_validation=1
+            use_chroot_validation=1
             if [ "$direct_validation_status" -eq 125 ]; then
                 echo "⚠️  Nested validation container could not start (Docker exit 125). This is a Docker runtime limitation, not an OpenRecon recipe validation failure."
             else
-                echo "⚠️  Direct container validation returned exit code $direct_validation_status; cross-checking with copied-rootfs compatibility validation."
+                echo "⚠️  Direct container validation returned exit code $direct_validation_status; cross-checking with chroot compatibility validation."
             fi
         fi
 
-        if [ "$use_copied_rootfs_validation" -eq 1 ]; then
+        if [ "$use_chroot_validation" -eq 1 ]; then
             validation_root=/tmp/openrecon_config_validation_root
-            rm -rf "${{validation_root}}"
-            mkdir -p "${{validation_root}}"
+            validation_scratch=/tmp/openrecon_config_validation_scratch
+            cleanup_validation_root() {{
+                umount "${{validation_root}}" 2>/dev/null || true
+                umount "${{validation_scratch}}" 2>/dev/null || true
+                rm -rf "${{validation_root}}" "${{validation_scratch}}"
+            }}
+            cleanup_validation_root
+            mkdir -p "${{validation_root}}" "${{validation_scratch}}"
+
+            # Mount the image's own layer directories as overlay lowerdirs when
+            # the daemon's storage is visible here; writes from the chroot land
+            # in a tmpfs, so the image layers stay read-only. Otherwise copy the
+            # filesystem out of a stopped container.
+            validation_rootfs=copied-rootfs
+            image_layer_dirs=$(docker image inspect --format '{{{{if eq .GraphDriver.Name "overlay2"}}}}{{{{.GraphDriver.Data.UpperDir}}}}{{{{with .GraphDriver.Data.LowerDir}}}}:{{{{.}}}}{{{{end}}}}{{{{end}}}}' {docker_image_name_quoted} 2>/dev/null || true)
+            if [ -n "${{image_layer_dirs}}" ] && [ -d "${{image_layer_dirs%%:*}}" ] \\
+                && mount -t tmpfs tmpfs "${{validation_scratch}}" 2>/dev/null \\
+                && mkdir -p "${{validation_scratch}}/upper" "${{validation_scratch}}/work" \\
+                && mount -t overlay overlay -o "lowerdir=${{image_layer_dirs}},upperdir=${{validation_scratch}}/upper,workdir=${{validation_scratch}}/work" "${{validation_root}}" 2>/dev/null; then
+                validation_rootfs=layer-overlay
+                echo "ℹ️  Validating in a read-only overlay of the image layers."
+            else
+                umount "${{validation_scratch}}" 2>/dev/null || true
+                echo "ℹ️  Image layers are not mountable here; copying the image filesystem for validation."
+            fi
 
             tmp_container="config-validation-$(date +%s)-$$"
             if (
                 set -e
-                docker create --platform linux/amd64 --name "${{tmp_container}}" {docker_image_name_quoted} >/dev/null
-                docker cp "${{tmp_container}}:/." "${{validation_root}}"
-                docker rm "${{tmp_container}}" >/dev/null
+                if [ "$validation_rootfs" = copied-rootfs ]; then
+                    docker create --platform linux/amd64 --name "${{tmp_container}}" {docker_image_name_quoted} >/dev/null
+                    docker cp "${{tmp_container}}:/." "${{validation_root}}"
+                    docker rm "${{tmp_container}}" >/dev/null
+                fi
                 mkdir -p "${{validation_root}}/tmp" "${{validation_root}}/dev"
                 create_chroot_device() {{
                     device_name="$1"
@@ -383,19 +865,19 @@ def create_config_module_validation_script(
 {validation_python}PY
             ); then
                 tmp_container=""
-                rm -rf "${{validation_root}}"
+                cleanup_validation_root
                 rm -f "${{direct_validation_log}}"
-                echo "✓ OpenRecon config modules are valid (copied-rootfs compatibility path)"
+                echo "✓ OpenRecon config modules are valid (${{validation_rootfs}} compatibility path)"
             else
                 fallback_status=$?
-                echo "❌ Copied-rootfs OpenRecon config validation failed with exit code $fallback_status."
+                echo "❌ ${{validation_rootfs}} OpenRecon config validation failed with exit code $fallback_status."
                 if [ "$run_direct_config_validation" -eq 1 ]; then
                     echo "Direct container validation output:"
                     cat "${{direct_validation_log}}"
                 fi
                 docker rm -f "${{tmp_container}}" >/dev/null 2>&1 || true
                 tmp_container=""
-                rm -rf "${{validation_root}}"
+                cleanup_validation_root
                 rm -f "${{direct_validation_log}}"
                 exit "$fallback_status"
             fi
@@ -435,17 +917,75 @@ def ensure_dind_image_available(image_name, force_local_only):
         print('✓ DinD image ready')
 
 
-def write_openrecon_dockerfile(base_docker_image, dockerfile_path, json_data):
+def create_build_tools_dockerfile():
+    return f'FROM {DIND_IMAGE}\nRUN apk add --no-cache {" ".join(BUILD_TOOLS_IMAGE_PACKAGES)}\n'
+
+
+def get_build_tools_image():
+    digest = hashlib.sha256(create_build_tools_dockerfile().encode('utf-8')).hexdigest()[:12]
+    return f'{BUILD_TOOLS_IMAGE_REPOSITORY}:{digest}'
+
+
+def ensure_build_tools_image(force_local_only):
+    """Return the DinD image with the FIRE and packaging tools, building it once.
+
+    The packages are installed when the image is first built and the host
+    daemon keeps it under a tag derived from its Dockerfile, so later builds,
+    including --local-cache ones, run the FIRE writer, rootfsPrune.py and
+    zipStream.py without any network access.
+    """
+    image_name = get_build_tools_image()
+    try:
+        subprocess.check_output(['docker', 'image', 'inspect', image_name], stderr=subprocess.STDOUT)
+        return image_name
+    except subprocess.CalledProcessError:
+        pass
+
+    ensure_dind_image_available(DIND_IMAGE, force_local_only)
+    print(f'🧰 Building {image_name} with {", ".join(BUILD_TOOLS_IMAGE_PACKAGES)} (later builds reuse it)...')
+    build_cmd = ['docker', 'build', '--platform', 'linux/amd64', '-t', image_name, '-']
+    try:
+        subprocess.check_output(build_cmd, input=create_build_tools_dockerfile().encode('utf-8'), stderr=subprocess.STDOUT)
+    except subprocess.CalledProcessError as exc:
+        docker_output = exc.output.decode('utf-8', errors='replace').strip() if exc.output else ''
+        message = (
+            f"Failed to build the build tools image '{image_name}'.\n"
+            f"Attempted: {' '.join(build_cmd)}"
+        )
+        if force_local_only:
+            message += '\nIts packages are downloaded once; run one build without --local-cache to create it.'
+        if docker_output:
+            message += f'\nDocker output:\n{docker_output}'
+        raise Exception(message) from exc
+    print('✓ Build tools image ready')
+    return image_name
+
+
+def create_openrecon_metadata_label(json_data):
     json_string = json.dumps(json_data, indent=2)
     encoded_json = base64.b64encode(json_string.encode('utf-8')).decode('utf-8')
-    label_name = 'com.siemens-healthineers.magneticresonance.openrecon.metadata:1.1.0'
+    return OPENRECON_METADATA_LABEL_NAME, encoded_json
+
+
+def create_openrecon_image_cmd():
+    runtime_command = create_openrecon_python_runtime_command('/tmp/python-ismrmrd-server.log')
+    return ['/bin/bash', '-c', runtime_command]
+
+
+def create_openrecon_bake_command(config_module_names=()):
+    return ['/bin/sh', '-c', 'set -eu\n' + create_openrecon_bake_script(config_module_names)]
+
+
+def write_openrecon_dockerfile(base_docker_image, dockerfile_path, json_data):
+    label_name, encoded_json = create_openrecon_metadata_label(json_data)
     label_str = f'LABEL "{label_name}"="{encoded_json}"'
+    bake_command = create_openrecon_bake_command(get_openrecon_config_module_names(json_data))
 
     with open(dockerfile_path, 'w') as file:
         file.write(f'FROM {base_docker_image}\n')
         file.write(f'{label_str}\n')
-        runtime_command = create_openrecon_python_runtime_command('/tmp/python-ismrmrd-server.log')
-        file.write(f'CMD {json.dumps(["/bin/bash", "-c", runtime_command])}\n')
+        file.write(f'RUN {json.dumps(bake_command)}\n')
+        file.write(f'CMD {json.dumps(create_openrecon_image_cmd())}\n')
 
 
 def detect_docs_file():
@@ -480,6 +1020,39 @@ def get_package_selection():
     return selection
 
 
+def get_openrecon_tar_builder():
+    builder = os.getenv(OPENRECON_TAR_BUILDER_ENV, 'dind').strip().lower()
+    valid_builders = {'dind', 'rewrite'}
+    if builder not in valid_builders:
+        raise ValueError(
+            f'{OPENRECON_TAR_BUILDER_ENV} must be one of {sorted(valid_builders)}, got: {builder}'
+        )
+    return builder
+
+
+def get_openrecon_zip_packager():
+    packager = os.getenv(OPENRECON_ZIP_PACKAGER_ENV, '7z').strip().lower()
+    valid_packagers = {'stream', '7z'}
+    if packager not in valid_packagers:
+        raise ValueError(
+            f'{OPENRECON_ZIP_PACKAGER_ENV} must be one of {sorted(valid_packagers)}, got: {packager}'
+        )
+    return packager
+
+
+def get_openrecon_zip_threads():
+    return get_positive_int_env(OPENRECON_ZIP_THREADS_ENV, os.cpu_count() or 1)
+
+
+def get_compression_profile(env_name='compressionProfile'):
+    from zipStream import get_compression_profile as parse_compression_profile
+
+    try:
+        return parse_compression_profile(os.getenv(env_name))
+    except ValueError as exc:
+        raise ValueError(f'{env_name}: {exc}') from exc
+
+
 def get_fire_bundle_base(vendor, name, version):
     override = os.getenv('fireBundleName')
     if override and override.strip():
@@ -566,8 +1139,7 @@ def create_fire_startup_script_text(fire_server_command):
         mkdir -p "$(dirname "$LOG_PATH")"
         export LOG_PATH
         export FIRE_LOG_PATH="$LOG_PATH"
-        /usr/sbin/ldconfig
-        {create_openrecon_python_resolver_script()}
+        {create_openrecon_runtime_setup_script()}
         if [ "{validation_env_expansion}" = "1" ]; then
 {validation_script}
         fi
@@ -653,79 +1225,83 @@ def determine_output_dir():
         return output_dir
 
 
-def package_with_7z(zip_exe, zip_output_path, inputs, cwd=None):
+def package_with_7z(zip_exe, zip_output_path, inputs, cwd=None, profile='default'):
+    """Zip inputs with 7-Zip, reporting progress from 7-Zip's own progress stream.
+
+    Returns the run's throughput record (bytes in and out, seconds, MB/s and
+    compression ratio).
+    """
+    from zipStream import COMPRESSION_PROFILES, ProgressReporter
+
     if os.path.exists(zip_output_path):
         os.remove(zip_output_path)
 
-    cmd = [zip_exe, 'a', '-tzip', '-mm=Deflate', zip_output_path]
+    cmd = [zip_exe, 'a', '-tzip', '-bsp1', *COMPRESSION_PROFILES[profile]['7z_args'], zip_output_path]
     cmd.extend(inputs)
-    progress_report_interval_seconds = 30
-    progress_report_size_step_bytes = 1024 ** 3
-    progress_report_percent_step = 5
-
-    def get_input_size_bytes(path):
-        if os.path.isdir(path):
-            total = 0
-            for root, _, filenames in os.walk(path):
-                for filename in filenames:
-                    total += os.path.getsize(os.path.join(root, filename))
-            return total
-        return os.path.getsize(path)
 
     base_dir = cwd if cwd is not None else os.getcwd()
-    input_size_bytes = sum(get_input_size_bytes(os.path.join(base_dir, item)) for item in inputs)
-    last_reported_size = -1
-    last_reported_percent = -1
-    last_report_time = time.monotonic()
+    input_size_bytes = sum(get_path_size_bytes(os.path.join(base_dir, item)) for item in inputs)
+    reporter = ProgressReporter('compressing', total_bytes=input_size_bytes, stream=sys.stdout)
+    output_lines = []
+    pending = b''
 
     process = subprocess.Popen(
         cmd,
         cwd=cwd,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
-        text=True,
     )
 
     try:
-        while process.poll() is None:
-            if os.path.exists(zip_output_path):
-                current_size = os.path.getsize(zip_output_path)
-                if current_size > last_reported_size:
-                    now = time.monotonic()
-                    approx_percent = None
-                    should_report = last_reported_size < 0
-
-                    if input_size_bytes > 0:
-                        approx_percent = min(99, int((current_size / input_size_bytes) * 100))
-                        if approx_percent >= last_reported_percent + progress_report_percent_step:
-                            should_report = True
-
-                    if current_size >= last_reported_size + progress_report_size_step_bytes:
-                        should_report = True
-
-                    if now - last_report_time >= progress_report_interval_seconds:
-                        should_report = True
-
-                    if should_report:
-                        if approx_percent is not None:
-                            print(
-                                f'   compressing... {current_size / (1024 ** 3):.2f} GiB written '
-                                f'(approx {approx_percent}% of input size)'
-                            )
-                            last_reported_percent = approx_percent
-                        else:
-                            print(f'   compressing... {current_size / (1024 ** 3):.2f} GiB written')
-                        last_reported_size = current_size
-                        last_report_time = now
-            time.sleep(5)
-
-        output, _ = process.communicate()
-        if process.returncode != 0:
-            raise subprocess.CalledProcessError(process.returncode, cmd, output=output)
+        while True:
+            data = process.stdout.read1(65536)
+            if not data:
+                break
+            segments = SEVEN_ZIP_OUTPUT_SEPARATOR_PATTERN.split(pending + data)
+            pending = segments.pop()
+            for segment in segments:
+                match = SEVEN_ZIP_PROGRESS_PATTERN.match(segment)
+                if match:
+                    reporter.update(input_size_bytes * min(int(match.group(1)), 100) // 100)
+                elif segment.strip():
+                    output_lines.append(segment.decode('utf-8', errors='replace'))
+        if pending.strip():
+            output_lines.append(pending.decode('utf-8', errors='replace'))
+
+        if process.wait() != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd, output='\n'.join(output_lines))
     finally:
         if process.stdout:
             process.stdout.close()
 
+    return reporter.finish(input_size_bytes, os.path.getsize(zip_output_path))
+
+
+def record_packaging_run(build_report, name, engine, record, profile=None):
+    """Add a packaging throughput record to the build report."""
+    entry = {'name': name, 'engine': engine, 'profile': profile, **record}
+    if build_report is not None:
+        build_report.setdefault('packaging', []).append(entry)
+    return entry
+
+
+def get_streamed_zip_record(build_report, phase_name='openrecon-save', output_metric='openrecon-zip-bytes'):
+    """Build a packaging record from the phase that streamed docker save into the zip."""
+    phase = next(
+        (phase for phase in build_report['phases'] if phase['name'] == phase_name and phase['status'] == 'ok'),
+        None,
+    )
+    if phase is None or 'bytes' not in phase:
+        return None
+    output_bytes = build_report.get('metrics', {}).get(output_metric)
+    return {
+        'input_bytes': phase['bytes'],
+        'output_bytes': output_bytes,
+        'seconds': phase['duration_seconds'],
+        'throughput_mb_per_second': phase.get('throughput_mb_per_second'),
+        'ratio': round(output_bytes / phase['bytes'], 4) if output_bytes and phase['bytes'] else None,
+    }
+
 
 def get_path_size_bytes(path):
     if os.path.isdir(path):
@@ -737,6 +1313,105 @@ def get_path_size_bytes(path):
     return os.path.getsize(path)
 
 
+def get_path_allocated_bytes(path):
+    if os.path.isdir(path):
+        total = 0
+        for root, _, filenames in os.walk(path):
+            for filename in filenames:
+                total += os.lstat(os.path.join(root, filename)).st_blocks * 512
+        return total
+    return os.lstat(path).st_blocks * 512
+
+
+def iter_file_data_ranges(fd, size):
+    """Yield (offset, length) for the data regions of a file, skipping holes.
+
+    Falls back to a single range covering the whole file when the platform or
+    filesystem does not support SEEK_DATA/SEEK_HOLE.
+    """
+    if not hasattr(os, 'SEEK_DATA') or not hasattr(os, 'SEEK_HOLE'):
+        yield 0, size
+        return
+
+    offset = 0
+    while offset < size:
+        try:
+            data_start = os.lseek(fd, offset, os.SEEK_DATA)
+        except OSError as exc:
+            if exc.errno == errno.ENXIO:
+                return
+            if offset == 0:
+                yield 0, size
+                return
+            raise
+        data_end = os.lseek(fd, data_start, os.SEEK_HOLE)
+        yield data_start, data_end - data_start
+        offset = data_end
+
+
+def copy_sparse_file(source_path, target_path, chunk_size=8 * 1024 * 1024):
+    """Copy a file's data regions only, so holes stay holes in the target."""
+    with open(source_path, 'rb') as source, open(target_path, 'wb') as target:
+        size = os.fstat(source.fileno()).st_size
+        for offset, length in iter_file_data_ranges(source.fileno(), size):
+            source.seek(offset)
+            target.seek(offset)
+            remaining = length
+            while remaining > 0:
+                chunk = source.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                target.write(chunk)
+                remaining -= len(chunk)
+        target.truncate(size)
+    return target_path
+
+
+def copy2_sparse(source_path, target_path):
+    """shutil.copy2 replacement that preserves holes in sparse files."""
+    if os.path.isdir(target_path):
+        target_path = os.path.join(target_path, os.path.basename(source_path))
+    if os.path.islink(source_path):
+        return shutil.copy2(source_path, target_path, follow_symlinks=False)
+    copy_sparse_file(source_path, target_path)
+    shutil.copystat(source_path, target_path)
+    return target_path
+
+
+def reflink_file(source_path, target_path):
+    """Clone source into target sharing extents (btrfs, XFS); False if unsupported."""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    with open(source_path, 'rb') as source, open(target_path, 'wb') as target:
+        try:
+            fcntl.ioctl(target.fileno(), FICLONE_IOCTL, source.fileno())
+        except OSError:
+            cloned = False
+        else:
+            cloned = True
+    if not cloned:
+        os.remove(target_path)
+        return False
+    shutil.copystat(source_path, target_path)
+    return True
+
+
+def move_file(source_path, target_path):
+    """Move a file without copying its data when source and target share a filesystem."""
+    try:
+        os.replace(source_path, target_path)
+        return target_path
+    except OSError as exc:
+        if exc.errno != errno.EXDEV:
+            raise
+    if not reflink_file(source_path, target_path):
+        copy2_sparse(source_path, target_path)
+    os.remove(source_path)
+    return target_path
+
+
 def remove_platform_metadata_files(path):
     if not os.path.isdir(path):
         return
@@ -993,7 +1668,7 @@ def write_fire_workflow_files(ice_dir, recipe_dir, workflow_base, default_config
             target_path.write_text(generated_text)
 
 
-def build_fire_bundle_stage(stage_dir, fire_img_path, fire_ini_name, fire_ini_text, install_text, docs_source_path, json_data, package_name, recipe_dir=None):
+def build_fire_bundle_stage(stage_dir, fire_img_path, fire_ini_name, fire_ini_text, install_text, docs_source_path, json_data, package_name, recipe_dir=None, move_image=False):
     if recipe_dir is None:
         recipe_dir = Path.cwd()
 
@@ -1020,7 +1695,10 @@ def build_fire_bundle_stage(stage_dir, fire_img_path, fire_ini_name, fire_ini_te
 
     (fire_dir / fire_ini_name).write_text(fire_ini_text)
     (stage_dir / 'INSTALL_FIRE.txt').write_text(install_text)
-    shutil.copy2(fire_img_path, chroot_dir / fire_img_path.name)
+    if move_image:
+        move_file(fire_img_path, chroot_dir / fire_img_path.name)
+    else:
+        copy2_sparse(fire_img_path, chroot_dir / fire_img_path.name)
     shutil.copy2(docs_source_path, stage_dir / Path(docs_source_path).name)
     readme_source_path = recipe_dir / 'README.md'
     if readme_source_path.is_file():
@@ -1032,194 +1710,697 @@ def build_fire_bundle_stage(stage_dir, fire_img_path, fire_ini_name, fire_ini_te
     write_fire_config_json_files(ice_dir, recipe_dir, json_data)
 
 
+def get_openrecon_cache_root():
+    cache_home = os.getenv('XDG_CACHE_HOME')
+    if cache_home and cache_home.strip():
+        return Path(cache_home.strip()) / 'openrecon'
+    return Path.home() / '.cache' / 'openrecon'
 
-def build_artifacts_in_dind(
-    docker_image_name,
-    dockerfile_path,
-    openrecon_tar_name,
-    fire_img_name,
-    fire_rootfs_tar_name,
-    create_openrecon_package,
-    create_fire_package,
-    use_local_image,
-    base_docker_image,
-    force_local_only,
-    keep_cache,
-    fire_free_space_mb,
-    fire_server_command,
-    startup_script_path,
-    validate_default_runtime,
-    config_module_names,
-):
-    base_image_tar = None
-    if use_local_image:
-        print('Using local base image:', base_docker_image)
-        base_image_tar = '.base_image.tar'
-        is_ci = os.getenv('GITHUB_ACTIONS') or os.getenv('CI')
-        if os.path.exists(base_image_tar):
-            if is_ci:
-                print(f'\n🤖 CI environment detected. Reusing existing {base_image_tar}')
-            elif keep_cache:
-                print(f'\n💾 Reusing existing {base_image_tar} because KEEP_CACHE=true')
-            else:
-                print(f'\n🗑️  Removing existing {base_image_tar} because KEEP_CACHE=false')
-                os.remove(base_image_tar)
 
-        if not os.path.exists(base_image_tar):
-            print(f'💾 Saving base image to {base_image_tar}... (this may take 2-3 minutes)')
-            subprocess.check_output(['docker', 'save', '-o', base_image_tar, base_docker_image], stderr=subprocess.STDOUT)
-            print('✓ Base image saved successfully')
-    else:
-        print('Using remote base image:', base_docker_image)
+def get_image_probe_cache_dir():
+    return get_openrecon_cache_root() / 'image-probes'
 
-    docker_client_image = 'docker:24.0-dind'
-    ensure_dind_image_available(docker_client_image, force_local_only)
 
-    load_image_cmd = ''
-    if use_local_image and base_image_tar:
-        load_image_cmd = textwrap.dedent(
-            f'''\
-            echo "📦 Loading base image from tar file... (this may take 2-3 minutes)"
-            docker load -i /workspace/{base_image_tar}
-            echo "✓ Base image loaded into DinD daemon"
-            '''
-        )
+def get_image_probe_method():
+    method = os.getenv(IMAGE_PROBE_ENV, 'auto').strip().lower()
+    valid_methods = {'auto', 'static', 'container'}
+    if method not in valid_methods:
+        raise ValueError(f'{IMAGE_PROBE_ENV} must be one of {sorted(valid_methods)}, got: {method}')
+    if method == 'auto':
+        # Starting an amd64 container is cheap on amd64 hosts but runs under
+        # emulation elsewhere, where reading the layers is faster.
+        return 'container' if should_run_direct_config_validation() else 'static'
+    return method
 
-    startup_script_rel = startup_script_path.lstrip('/')
-    startup_script_dir_rel = os.path.dirname(startup_script_rel)
-    startup_script_path_quoted = shlex.quote(startup_script_path)
-    startup_script_text = create_fire_startup_script_text(fire_server_command)
-    startup_script_printf_lines = ' \\\n                '.join(
-        shlex.quote(line) for line in startup_script_text.splitlines()
-    )
-    docker_image_name_quoted = shlex.quote(docker_image_name)
-    validate_default_runtime_flag = '1' if validate_default_runtime else '0'
-    config_module_validation_script = create_config_module_validation_script(
-        docker_image_name,
-        config_module_names,
-        run_direct_validation=should_run_direct_config_validation(),
-    )
 
-    artifact_label = 'Docker image'
-    if create_openrecon_package and create_fire_package:
-        artifact_label = 'Docker image, OpenRecon package, and FIRE chroot image'
-    elif create_openrecon_package:
-        artifact_label = 'Docker image and OpenRecon package'
-    elif create_fire_package:
-        artifact_label = 'Docker image and FIRE chroot image'
+def is_build_cache_enabled():
+    return os.getenv(BUILD_CACHE_ENV, 'false').lower() == 'true'
 
-    print('\n' + '=' * 70)
-    print(f'STEP 2/6: Building {artifact_label}')
-    print('=' * 70)
 
-    volume_name = f'docker-build-{uuid.uuid4().hex[:8]}'
-    print(f'📁 Creating temporary Docker volume: {volume_name}')
-    subprocess.check_output(['docker', 'volume', 'create', volume_name], stderr=subprocess.STDOUT)
+def get_build_cache_dir():
+    override = os.getenv(BUILD_CACHE_DIR_ENV)
+    if override and override.strip():
+        return Path(override.strip())
+    return get_openrecon_cache_root() / 'build-cache'
 
-    docker_build_script = textwrap.dedent(
-        f'''\
-        set -eu
 
-        cleanup() {{
-            if command -v mountpoint >/dev/null 2>&1 && [ "${{mounted:-0}}" -eq 1 ] && mountpoint -q "${{mount_dir}}"; then
-                umount "${{mount_dir}}" || true
-            fi
-            if [ -n "${{tmp_container:-}}" ]; then
-                docker rm -f "${{tmp_container}}" >/dev/null 2>&1 || true
-            fi
-        }}
-        trap cleanup EXIT
+def resolve_docker_image_id(image_name):
+    try:
+        output = subprocess.check_output(
+            ['docker', 'image', 'inspect', '--format', '{{.Id}}', image_name],
+            stderr=subprocess.DEVNULL,
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+    image_id = output.decode('utf-8', errors='replace').strip()
+    return image_id or None
 
-        echo "🚀 Starting Docker daemon..."
-        dockerd --host=unix:///var/run/docker.sock --host=tcp://0.0.0.0:2375 &
 
-        timeout=60
-        while ! DOCKER_HOST=unix:///var/run/docker.sock docker version >/dev/null 2>&1; do
-            sleep 2
-            timeout=$((timeout - 2))
-            if [ $timeout -le 0 ]; then
-                echo "❌ Docker daemon failed to start"
-                exit 1
-            fi
-        done
+def update_digest_with_file(digest, label, path):
+    digest.update(f'file:{label}\0'.encode('utf-8'))
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    digest.update(b'\0')
 
-        echo "✓ Docker daemon is ready"
-        export DOCKER_HOST=unix:///var/run/docker.sock
-        {load_image_cmd}
 
-        echo "🔨 Building Docker image..."
-        DOCKER_BUILDKIT=1 BUILDKIT_PROGRESS=plain docker build --progress=plain --platform linux/amd64 -t {docker_image_name} -f {dockerfile_path} ./
-        echo "✓ Docker image built successfully"
-        {config_module_validation_script}
-        if [ "{1 if create_openrecon_package else 0}" = "1" ]; then
-            echo "💾 Saving OpenRecon image tar..."
-            docker save -o /workspace/{openrecon_tar_name} {docker_image_name}
-            chmod 644 /workspace/{openrecon_tar_name}
-            echo "✓ Image saved to {openrecon_tar_name}"
-        fi
+def iter_build_cache_recipe_files(recipe_dir, docs_path):
+    recipe_files = []
+    readme_path = recipe_dir / 'README.md'
+    if readme_path.is_file():
+        recipe_files.append(readme_path)
 
-        if [ "{1 if create_fire_package else 0}" = "1" ]; then
-            echo "📤 Exporting container filesystem for FIRE..."
-            tmp_container="fire-export-$(date +%s)-$$"
-            rootfs_tar_path=/tmp/fire_rootfs_export.tar
-            docker create --name "${{tmp_container}}" {docker_image_name} >/dev/null
-            docker export -o "${{rootfs_tar_path}}" "${{tmp_container}}"
-            docker rm "${{tmp_container}}" >/dev/null
-            tmp_container=""
-            echo "✓ Container filesystem exported to temporary storage"
+    # README.pdf is regenerated by mdpdf on every run and embeds a creation
+    # date, so the rendered README.md stands in for it in the cache key.
+    docs_path = Path(docs_path)
+    if docs_path.is_file() and (docs_path.name != 'README.pdf' or not readme_path.is_file()):
+        recipe_files.append(docs_path)
 
-            echo "🧰 Installing FIRE image creation tools..."
-            apk add --no-cache e2fsprogs util-linux >/dev/null
+    for pattern in ('wip_070_fire_*', 'fire_*.ini', PRUNE_RULES_FILE_NAME):
+        recipe_files.extend(path for path in sorted(recipe_dir.glob(pattern)) if path.is_file())
+    recipe_files.extend(iter_recipe_fire_config_json_overrides(recipe_dir))
+    return recipe_files
 
-            extract_dir=/tmp/fire_rootfs_extract
-            rm -rf "${{extract_dir}}"
-            mkdir -p "${{extract_dir}}"
 
-            echo "📦 Expanding exported filesystem for sizing..."
-            tar -xf "${{rootfs_tar_path}}" -C "${{extract_dir}}"
-            rm -f "${{rootfs_tar_path}}"
+def compute_build_cache_key(json_data, base_image_id, package_selection, docs_path, recipe_dir=None, generator_dir=None):
+    if recipe_dir is None:
+        recipe_dir = Path.cwd()
+    if generator_dir is None:
+        generator_dir = Path(__file__).resolve().parent
+
+    digest = hashlib.sha256()
+    key_inputs = {
+        'label': json_data,
+        'base_image_id': base_image_id,
+        'package_selection': package_selection,
+        'tar_builder': get_openrecon_tar_builder(),
+        'zip_packager': get_openrecon_zip_packager(),
+        'fire_overrides': {name: os.getenv(name) for name in FIRE_OVERRIDE_ENV_NAMES},
+        'prune_overrides': {name: os.getenv(name) for name in PRUNE_ENV_NAMES},
+        'compression_overrides': {name: os.getenv(name) for name in COMPRESSION_PROFILE_ENV_NAMES},
+    }
+    digest.update(json.dumps(key_inputs, sort_keys=True).encode('utf-8'))
 
-            rootfs_bytes=$(du -sb "${{extract_dir}}" | awk '{{print $1}}')
-            rootfs_buffer_bytes=$(( rootfs_bytes / 5 ))
-            img_size_mb=$(( (rootfs_bytes + rootfs_buffer_bytes + 1048575) / 1048576 + {fire_free_space_mb} + 128 ))
-            if [ "$img_size_mb" -le 0 ]; then
-                echo "❌ Computed FIRE image size is invalid"
-                exit 1
-            fi
+    for path in iter_build_cache_recipe_files(Path(recipe_dir), docs_path):
+        update_digest_with_file(digest, f'recipe/{Path(path).name}', path)
 
-            workspace_free_kb=$(df -Pk /workspace | awk 'NR==2 {{print $4}}')
-            workspace_free_bytes=$(( workspace_free_kb * 1024 ))
-            required_img_bytes=$(( img_size_mb * 1048576 ))
-            if [ "$workspace_free_bytes" -lt "$required_img_bytes" ]; then
-                echo "❌ Not enough free space in /workspace to allocate the FIRE chroot image"
-                echo "   Required for image file: $required_img_bytes bytes ($(awk 'BEGIN {{printf \"%.2f\", '"$required_img_bytes"' / 1024 / 1024 / 1024}}') GiB)"
-                echo "   Available in /workspace: $workspace_free_bytes bytes ($(awk 'BEGIN {{printf \"%.2f\", '"$workspace_free_bytes"' / 1024 / 1024 / 1024}}') GiB)"
-                echo "   Try freeing local disk space, choosing a smaller image, or building on a larger filesystem."
-                exit 1
-            fi
+    for filename in BUILD_CACHE_GENERATOR_FILES:
+        generator_path = Path(generator_dir) / filename
+        if generator_path.is_file():
+            update_digest_with_file(digest, f'generator/{filename}', generator_path)
 
-            echo "🧱 Creating FIRE chroot image ({fire_img_name}) with $img_size_mb MiB..."
-            echo "   Expanded rootfs size: $rootfs_bytes bytes"
-            echo "   Added sizing buffer: $rootfs_buffer_bytes bytes + {fire_free_space_mb} MiB free space"
-            dd if=/dev/zero of=/workspace/{fire_img_name} bs=1M count="${{img_size_mb}}" status=none
-            mke2fs -F -t ext3 /workspace/{fire_img_name} >/dev/null 2>&1
-
-            mount_dir=/mnt/fire_chroot_build
-            mounted=0
-            mkdir -p "${{mount_dir}}"
-            mount -o loop /workspace/{fire_img_name} "${{mount_dir}}"
-            mounted=1
-
-            echo "📦 Copying expanded root filesystem into FIRE chroot image..."
-            cp -a "${{extract_dir}}"/. "${{mount_dir}}"/
-            rm -rf "${{extract_dir}}"
+    return digest.hexdigest()
+
+
+def link_or_copy_file(source_path, target_path):
+    try:
+        os.link(source_path, target_path)
+    except OSError:
+        copy2_sparse(source_path, target_path)
+    return target_path
+
+
+def copy_build_output(source_path, target_path):
+    source_path = Path(source_path)
+    target_path = Path(target_path)
+    if target_path.is_dir():
+        shutil.rmtree(target_path)
+    elif target_path.exists():
+        target_path.unlink()
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    if source_path.is_dir():
+        shutil.copytree(source_path, target_path, copy_function=link_or_copy_file)
+    else:
+        link_or_copy_file(source_path, target_path)
+
+
+def read_build_cache_manifest(entry_dir):
+    return json.loads((Path(entry_dir) / BUILD_CACHE_MANIFEST_NAME).read_text())
+
+
+def lookup_build_cache_entry(cache_dir, cache_key):
+    entry_dir = Path(cache_dir) / cache_key
+    if not (entry_dir / BUILD_CACHE_MANIFEST_NAME).is_file():
+        return None
+    try:
+        manifest = read_build_cache_manifest(entry_dir)
+    except (OSError, ValueError):
+        return None
+    for output in manifest.get('outputs', []):
+        if not (entry_dir / output['kind'] / output['name']).exists():
+            return None
+    return entry_dir
+
+
+def store_build_cache_entry(cache_dir, cache_key, outputs, package_selection, cold_start_benchmark=None):
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    entry_dir = cache_dir / cache_key
+    staging_dir = cache_dir / f'.staging-{cache_key}-{uuid.uuid4().hex[:8]}'
+    manifest = {
+        'key': cache_key,
+        'package_selection': package_selection,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'outputs': [],
+    }
+    if cold_start_benchmark is not None:
+        manifest['cold_start_benchmark'] = cold_start_benchmark
+
+    try:
+        for kind, output_path in outputs:
+            output_path = Path(output_path)
+            copy_build_output(output_path, staging_dir / kind / output_path.name)
+            manifest['outputs'].append({'kind': kind, 'name': output_path.name})
+        (staging_dir / BUILD_CACHE_MANIFEST_NAME).write_text(json.dumps(manifest, indent=2) + '\n')
+        if entry_dir.exists():
+            shutil.rmtree(entry_dir)
+        os.replace(staging_dir, entry_dir)
+    finally:
+        if staging_dir.exists():
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    return entry_dir
+
+
+def restore_build_cache_entry(entry_dir, output_dir):
+    entry_dir = Path(entry_dir)
+    manifest = read_build_cache_manifest(entry_dir)
+    restored = []
+    for output in manifest.get('outputs', []):
+        target_path = Path(output_dir) / output['kind'] / output['name']
+        copy_build_output(entry_dir / output['kind'] / output['name'], target_path)
+        restored.append((output['kind'], str(target_path)))
+    return restored
+
+
+def get_dind_builder_mode():
+    mode = os.getenv(DIND_BUILDER_ENV, 'ephemeral').strip().lower()
+    valid_modes = {'ephemeral', 'persistent'}
+    if mode not in valid_modes:
+        raise ValueError(f'{DIND_BUILDER_ENV} must be one of {sorted(valid_modes)}, got: {mode}')
+    return mode
+
+
+def get_persistent_dind_builder_name():
+    name = os.getenv(DIND_BUILDER_NAME_ENV, '').strip()
+    return name or 'openrecon-dind-builder'
+
+
+def get_persistent_dind_builder_volumes(builder_name):
+    return f'{builder_name}-docker', f'{builder_name}-run'
+
+
+def create_persistent_dind_builder_command(builder_name, *docker_args):
+    return ['docker', 'exec', builder_name, 'docker', '-H', DIND_BUILDER_DOCKER_HOST, *docker_args]
+
+
+def is_persistent_dind_builder_healthy(builder_name):
+    try:
+        running = subprocess.check_output(
+            ['docker', 'inspect', '--format', '{{.State.Running}}', builder_name],
+            stderr=subprocess.DEVNULL,
+        ).decode('utf-8', errors='replace').strip()
+        if running != 'true':
+            return False
+        subprocess.check_output(
+            create_persistent_dind_builder_command(builder_name, 'version', '--format', '{{.Server.Version}}'),
+            stderr=subprocess.DEVNULL,
+            timeout=30,
+        )
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
+        return False
+    return True
+
+
+def get_persistent_dind_builder_registry_mirror(builder_name):
+    try:
+        output = subprocess.check_output(
+            ['docker', 'inspect', '--format', f'{{{{index .Config.Labels "{DIND_BUILDER_REGISTRY_MIRROR_LABEL}"}}}}', builder_name],
+            stderr=subprocess.DEVNULL,
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return ''
+    return output.decode('utf-8', errors='replace').strip()
+
+
+def ensure_persistent_dind_builder(builder_name, force_local_only, registry_mirror=None, startup_timeout_seconds=90):
+    mirror_url = registry_mirror['url'] if registry_mirror else ''
+    if is_persistent_dind_builder_healthy(builder_name):
+        if get_persistent_dind_builder_registry_mirror(builder_name) == mirror_url:
+            print(f'♻️  Reusing persistent DinD builder: {builder_name}')
+            return False
+        print(f'🔁 Registry mirror settings changed; recreating persistent DinD builder {builder_name} (image volume is kept)')
+
+    ensure_dind_image_available(DIND_IMAGE, force_local_only)
+    docker_volume, run_volume = get_persistent_dind_builder_volumes(builder_name)
+    network_args = ['--network', registry_mirror['network']] if registry_mirror and registry_mirror['network'] else []
+    print(f'🚀 Starting persistent DinD builder {builder_name} (volume: {docker_volume})...')
+    subprocess.run(['docker', 'rm', '-f', builder_name], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    subprocess.check_output(
+        [
+            'docker', 'run', '-d', '--privileged',
+            '--platform', 'linux/amd64',
+            '--name', builder_name,
+            *network_args,
+            '--label', 'org.neurodesk.openrecon.dind-builder=1',
+            '--label', f'{DIND_BUILDER_REGISTRY_MIRROR_LABEL}={mirror_url}',
+            '-e', 'DOCKER_TLS_CERTDIR=',
+            '-v', f'{docker_volume}:/var/lib/docker',
+            '-v', f'{run_volume}:{DIND_BUILDER_SOCKET_DIR}',
+            DIND_IMAGE,
+            'dockerd', f'--host={DIND_BUILDER_DOCKER_HOST}',
+            *get_registry_mirror_dockerd_args(registry_mirror),
+        ],
+        stderr=subprocess.STDOUT,
+    )
+
+    deadline = time.monotonic() + startup_timeout_seconds
+    while not is_persistent_dind_builder_healthy(builder_name):
+        if time.monotonic() >= deadline:
+            raise Exception(f'Persistent DinD builder {builder_name} did not become healthy within {startup_timeout_seconds}s')
+        time.sleep(2)
+    print(f'✓ Persistent DinD builder {builder_name} is ready')
+    return True
+
+
+def get_persistent_dind_builder_image_id(builder_name, image_name):
+    try:
+        output = subprocess.check_output(
+            create_persistent_dind_builder_command(builder_name, 'image', 'inspect', '--format', '{{.Id}}', image_name),
+            stderr=subprocess.DEVNULL,
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+    return output.decode('utf-8', errors='replace').strip() or None
+
+
+def get_dind_builder_state_path(builder_name):
+    return get_openrecon_cache_root() / 'dind-builder' / f'{builder_name}.json'
+
+
+def load_dind_builder_state(builder_name):
+    state_path = get_dind_builder_state_path(builder_name)
+    try:
+        state = json.loads(state_path.read_text())
+    except (OSError, ValueError):
+        return {'images': {}}
+    state.setdefault('images', {})
+    return state
+
+
+def record_dind_builder_image_use(builder_name, image_names, timestamp=None):
+    if timestamp is None:
+        timestamp = time.time()
+    state = load_dind_builder_state(builder_name)
+    for image_name in image_names:
+        state['images'][image_name] = timestamp
+    state_path = get_dind_builder_state_path(builder_name)
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    # Concurrent builds share the state file; replace it atomically.
+    partial_path = state_path.with_name(f'{state_path.name}.{os.getpid()}.partial')
+    partial_path.write_text(json.dumps(state, indent=2, sort_keys=True) + '\n')
+    os.replace(partial_path, state_path)
+    return state
+
+
+def parse_docker_size(size_text):
+    size_text = size_text.strip().split(' ', 1)[0]
+    units = {
+        'B': 1,
+        'kB': 1000,
+        'KB': 1000,
+        'MB': 1000 ** 2,
+        'GB': 1000 ** 3,
+        'TB': 1000 ** 4,
+    }
+    for unit in sorted(units, key=len, reverse=True):
+        if size_text.endswith(unit):
+            try:
+                return int(float(size_text[:-len(unit)]) * units[unit])
+            except ValueError:
+                break
+    raise ValueError(f'Unrecognized Docker size: {size_text!r}')
+
+
+def get_persistent_dind_builder_usage_bytes(builder_name):
+    output = subprocess.check_output(
+        create_persistent_dind_builder_command(builder_name, 'system', 'df', '--format', '{{.Type}}\t{{.Size}}'),
+        stderr=subprocess.STDOUT,
+    ).decode('utf-8', errors='replace')
+    total = 0
+    for line in output.splitlines():
+        _, separator, size_text = line.partition('\t')
+        if separator and size_text.strip():
+            total += parse_docker_size(size_text)
+    return total
+
+
+def list_persistent_dind_builder_images(builder_name):
+    output = subprocess.check_output(
+        create_persistent_dind_builder_command(builder_name, 'image', 'ls', '--format', '{{.Repository}}:{{.Tag}}'),
+        stderr=subprocess.STDOUT,
+    ).decode('utf-8', errors='replace')
+    return [line.strip() for line in output.splitlines() if line.strip() and '<none>' not in line]
+
+
+def evict_persistent_dind_builder_images(builder_name, max_bytes, keep_images=()):
+    """Prune the persistent builder until its storage fits in max_bytes.
+
+    Dangling images and the build cache are always pruned; tagged images are
+    then removed least-recently-used first, never touching keep_images.
+    """
+    subprocess.run(
+        create_persistent_dind_builder_command(builder_name, 'image', 'prune', '-f'),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    subprocess.run(
+        create_persistent_dind_builder_command(builder_name, 'builder', 'prune', '-f'),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    usage_bytes = get_persistent_dind_builder_usage_bytes(builder_name)
+    if usage_bytes <= max_bytes:
+        return []
+
+    last_used = load_dind_builder_state(builder_name)['images']
+    candidates = sorted(
+        (image for image in list_persistent_dind_builder_images(builder_name) if image not in keep_images),
+        key=lambda image: last_used.get(image, 0),
+    )
+    evicted = []
+    for image in candidates:
+        if usage_bytes <= max_bytes:
+            break
+        print(f'🗑️  Evicting {image} from persistent DinD builder (least recently used)')
+        subprocess.run(
+            create_persistent_dind_builder_command(builder_name, 'rmi', '-f', image),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        evicted.append(image)
+        usage_bytes = get_persistent_dind_builder_usage_bytes(builder_name)
+
+    if usage_bytes > max_bytes:
+        print(
+            f'⚠️  Persistent DinD builder still uses {usage_bytes / 1000 ** 3:.1f} GB '
+            f'(budget {max_bytes / 1000 ** 3:.1f} GB) after eviction'
+        )
+    return evicted
+
+
+def get_registry_mirror_setting():
+    value = os.getenv(REGISTRY_MIRROR_ENV, '').strip()
+    if not value or value.lower() in {'off', 'false', 'none'}:
+        return None
+    if value.lower() == 'managed':
+        return 'managed'
+    if '://' not in value:
+        value = f'http://{value}'
+    parsed = urllib.parse.urlparse(value)
+    if parsed.scheme not in {'http', 'https'} or not parsed.netloc:
+        raise ValueError(f"{REGISTRY_MIRROR_ENV} must be 'managed' or an http(s) registry URL, got: {value}")
+    return f'{parsed.scheme}://{parsed.netloc}'
+
+
+def get_docker_hub_repository(image_name):
+    """Return (repository, tag) for a Docker Hub image, or None otherwise.
+
+    Docker only consults registry mirrors for docker.io, so images from other
+    registries and digest references cannot be served by the mirror.
+    """
+    if '@' in image_name:
+        return None
+    name, separator, tag = image_name.rpartition(':')
+    if not separator or '/' in tag:
+        name, tag = image_name, 'latest'
+
+    domain, separator, remainder = name.partition('/')
+    if separator and ('.' in domain or ':' in domain or domain == 'localhost'):
+        if domain not in DOCKER_HUB_REGISTRY_NAMES:
+            return None
+        name = remainder
+    if '/' not in name:
+        name = f'library/{name}'
+    return name, tag
+
+
+def is_registry_mirror_reachable(push_host):
+    try:
+        with urllib.request.urlopen(f'http://{push_host}/v2/', timeout=5) as response:
+            return response.status == 200
+    except (urllib.error.URLError, OSError):
+        return False
+
+
+def registry_mirror_has_image(push_host, repository, tag):
+    request = urllib.request.Request(
+        f'http://{push_host}/v2/{repository}/manifests/{tag}',
+        method='HEAD',
+        headers={'Accept': ', '.join(REGISTRY_MANIFEST_MEDIA_TYPES)},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status == 200
+    except (urllib.error.URLError, OSError):
+        return False
+
+
+def ensure_managed_registry_mirror(startup_timeout_seconds=60):
+    port = get_positive_int_env(REGISTRY_MIRROR_PORT_ENV, 5000)
+    registry_mirror = {
+        'url': f'http://{REGISTRY_MIRROR_NAME}:5000',
+        'push_host': f'localhost:{port}',
+        'network': REGISTRY_MIRROR_NETWORK,
+    }
+
+    network_check = subprocess.run(
+        ['docker', 'network', 'inspect', REGISTRY_MIRROR_NETWORK],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    if network_check.returncode != 0:
+        subprocess.check_output(['docker', 'network', 'create', REGISTRY_MIRROR_NETWORK], stderr=subprocess.STDOUT)
+
+    try:
+        running = subprocess.check_output(
+            ['docker', 'inspect', '--format', '{{.State.Running}}', REGISTRY_MIRROR_NAME],
+            stderr=subprocess.DEVNULL,
+        ).decode('utf-8', errors='replace').strip()
+    except subprocess.CalledProcessError:
+        running = ''
+
+    if running == 'true':
+        print(f'♻️  Reusing local registry mirror: {REGISTRY_MIRROR_NAME}')
+    else:
+        # The registry image itself must come from the local cache when offline.
+        ensure_dind_image_available(REGISTRY_MIRROR_IMAGE, True)
+        print(f'🚀 Starting local registry mirror {REGISTRY_MIRROR_NAME} on {registry_mirror["push_host"]}...')
+        subprocess.run(['docker', 'rm', '-f', REGISTRY_MIRROR_NAME], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        subprocess.check_output(
+            [
+                'docker', 'run', '-d',
+                '--name', REGISTRY_MIRROR_NAME,
+                '--network', REGISTRY_MIRROR_NETWORK,
+                '--restart', 'unless-stopped',
+                '-p', f'127.0.0.1:{port}:5000',
+                '-v', f'{REGISTRY_MIRROR_NAME}-data:/var/lib/registry',
+                REGISTRY_MIRROR_IMAGE,
+            ],
+            stderr=subprocess.STDOUT,
+        )
 
-            mkdir -p "${{mount_dir}}/dev"
+    deadline = time.monotonic() + startup_timeout_seconds
+    while not is_registry_mirror_reachable(registry_mirror['push_host']):
+        if time.monotonic() >= deadline:
+            raise Exception(f'Local registry mirror did not answer on {registry_mirror["push_host"]} within {startup_timeout_seconds}s')
+        time.sleep(1)
+    return registry_mirror
+
+
+def prepare_registry_mirror():
+    setting = get_registry_mirror_setting()
+    if setting is None:
+        return None
+    if setting == 'managed':
+        return ensure_managed_registry_mirror()
+    return {'url': setting, 'push_host': urllib.parse.urlparse(setting).netloc, 'network': None}
+
+
+def get_registry_mirror_dockerd_args(registry_mirror):
+    if not registry_mirror:
+        return []
+    args = [f'--registry-mirror={registry_mirror["url"]}']
+    if registry_mirror['url'].startswith('http://'):
+        args.append(f'--insecure-registry={urllib.parse.urlparse(registry_mirror["url"]).netloc}')
+    return args
+
+
+def publish_base_image_to_registry_mirror(image_name, registry_mirror, use_local_image):
+    """Make image_name available from the registry mirror.
+
+    Returns False when the mirror cannot serve the image, in which case the
+    caller falls back to loading it into DinD directly.
+    """
+    hub_repository = get_docker_hub_repository(image_name)
+    if hub_repository is None:
+        print(f'⚠️  {image_name} is not a tagged Docker Hub image; the registry mirror cannot serve it')
+        return False
+
+    repository, tag = hub_repository
+    push_host = registry_mirror['push_host']
+    if not use_local_image:
+        if registry_mirror_has_image(push_host, repository, tag):
+            print(f'♻️  Registry mirror already has {image_name}')
+            return True
+        print(f'⬇️  Pulling {image_name} on the host to seed the registry mirror...')
+        try:
+            subprocess.check_output(['docker', 'pull', '--platform', 'linux/amd64', image_name], stderr=subprocess.STDOUT)
+        except subprocess.CalledProcessError as exc:
+            docker_output = exc.output.decode('utf-8', errors='replace').strip() if exc.output else ''
+            raise Exception(
+                f"Base image '{image_name}' is neither in the registry mirror nor pullable.\n"
+                f'Docker output:\n{docker_output}'
+            ) from exc
+
+    mirror_image = f'{push_host}/{repository}:{tag}'
+    print(f'📤 Pushing {image_name} to registry mirror as {mirror_image} (unchanged layers are skipped)...')
+    subprocess.check_output(['docker', 'tag', image_name, mirror_image], stderr=subprocess.STDOUT)
+    try:
+        subprocess.check_output(['docker', 'push', mirror_image], stderr=subprocess.STDOUT)
+    finally:
+        subprocess.run(['docker', 'rmi', mirror_image], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    print('✓ Base image available from registry mirror')
+    return True
+
+
+def create_build_phase_shell_function():
+    return textwrap.dedent(
+        f'''\
+        openrecon_phase() {{
+            echo "{BUILD_PHASE_MARKER} $*"
+        }}
+        '''
+    )
+
+
+def get_prune_rules(recipe_dir=None):
+    """Collect rootfs prune rules from params.sh and the recipe's prune.rules."""
+    from rootfsPrune import parse_prune_rules
+
+    if recipe_dir is None:
+        recipe_dir = Path.cwd()
+    rule_texts = (os.getenv('pruneRules') or '').split()
+    rules_path = Path(recipe_dir) / PRUNE_RULES_FILE_NAME
+    if rules_path.is_file():
+        rule_texts.extend(rules_path.read_text(encoding='utf-8').splitlines())
+    return parse_prune_rules(rule_texts)
+
+
+def create_prune_rule_args(prune_rules):
+    return ' '.join(f'--rule {shlex.quote(rule)}' for rule in prune_rules)
+
+
+def get_prune_report_path(target):
+    return f'.openrecon-prune-{target}.json'
+
+
+def collect_prune_reports(build_report):
+    """Move prune reports written by build containers into the build report."""
+    for target in ('openrecon', 'fire'):
+        report_path = get_prune_report_path(target)
+        if not os.path.isfile(report_path):
+            continue
+        with open(report_path, 'r', encoding='utf-8') as handle:
+            prune_report = json.load(handle)
+        os.remove(report_path)
+        build_report.setdefault('prune', {})[target] = prune_report
+        print(f'✂️  Pruned {prune_report["pruned_bytes"] / 1e6:.1f} MB from the {target} rootfs')
+        for rule, entry in prune_report['rules'].items():
+            print(f'   {rule}: {entry["bytes"] / 1e6:.1f} MB in {entry["members"]} entries')
+
+
+def create_fire_image_writer_script(
+    fire_img_name,
+    fire_free_space_mb,
+    fire_server_command,
+    startup_script_path,
+    validate_default_runtime,
+    shrink_to_fit=False,
+    prune_rules=(),
+    config_module_names=(),
+):
+    """Return shell code defining write_fire_image.
+
+    write_fire_image reads a rootfs tar stream on stdin and the image
+    environment (one NAME=value per line) from the file given as $1. Device
+    nodes, the env script and the startup script are added to the extracted
+    tree, the linker cache, interpreter path and bytecode are baked into it,
+    and it is validated with chroot. fireImageSize.py then sizes the finished
+    tree, which gives mke2fs an exact image size and inode count, and the tree
+    is written into the ext3 image in a single `mke2fs -d` pass, so no loop
+    mount or privileged container is needed.
+    With shrink_to_fit the populated image is shrunk to its minimum size and
+    grown again by exactly fire_free_space_mb. With prune_rules the stream is
+    filtered by rootfsPrune.py before extraction and the config modules are
+    re-validated inside the pruned chroot.
+    """
+    startup_script_rel = startup_script_path.lstrip('/')
+    startup_script_dir_rel = os.path.dirname(startup_script_rel)
+    startup_script_path_quoted = shlex.quote(startup_script_path)
+    startup_script_text = create_fire_startup_script_text(fire_server_command)
+    startup_script_printf_lines = ' \\\n                '.join(
+        shlex.quote(line) for line in startup_script_text.splitlines()
+    )
+    bake_sh = f'set -eu\n. {FIRE_ENV_SCRIPT_PATH}\n' + create_openrecon_bake_script(config_module_names)
+    bake_sh_b64 = base64.b64encode(bake_sh.encode('utf-8')).decode('ascii')
+    validate_default_runtime_flag = '1' if validate_default_runtime else '0'
+    shrink_to_fit_flag = '1' if shrink_to_fit else '0'
+    prune_command = 'cat'
+    config_validation_flag = '0'
+    config_validation_python_b64 = ''
+    config_validation_sh_b64 = ''
+    config_modules_json = "''"
+    if prune_rules:
+        prune_command = (
+            f'python3 {BUILD_TOOLS_DIR}/rootfsPrune.py {create_prune_rule_args(prune_rules)} '
+            f'--report /workspace/{get_prune_report_path("fire")} filter --spill-dir /tmp'
+        )
+        if config_module_names:
+            config_validation_flag = '1'
+            config_validation_python_b64 = base64.b64encode(create_config_module_validation_python().encode('utf-8')).decode('ascii')
+            config_validation_sh = (
+                f'. {FIRE_ENV_SCRIPT_PATH}\n'
+                + 'export PYTHONDONTWRITEBYTECODE=1\n'
+                + create_openrecon_python_resolver_script()
+                + 'cd /opt/code/python-ismrmrd-server\n'
+                + 'exec "$OPENRECON_PYTHON" /tmp/openrecon_config_validation.py "$@"\n'
+            )
+            config_validation_sh_b64 = base64.b64encode(config_validation_sh.encode('utf-8')).decode('ascii')
+            config_modules_json = shlex.quote(json.dumps(list(config_module_names)))
+    return textwrap.dedent(
+        f'''\
+        write_fire_image() {{
+            fire_env_lines="$1"
+
+            extract_dir=/tmp/fire_rootfs_extract
+            sizing_env=/tmp/fire_rootfs_sizing.env
+            rm -rf "${{extract_dir}}" "${{sizing_env}}"
+            mkdir -p "${{extract_dir}}"
+
+            echo "📦 Expanding exported filesystem..."
+            if ! ( set -o pipefail; {prune_command} | tar -xf - -C "${{extract_dir}}" ); then
+                echo "❌ Could not expand the exported filesystem"
+                return 1
+            fi
+
+            mkdir -p "${{extract_dir}}/dev"
             create_chroot_device() {{
                 device_name="$1"
                 device_major="$2"
                 device_minor="$3"
-                device_path="${{mount_dir}}/dev/${{device_name}}"
+                device_path="${{extract_dir}}/dev/${{device_name}}"
                 if [ ! -e "${{device_path}}" ]; then
                     mknod -m 666 "${{device_path}}" c "${{device_major}}" "${{device_minor}}"
                 fi
@@ -1229,68 +2410,856 @@ def build_artifacts_in_dind(
             create_chroot_device random 1 8
             create_chroot_device urandom 1 9
 
-            mkdir -p "${{mount_dir}}/{startup_script_dir_rel}"
-            mkdir -p "${{mount_dir}}/tmp/share/code" "${{mount_dir}}/tmp/share/dependency" "${{mount_dir}}/tmp/share/log"
-            mkdir -p "${{mount_dir}}/etc"
+            mkdir -p "${{extract_dir}}/{startup_script_dir_rel}"
+            mkdir -p "${{extract_dir}}/tmp/share/code" "${{extract_dir}}/tmp/share/dependency" "${{extract_dir}}/tmp/share/log"
+            mkdir -p "${{extract_dir}}/etc"
 
-            fire_env_lines=/tmp/fire_image_env.list
-            docker inspect --format '{{{{range .Config.Env}}}}{{{{println .}}}}{{{{end}}}}' {docker_image_name_quoted} > "${{fire_env_lines}}"
-            sed "/^$/d; s/'/'\\\\''/g; s/^/export '/; s/$/'/" "${{fire_env_lines}}" > "${{mount_dir}}{FIRE_ENV_SCRIPT_PATH}"
-            rm -f "${{fire_env_lines}}"
-            chmod 644 "${{mount_dir}}{FIRE_ENV_SCRIPT_PATH}"
+            sed "/^$/d; s/'/'\\\\''/g; s/^/export '/; s/$/'/" "${{fire_env_lines}}" > "${{extract_dir}}{FIRE_ENV_SCRIPT_PATH}"
+            chmod 644 "${{extract_dir}}{FIRE_ENV_SCRIPT_PATH}"
 
             printf '%s\n' \
                 {startup_script_printf_lines} \
-                > "${{mount_dir}}/{startup_script_rel}"
-            chmod 755 "${{mount_dir}}/{startup_script_rel}"
+                > "${{extract_dir}}/{startup_script_rel}"
+            chmod 755 "${{extract_dir}}/{startup_script_rel}"
 
             echo "🔍 Validating FIRE chroot contents..."
-            if ! chroot "${{mount_dir}}" /bin/sh -c 'test -x /usr/sbin/ldconfig'; then
+            openrecon_phase start fire-validate
+            if ! chroot "${{extract_dir}}" /bin/sh -c 'test -x /usr/sbin/ldconfig'; then
                 echo "❌ FIRE image validation failed: /usr/sbin/ldconfig not found inside the chroot"
-                exit 1
+                return 1
             fi
-            if [ "{validate_default_runtime_flag}" = "1" ] && ! chroot "${{mount_dir}}" /bin/sh -c '. {FIRE_ENV_SCRIPT_PATH} && test -f /opt/code/python-ismrmrd-server/main.py'; then
+            echo "🧊 Baking the linker cache, Python interpreter and bytecode into the FIRE chroot..."
+            echo {bake_sh_b64} | base64 -d > "${{extract_dir}}/tmp/openrecon_bake.sh"
+            if ! chroot "${{extract_dir}}" /bin/sh /tmp/openrecon_bake.sh; then
+                echo "❌ FIRE image validation failed: could not bake the linker cache inside the chroot"
+                return 1
+            fi
+            rm -f "${{extract_dir}}/tmp/openrecon_bake.sh"
+            if [ "{validate_default_runtime_flag}" = "1" ] && ! chroot "${{extract_dir}}" /bin/sh -c '. {FIRE_ENV_SCRIPT_PATH} && test -f /opt/code/python-ismrmrd-server/main.py'; then
                 echo "❌ FIRE image validation failed: /opt/code/python-ismrmrd-server/main.py not found inside the chroot"
-                exit 1
+                return 1
             fi
-            if ! chroot "${{mount_dir}}" /bin/sh -c 'test -x {startup_script_path}'; then
+            if ! chroot "${{extract_dir}}" /bin/sh -c 'test -x {startup_script_path}'; then
                 echo "❌ FIRE image validation failed: generated startup script is missing or not executable"
-                exit 1
+                return 1
             fi
-            if ! chroot "${{mount_dir}}" /bin/sh -c 'OPENRECON_FIRE_VALIDATE_STARTUP=1 "$1"' sh {startup_script_path_quoted}; then
+            if ! chroot "${{extract_dir}}" /bin/sh -c 'OPENRECON_FIRE_VALIDATE_STARTUP=1 "$1"' sh {startup_script_path_quoted}; then
                 echo "❌ FIRE image validation failed: generated startup script cannot resolve its configured executable after sourcing Docker image environment"
-                exit 1
+                return 1
+            fi
+            if [ "{config_validation_flag}" = "1" ]; then
+                echo "🔍 Validating OpenRecon config modules inside the pruned FIRE chroot..."
+                echo {config_validation_python_b64} | base64 -d > "${{extract_dir}}/tmp/openrecon_config_validation.py"
+                echo {config_validation_sh_b64} | base64 -d > "${{extract_dir}}/tmp/openrecon_config_validation.sh"
+                if ! chroot "${{extract_dir}}" /bin/sh /tmp/openrecon_config_validation.sh {config_modules_json}; then
+                    echo "❌ FIRE image validation failed: pruning removed files the OpenRecon config modules need"
+                    return 1
+                fi
+                rm -f "${{extract_dir}}/tmp/openrecon_config_validation.py" "${{extract_dir}}/tmp/openrecon_config_validation.sh"
+            fi
+            openrecon_phase end fire-validate
+
+            echo "📏 Sizing the FIRE image from the baked filesystem..."
+            if ! python3 {BUILD_TOOLS_DIR}/fireImageSize.py --format shell --free-space-mb {fire_free_space_mb} --rootfs-dir "${{extract_dir}}" > "${{sizing_env}}"; then
+                echo "❌ Could not size the FIRE image from the extracted filesystem"
+                return 1
+            fi
+            . "${{sizing_env}}"
+            rm -f "${{sizing_env}}"
+
+            rootfs_bytes="${{fire_apparent_bytes}}"
+            required_img_bytes="${{fire_image_bytes}}"
+            img_size_mb=$(( required_img_bytes / 1048576 ))
+            if [ "$img_size_mb" -le 0 ]; then
+                echo "❌ Computed FIRE image size is invalid"
+                return 1
+            fi
+
+            workspace_free_kb=$(df -Pk /workspace | awk 'NR==2 {{print $4}}')
+            workspace_free_bytes=$(( workspace_free_kb * 1024 ))
+            if [ "$workspace_free_bytes" -lt "$required_img_bytes" ]; then
+                echo "❌ Not enough free space in /workspace to allocate the FIRE chroot image"
+                echo "   Required for image file: $required_img_bytes bytes ($(awk 'BEGIN {{printf \"%.2f\", '"$required_img_bytes"' / 1024 / 1024 / 1024}}') GiB)"
+                echo "   Available in /workspace: $workspace_free_bytes bytes ($(awk 'BEGIN {{printf \"%.2f\", '"$workspace_free_bytes"' / 1024 / 1024 / 1024}}') GiB)"
+                echo "   Try freeing local disk space, choosing a smaller image, or building on a larger filesystem."
+                return 1
+            fi
+
+            echo "🧱 Creating FIRE chroot image ({fire_img_name}) with $img_size_mb MiB..."
+            echo "   Rootfs file data: $rootfs_bytes bytes"
+            echo "   Filesystem blocks: $fire_content_blocks content + $fire_metadata_blocks metadata, plus {fire_free_space_mb} MiB free space"
+            echo "   Inode budget: $fire_inode_count ($fire_inodes used by the rootfs)"
+            openrecon_phase start fire-allocate
+            rm -f /workspace/{fire_img_name}
+            truncate -s "${{required_img_bytes}}" /workspace/{fire_img_name}
+            openrecon_phase end fire-allocate
+            openrecon_phase start fire-populate
+            mke2fs -F -q -t ext3 -b "${{fire_block_size}}" -I 256 -N "${{fire_inode_count}}" -d "${{extract_dir}}" /workspace/{fire_img_name}
+            openrecon_phase end fire-populate "${{rootfs_bytes}}"
+            rm -rf "${{extract_dir}}"
+
+            if [ "{shrink_to_fit_flag}" = "1" ]; then
+                echo "🗜️  Shrinking FIRE chroot image to its contents plus {fire_free_space_mb} MiB..."
+                openrecon_phase start fire-shrink
+                populated_img_bytes=$(stat -c %s /workspace/{fire_img_name})
+                e2fsck_status=0
+                e2fsck -f -y /workspace/{fire_img_name} >/dev/null 2>&1 || e2fsck_status=$?
+                if [ "$e2fsck_status" -gt 1 ]; then
+                    echo "❌ FIRE image filesystem check failed (e2fsck exit code $e2fsck_status)"
+                    return 1
+                fi
+                if ! resize2fs -M /workspace/{fire_img_name} >/dev/null; then
+                    echo "❌ Could not shrink the FIRE image filesystem to its minimum size"
+                    return 1
+                fi
+                min_blocks=$(dumpe2fs -h /workspace/{fire_img_name} | awk -F: '/^Block count:/ {{gsub(/ /, "", $2); print $2}}')
+                if [ -z "$min_blocks" ]; then
+                    echo "❌ Could not read the shrunk FIRE image block count"
+                    return 1
+                fi
+                target_blocks=$(( min_blocks + ({fire_free_space_mb} * 1048576 + fire_block_size - 1) / fire_block_size ))
+                if ! resize2fs /workspace/{fire_img_name} "${{target_blocks}}" >/dev/null; then
+                    echo "❌ Could not grow the FIRE image filesystem by {fire_free_space_mb} MiB"
+                    return 1
+                fi
+                truncate -s $(( target_blocks * fire_block_size )) /workspace/{fire_img_name}
+                shrunk_img_bytes=$(stat -c %s /workspace/{fire_img_name})
+                openrecon_phase metric fire-image-bytes-populated "${{populated_img_bytes}}"
+                openrecon_phase metric fire-image-bytes-shrunk "${{shrunk_img_bytes}}"
+                openrecon_phase end fire-shrink "${{populated_img_bytes}}"
+                echo "   Image size: $populated_img_bytes -> $shrunk_img_bytes bytes"
             fi
 
-            sync
-            umount "${{mount_dir}}"
-            mounted=0
             chmod 644 /workspace/{fire_img_name}
             echo "✓ FIRE chroot image created at {fire_img_name}"
+        }}
+        '''
+    )
+
+
+def build_artifacts_in_dind(
+    docker_image_name,
+    dockerfile_path,
+    openrecon_tar_name,
+    fire_img_name,
+    create_openrecon_package,
+    create_fire_package,
+    use_local_image,
+    base_docker_image,
+    force_local_only,
+    keep_cache,
+    fire_free_space_mb,
+    fire_server_command,
+    startup_script_path,
+    validate_default_runtime,
+    config_module_names,
+    build_report=None,
+    fire_shrink_to_fit=False,
+    prune_rules=(),
+    prune_openrecon=False,
+    openrecon_zip_name=None,
+):
+    registry_mirror = prepare_registry_mirror()
+    persistent_builder_name = None
+    if get_dind_builder_mode() == 'persistent':
+        persistent_builder_name = get_persistent_dind_builder_name()
+        ensure_persistent_dind_builder(persistent_builder_name, force_local_only, registry_mirror=registry_mirror)
+
+    base_image_tar = None
+    base_image_preloaded = False
+    if use_local_image and persistent_builder_name:
+        host_image_id = resolve_docker_image_id(base_docker_image)
+        builder_image_id = get_persistent_dind_builder_image_id(persistent_builder_name, base_docker_image)
+        if host_image_id and host_image_id == builder_image_id:
+            base_image_preloaded = True
+            print('Using local base image:', base_docker_image)
+            print('♻️  Base image is already loaded in the persistent DinD builder; skipping docker save/load')
+
+    pull_from_registry_mirror = False
+    if registry_mirror and not base_image_preloaded:
+        print(f'🪞 Using registry mirror {registry_mirror["url"]} for base image distribution')
+        pull_from_registry_mirror = publish_base_image_to_registry_mirror(base_docker_image, registry_mirror, use_local_image)
+
+    base_image_stream_cmd = None
+    if use_local_image and not base_image_preloaded and not pull_from_registry_mirror:
+        print('Using local base image:', base_docker_image)
+        cached_base_image_tar = '.base_image.tar'
+        is_ci = os.getenv('GITHUB_ACTIONS') or os.getenv('CI')
+        if os.path.exists(cached_base_image_tar):
+            if is_ci:
+                print(f'\n🤖 CI environment detected. Reusing existing {cached_base_image_tar}')
+                base_image_tar = cached_base_image_tar
+            elif keep_cache:
+                print(f'\n💾 Reusing existing {cached_base_image_tar} because KEEP_CACHE=true')
+                base_image_tar = cached_base_image_tar
+            else:
+                print(f'\n🗑️  Removing existing {cached_base_image_tar} because KEEP_CACHE=false')
+                os.remove(cached_base_image_tar)
+
+        if base_image_tar is None and keep_cache:
+            base_image_tar = cached_base_image_tar
+            print(f'💾 Saving base image to {base_image_tar} because KEEP_CACHE=true... (this may take 2-3 minutes)')
+            subprocess.check_output(['docker', 'save', '-o', base_image_tar, base_docker_image], stderr=subprocess.STDOUT)
+            print('✓ Base image saved successfully')
+        elif base_image_tar is None:
+            base_image_stream_cmd = ['docker', 'save', base_docker_image]
+            print('🔀 Streaming base image from the host daemon into DinD (no intermediate tar)')
+    elif not use_local_image:
+        print('Using remote base image:', base_docker_image)
+
+    docker_client_image = ensure_build_tools_image(force_local_only)
+
+    load_image_cmd = ''
+    if pull_from_registry_mirror:
+        load_image_cmd = textwrap.dedent(
+            f'''\
+            echo "🪞 Pulling base image through the registry mirror..."
+            openrecon_phase start base-image-load
+            docker pull --platform linux/amd64 {shlex.quote(base_docker_image)}
+            openrecon_phase end base-image-load
+            echo "✓ Base image pulled into DinD daemon"
+            '''
+        )
+    elif base_image_stream_cmd:
+        load_image_cmd = textwrap.dedent(
+            '''\
+            echo "📦 Loading base image streamed from the host daemon... (this may take 2-3 minutes)"
+            openrecon_phase start base-image-load
+            docker load
+            openrecon_phase end base-image-load
+            echo "✓ Base image loaded into DinD daemon"
+            '''
+        )
+    elif use_local_image and base_image_tar:
+        load_image_cmd = textwrap.dedent(
+            f'''\
+            echo "📦 Loading base image from tar file... (this may take 2-3 minutes)"
+            openrecon_phase start base-image-load
+            docker load -i /workspace/{base_image_tar}
+            openrecon_phase end base-image-load "$(stat -c %s /workspace/{base_image_tar})"
+            echo "✓ Base image loaded into DinD daemon"
+            '''
+        )
+
+    docker_image_name_quoted = shlex.quote(docker_image_name)
+    build_phase_shell_function = create_build_phase_shell_function()
+    fire_image_writer_script = ''
+    if create_fire_package:
+        fire_image_writer_script = create_fire_image_writer_script(
+            fire_img_name,
+            fire_free_space_mb,
+            fire_server_command,
+            startup_script_path,
+            validate_default_runtime,
+            shrink_to_fit=fire_shrink_to_fit,
+            # A squashed OpenRecon image is already pruned.
+            prune_rules=() if prune_openrecon else prune_rules,
+            config_module_names=config_module_names,
+        )
+    config_module_validation_script = create_config_module_validation_script(
+        docker_image_name,
+        config_module_names,
+        run_direct_validation=should_run_direct_config_validation(),
+    )
+
+    artifact_label = 'Docker image'
+    if create_openrecon_package and create_fire_package:
+        artifact_label = 'Docker image, OpenRecon package, and FIRE chroot image'
+    elif create_openrecon_package:
+        artifact_label = 'Docker image and OpenRecon package'
+    elif create_fire_package:
+        artifact_label = 'Docker image and FIRE chroot image'
+
+    print('\n' + '=' * 70)
+    print(f'STEP 2/6: Building {artifact_label}')
+    print('=' * 70)
+
+    if persistent_builder_name:
+        volume_name = None
+        docker_host = DIND_BUILDER_DOCKER_HOST
+        daemon_start_cmd = textwrap.dedent(
+            f'''\
+            echo "♻️  Connecting to persistent Docker daemon ({persistent_builder_name})..."
+            '''
+        )
+    else:
+        volume_name = f'docker-build-{uuid.uuid4().hex[:8]}'
+        print(f'📁 Creating temporary Docker volume: {volume_name}')
+        subprocess.check_output(['docker', 'volume', 'create', volume_name], stderr=subprocess.STDOUT)
+        docker_host = 'unix:///var/run/docker.sock'
+        dockerd_cmd = ' '.join(shlex.quote(arg) for arg in [
+            'dockerd', '--host=unix:///var/run/docker.sock', '--host=tcp://0.0.0.0:2375',
+            *get_registry_mirror_dockerd_args(registry_mirror),
+        ])
+        daemon_start_cmd = textwrap.dedent(
+            f'''\
+            echo "🚀 Starting Docker daemon..."
+            {dockerd_cmd} &
+            '''
+        )
+
+    if openrecon_zip_name:
+        # docker save streams straight into the zip's tar entry, so the
+        # uncompressed image tar never lands on disk.
+        openrecon_save_function = textwrap.dedent(
+            f'''\
+            create_openrecon_image_tar() {{
+                echo "💾 Saving OpenRecon image into {openrecon_zip_name}..."
+                openrecon_phase start openrecon-save
+                saved_bytes=$(set -o pipefail; docker save {docker_image_name} | python3 {BUILD_TOOLS_DIR}/zipStream.py stream --entry-name {openrecon_tar_name} --profile {get_compression_profile()} --threads {get_openrecon_zip_threads()} /workspace/{openrecon_zip_name})
+                openrecon_phase end openrecon-save "${{saved_bytes}}"
+                openrecon_phase metric openrecon-zip-bytes "$(stat -c %s /workspace/{openrecon_zip_name})"
+                chmod 644 /workspace/{openrecon_zip_name}
+                echo "✓ Image saved into {openrecon_zip_name}"
+            }}
+            '''
+        )
+    else:
+        openrecon_save_function = textwrap.dedent(
+            f'''\
+            create_openrecon_image_tar() {{
+                echo "💾 Saving OpenRecon image tar..."
+                openrecon_phase start openrecon-save
+                docker save -o /workspace/{openrecon_tar_name} {docker_image_name}
+                openrecon_phase end openrecon-save "$(stat -c %s /workspace/{openrecon_tar_name})"
+                chmod 644 /workspace/{openrecon_tar_name}
+                echo "✓ Image saved to {openrecon_tar_name}"
+            }}
+            '''
+        )
+
+    docker_build_script = textwrap.dedent(
+        f'''\
+        set -eu
+
+        cleanup() {{
+            if [ -n "${{tmp_container:-}}" ]; then
+                docker rm -f "${{tmp_container}}" >/dev/null 2>&1 || true
+            fi
+        }}
+        trap cleanup EXIT
+
+        {build_phase_shell_function}
+        {fire_image_writer_script}
+        {openrecon_save_function}
+
+        # Runs in a subshell so that its cleanup trap and export container
+        # stay separate from the concurrent OpenRecon save.
+        create_fire_chroot_image() (
+            cleanup() {{
+                if [ -n "${{tmp_container:-}}" ]; then
+                    docker rm -f "${{tmp_container}}" >/dev/null 2>&1 || true
+                fi
+                rm -rf /tmp/fire_rootfs_extract
+            }}
+            trap cleanup EXIT
+            set -o pipefail
+
+            tmp_container="fire-export-$(date +%s)-$$"
+            docker create --name "${{tmp_container}}" {docker_image_name} >/dev/null
+
+            fire_env_lines=/tmp/fire_image_env.list
+            docker inspect --format '{{{{range .Config.Env}}}}{{{{println .}}}}{{{{end}}}}' {docker_image_name_quoted} > "${{fire_env_lines}}"
+
+            echo "📤 Streaming container filesystem into the FIRE image writer..."
+            openrecon_phase start fire-export
+            docker export "${{tmp_container}}" | write_fire_image "${{fire_env_lines}}"
+            openrecon_phase end fire-export
+            rm -f "${{fire_env_lines}}"
+        )
+
+        openrecon_phase start daemon-start
+        {daemon_start_cmd}
+        timeout=60
+        while ! DOCKER_HOST={docker_host} docker version >/dev/null 2>&1; do
+            sleep 2
+            timeout=$((timeout - 2))
+            if [ $timeout -le 0 ]; then
+                echo "❌ Docker daemon failed to start"
+                exit 1
+            fi
+        done
+
+        echo "✓ Docker daemon is ready"
+        openrecon_phase end daemon-start
+        export DOCKER_HOST={docker_host}
+        {load_image_cmd}
+
+        echo "🔨 Building Docker image..."
+        openrecon_phase start docker-build
+        DOCKER_BUILDKIT=1 BUILDKIT_PROGRESS=plain docker build --progress=plain --platform linux/amd64 -t {docker_image_name} -f {dockerfile_path} ./
+        openrecon_phase end docker-build
+        echo "✓ Docker image built successfully"
+        if [ "{1 if prune_openrecon and prune_rules else 0}" = "1" ]; then
+            echo "✂️  Pruning the OpenRecon image into a single squashed layer..."
+            openrecon_phase start openrecon-prune
+            python3 {BUILD_TOOLS_DIR}/rootfsPrune.py {create_prune_rule_args(prune_rules)} --report /workspace/{get_prune_report_path('openrecon')} squash {docker_image_name_quoted}
+            openrecon_phase end openrecon-prune
+        fi
+        openrecon_phase start config-validation
+        {config_module_validation_script}
+        openrecon_phase end config-validation
+
+        # The OpenRecon save and the FIRE export only read the built image, so
+        # both artifact pipelines run concurrently.
+        openrecon_pid=""
+        fire_pid=""
+        if [ "{1 if create_openrecon_package else 0}" = "1" ]; then
+            create_openrecon_image_tar &
+            openrecon_pid=$!
+        fi
+        if [ "{1 if create_fire_package else 0}" = "1" ]; then
+            create_fire_chroot_image &
+            fire_pid=$!
+        fi
+
+        artifact_failures=0
+        if [ -n "${{openrecon_pid}}" ] && ! wait "${{openrecon_pid}}"; then
+            echo "❌ OpenRecon image tar creation failed"
+            artifact_failures=$((artifact_failures + 1))
+        fi
+        if [ -n "${{fire_pid}}" ] && ! wait "${{fire_pid}}"; then
+            echo "❌ FIRE chroot image creation failed"
+            artifact_failures=$((artifact_failures + 1))
+        fi
+        if [ "$artifact_failures" -gt 0 ]; then
+            exit 1
         fi
         '''
     )
 
+    if persistent_builder_name:
+        daemon_run_args = ['-v', f'{get_persistent_dind_builder_volumes(persistent_builder_name)[1]}:{DIND_BUILDER_SOCKET_DIR}']
+    else:
+        daemon_run_args = ['-v', f'{volume_name}:/var/lib/docker']
+        if registry_mirror and registry_mirror['network']:
+            daemon_run_args += ['--network', registry_mirror['network']]
+
     dind_run_args = [
         'docker', 'run', '--rm', '--privileged',
+        *(['-i'] if base_image_stream_cmd else []),
         '--platform', 'linux/amd64',
-        '-v', f'{volume_name}:/var/lib/docker',
+        *daemon_run_args,
         '-v', f'{os.getcwd()}:/workspace',
+        '-v', f'{Path(__file__).resolve().parent}:{BUILD_TOOLS_DIR}:ro',
         '-w', '/workspace',
         docker_client_image,
         'sh', '-c', docker_build_script,
     ]
 
     try:
-        run_dind_build_process(dind_run_args)
+        run_dind_build_process(dind_run_args, stdin_command=base_image_stream_cmd, build_report=build_report)
     finally:
-        print(f'\n🗑️  Cleaning up temporary Docker volume: {volume_name}')
-        subprocess.run(['docker', 'volume', 'rm', '-f', volume_name], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if volume_name:
+            print(f'\n🗑️  Cleaning up temporary Docker volume: {volume_name}')
+            subprocess.run(['docker', 'volume', 'rm', '-f', volume_name], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    if persistent_builder_name:
+        used_images = [base_docker_image, docker_image_name]
+        record_dind_builder_image_use(persistent_builder_name, used_images)
+        if os.getenv(DIND_BUILDER_EVICTION_ENV, 'true').lower() == 'true':
+            max_bytes = get_positive_int_env(DIND_BUILDER_MAX_GB_ENV, 200) * 1000 ** 3
+            try:
+                evict_persistent_dind_builder_images(persistent_builder_name, max_bytes, keep_images=used_images)
+            except (subprocess.CalledProcessError, ValueError) as exc:
+                print(f'⚠️  Could not apply the persistent DinD builder eviction policy: {exc}')
+        else:
+            print(f'ℹ️  Persistent DinD builder eviction deferred ({DIND_BUILDER_EVICTION_ENV}=false)')
 
     return base_image_tar
 
 
+def get_host_docker_socket_path():
+    docker_host = os.getenv('DOCKER_HOST', '')
+    if docker_host.startswith('unix://'):
+        return docker_host[len('unix://'):]
+    return '/var/run/docker.sock'
+
+
+def run_host_config_module_validation(docker_image_name, config_module_names, force_local_only):
+    ensure_dind_image_available(DIND_IMAGE, force_local_only)
+    config_module_validation_script = create_config_module_validation_script(
+        docker_image_name,
+        config_module_names,
+        run_direct_validation=should_run_direct_config_validation(),
+    )
+    socket_path = get_host_docker_socket_path()
+    run_dind_build_process([
+        'docker', 'run', '--rm',
+        '--platform', 'linux/amd64',
+        '-v', f'{socket_path}:/var/run/docker.sock',
+        DIND_IMAGE,
+        'sh', '-c', 'set -eu\n' + config_module_validation_script,
+    ])
+
+
+def build_fire_image_without_dind(
+    base_docker_image,
+    fire_img_name,
+    fire_free_space_mb,
+    fire_server_command,
+    startup_script_path,
+    validate_default_runtime,
+    force_local_only,
+    build_report=None,
+    shrink_to_fit=False,
+    prune_rules=(),
+    config_module_names=(),
+):
+    print('\n' + '=' * 70)
+    print('STEP 2/6: Building FIRE chroot image from the base image filesystem')
+    print('=' * 70)
+
+    # The rewritten OpenRecon image only changes the base image config, so the
+    # FIRE rootfs and environment are exactly those of the base image.
+    env_output = subprocess.check_output(
+        ['docker', 'image', 'inspect', '--format', '{{json .Config.Env}}', base_docker_image],
+        stderr=subprocess.STDOUT,
+    ).decode('utf-8', errors='replace')
+    env_lines = json.loads(env_output) or []
+    env_printf_args = ' '.join(shlex.quote(line) for line in env_lines) or "''"
+
+    writer_script = create_fire_image_writer_script(
+        fire_img_name,
+        fire_free_space_mb,
+        fire_server_command,
+        startup_script_path,
+        validate_default_runtime,
+        shrink_to_fit=shrink_to_fit,
+        prune_rules=prune_rules,
+        config_module_names=config_module_names,
+    )
+    script = (
+        'set -eu\n'
+        + create_build_phase_shell_function()
+        + writer_script
+        + textwrap.dedent(
+            f'''\
+            fire_env_lines=/tmp/fire_image_env.list
+            printf '%s\\n' {env_printf_args} > "${{fire_env_lines}}"
+            openrecon_phase start fire-export
+            write_fire_image "${{fire_env_lines}}"
+            openrecon_phase end fire-export
+            '''
+        )
+    )
+
+    tools_image = ensure_build_tools_image(force_local_only)
+    export_container = subprocess.check_output(
+        ['docker', 'create', '--platform', 'linux/amd64', base_docker_image],
+        stderr=subprocess.STDOUT,
+    ).decode('utf-8', errors='replace').strip()
+    print('📤 Streaming base image filesystem into an unprivileged FIRE image writer...')
+    try:
+        run_dind_build_process(
+            [
+                'docker', 'run', '--rm', '-i',
+                '--platform', 'linux/amd64',
+                '-v', f'{os.getcwd()}:/workspace',
+                '-v', f'{Path(__file__).resolve().parent}:{BUILD_TOOLS_DIR}:ro',
+                '-w', '/workspace',
+                tools_image,
+                'sh', '-c', script,
+            ],
+            stdin_command=['docker', 'export', export_container],
+            build_report=build_report,
+        )
+    finally:
+        subprocess.run(['docker', 'rm', '-f', export_container], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def build_openrecon_tar_by_rewrite(
+    docker_image_name,
+    openrecon_tar_name,
+    base_docker_image,
+    json_data,
+    use_local_image,
+    force_local_only,
+    openrecon_zip_name=None,
+    build_report=None,
+):
+    from imageArchive import rewrite_image_archive
+
+    print('\n' + '=' * 70)
+    print('STEP 2/6: Building OpenRecon package by rewriting the base image config')
+    print('=' * 70)
+
+    if not use_local_image:
+        if force_local_only:
+            raise Exception(f'{base_docker_image} is not available locally and local-only mode is enabled')
+        print(f'📥 Pulling base image {base_docker_image}...')
+        subprocess.check_output(['docker', 'pull', '--platform', 'linux/amd64', base_docker_image], stderr=subprocess.STDOUT)
+
+    label_name, encoded_json = create_openrecon_metadata_label(json_data)
+    output_name = openrecon_zip_name or openrecon_tar_name
+    partial_output_name = output_name + '.partial'
+    save_cmd = ['docker', 'save', base_docker_image]
+    print(f'💾 Streaming {base_docker_image} into {output_name} with a rewritten image config...')
+    save_process = subprocess.Popen(save_cmd, stdout=subprocess.PIPE)
+    try:
+        with open(partial_output_name, 'wb') as target:
+            if openrecon_zip_name:
+                from zipStream import COMPRESSION_PROFILES, ProgressReporter, StreamingZipWriter
+
+                compression_profile = get_compression_profile()
+                level = COMPRESSION_PROFILES[compression_profile]['level']
+                reporter = ProgressReporter(f'compressing {openrecon_tar_name}', stream=sys.stdout)
+                with StreamingZipWriter(target) as archive, \
+                        archive.open_entry(
+                            openrecon_tar_name,
+                            compress=level > 0,
+                            level=level,
+                            threads=get_openrecon_zip_threads(),
+                            progress=reporter.update,
+                        ) as entry:
+                    image_id = rewrite_image_archive(
+                        save_process.stdout,
+                        entry,
+                        docker_image_name,
+                        labels={label_name: encoded_json},
+                        cmd=create_openrecon_image_cmd(),
+                    )
+                record_packaging_run(
+                    build_report,
+                    'openrecon-zip',
+                    'stream',
+                    reporter.finish(entry.size, entry.compressed_size),
+                    profile=compression_profile,
+                )
+            else:
+                image_id = rewrite_image_archive(
+                    save_process.stdout,
+                    target,
+                    docker_image_name,
+                    labels={label_name: encoded_json},
+                    cmd=create_openrecon_image_cmd(),
+                )
+        save_process.stdout.close()
+        if save_process.wait() != 0:
+            raise subprocess.CalledProcessError(save_process.returncode, save_cmd)
+        os.replace(partial_output_name, output_name)
+        os.chmod(output_name, 0o644)
+    finally:
+        if save_process.poll() is None:
+            save_process.kill()
+            save_process.wait()
+        if os.path.exists(partial_output_name):
+            os.remove(partial_output_name)
+
+    print(f'✓ Image saved to {output_name} ({image_id})')
+    return image_id
+
+
+def discover_recipe_names(recipes_root):
+    return sorted(
+        entry.name
+        for entry in Path(recipes_root).iterdir()
+        if entry.is_dir() and (entry / 'params.sh').is_file() and (entry / 'OpenReconLabel.json').is_file()
+    )
+
+
+def resolve_recipe_names(requested, recipes_root):
+    available = discover_recipe_names(recipes_root)
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    if names == ['all']:
+        return available
+    unknown = sorted(set(names) - set(available))
+    if unknown:
+        raise ValueError(f'Unknown recipes {unknown}; valid recipes are {available}')
+    return list(dict.fromkeys(names))
+
+
+def get_available_memory_bytes():
+    try:
+        with open('/proc/meminfo', 'r') as meminfo:
+            for line in meminfo:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def has_multi_recipe_job_capacity(running_jobs, max_jobs, workspace, disk_bytes_per_job, memory_bytes_per_job):
+    """Return True when another recipe build may start now.
+
+    One build is always allowed so that the queue makes progress; further
+    builds need the per-job disk and memory budgets to be free and the load
+    average to be below the CPU count.
+    """
+    if running_jobs == 0:
+        return True
+    if running_jobs >= max_jobs:
+        return False
+    if shutil.disk_usage(workspace).free < disk_bytes_per_job:
+        return False
+    if hasattr(os, 'getloadavg') and os.getloadavg()[0] >= (os.cpu_count() or 1):
+        return False
+    available_memory = get_available_memory_bytes()
+    if available_memory is not None and available_memory < memory_bytes_per_job:
+        return False
+    return True
+
+
+def create_multi_recipe_build_env(args):
+    env = dict(os.environ)
+    env.update({
+        BUILD_CACHE_ENV: 'true' if args.build_cache else env.get(BUILD_CACHE_ENV, 'false'),
+        DIND_BUILDER_ENV: 'persistent',
+        DIND_BUILDER_EVICTION_ENV: 'false',
+        'BUILD_PACKAGE_SELECTION': args.package_selection,
+        'BUILD_PACKAGE_SELECTION_OVERRIDE': '1',
+    })
+    return env
+
+
+def create_multi_recipe_build_command(args, build_script_path):
+    command = ['/bin/bash', str(build_script_path)]
+    if args.ignore_mdpdf:
+        command.append('--ignore-mdpdf')
+    if args.local_cache:
+        command.append('--local-cache')
+    return command
+
+
+def format_multi_recipe_results(results):
+    header = ('Recipe', 'Result', 'Time', 'Log')
+    rows = [
+        (result['recipe'], result['status'], f'{result["seconds"]:.0f}s', result['log'])
+        for result in results
+    ]
+    widths = [max(len(str(row[index])) for row in [header, *rows]) for index in range(len(header))]
+    lines = ['  '.join(str(value).ljust(widths[index]) for index, value in enumerate(row)).rstrip() for row in [header, *rows]]
+    lines.insert(1, '  '.join('-' * width for width in widths))
+    return '\n'.join(lines)
+
+
+def terminate_process_group(process, timeout=MULTI_RECIPE_TERMINATE_TIMEOUT_SECONDS):
+    """Stop a recipe build and every process in its group, such as docker CLIs.
+
+    The group gets SIGTERM first and, once the build has exited or the timeout
+    has passed, SIGKILL for whatever is left of it.
+    """
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return process.wait()
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        pass
+    with contextlib.suppress(ProcessLookupError):
+        os.killpg(process.pid, signal.SIGKILL)
+    return process.wait()
+
+
+def run_multi_recipe_build(argv):
+    """Build several recipes concurrently against one persistent DinD builder.
+
+    Each recipe runs its own build.sh; the shared builder keeps base layers
+    across recipes and is only pruned once every build has finished.
+    """
+    recipes_root = Path(__file__).resolve().parent
+    parser = argparse.ArgumentParser(description='Build several OpenRecon recipes with a shared DinD builder.')
+    parser.add_argument('--recipes', required=True, help="Comma-separated recipe names, or 'all'")
+    parser.add_argument('--jobs', type=int, default=2, help='Maximum number of concurrent recipe builds (default: 2)')
+    parser.add_argument(
+        '--package-selection',
+        choices=['openrecon', 'fire', 'both'],
+        default=os.getenv('BUILD_PACKAGE_SELECTION', 'openrecon'),
+        help='Packages to create for every recipe',
+    )
+    parser.add_argument('--disk-gb-per-job', type=float, default=20, help='Free disk required before starting another build')
+    parser.add_argument('--memory-gb-per-job', type=float, default=4, help='Available memory required before starting another build')
+    parser.add_argument('--log-dir', default=None, help='Directory for per-recipe build logs')
+    parser.add_argument('--ignore-mdpdf', action='store_true', help='Pass --ignore-mdpdf to every build')
+    parser.add_argument('--local-cache', action='store_true', help='Pass --local-cache to every build')
+    parser.add_argument('--build-cache', action='store_true', help='Enable the build cache for every build')
+    args = parser.parse_args(argv)
+
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+    try:
+        recipe_names = resolve_recipe_names(args.recipes, recipes_root)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    log_dir = Path(args.log_dir) if args.log_dir else get_openrecon_cache_root() / 'build-logs' / time.strftime('%Y%m%d-%H%M%S')
+    log_dir.mkdir(parents=True, exist_ok=True)
+    disk_bytes_per_job = int(args.disk_gb_per_job * 1024 ** 3)
+    memory_bytes_per_job = int(args.memory_gb_per_job * 1024 ** 3)
+
+    print('=' * 70)
+    print(f'MULTI-RECIPE BUILD: {len(recipe_names)} recipe(s), up to {args.jobs} at a time')
+    print('=' * 70)
+    print(f'Logs: {log_dir}')
+
+    builder_name = get_persistent_dind_builder_name()
+    ensure_persistent_dind_builder(builder_name, args.local_cache, registry_mirror=prepare_registry_mirror())
+
+    env = create_multi_recipe_build_env(args)
+    command = create_multi_recipe_build_command(args, recipes_root / 'build.sh')
+    pending = list(recipe_names)
+    running = {}
+    results = {}
+
+    try:
+        while pending or running:
+            while pending and has_multi_recipe_job_capacity(
+                len(running), args.jobs, recipes_root, disk_bytes_per_job, memory_bytes_per_job,
+            ):
+                recipe_name = pending.pop(0)
+                log_path = log_dir / f'{recipe_name}.log'
+                log_file = open(log_path, 'w')
+                print(f'▶️  Starting {recipe_name} (log: {log_path})')
+                process = subprocess.Popen(
+                    command,
+                    cwd=recipes_root / recipe_name,
+                    env=env,
+                    stdin=subprocess.DEVNULL,
+                    stdout=log_file,
+                    stderr=subprocess.STDOUT,
+                    # A group of its own lets an abort stop the docker commands it runs.
+                    start_new_session=True,
+                )
+                running[recipe_name] = (process, log_file, log_path, time.monotonic())
+
+            time.sleep(2)
+            for recipe_name, (process, log_file, log_path, started) in list(running.items()):
+                if process.poll() is None:
+                    continue
+                log_file.close()
+                del running[recipe_name]
+                status = 'ok' if process.returncode == 0 else f'failed ({process.returncode})'
+                results[recipe_name] = {
+                    'recipe': recipe_name,
+                    'status': status,
+                    'seconds': time.monotonic() - started,
+                    'log': str(log_path),
+                }
+                print(f'{"✅" if process.returncode == 0 else "❌"} {recipe_name}: {status}')
+    finally:
+        for process, log_file, _, _ in running.values():
+            terminate_process_group(process)
+            log_file.close()
+
+    max_bytes = get_positive_int_env(DIND_BUILDER_MAX_GB_ENV, 200) * 1000 ** 3
+    try:
+        evict_persistent_dind_builder_images(builder_name, max_bytes)
+    except (subprocess.CalledProcessError, ValueError) as exc:
+        print(f'⚠️  Could not apply the persistent DinD builder eviction policy: {exc}')
+
+    ordered_results = [results[name] for name in recipe_names]
+    print('\n' + '=' * 70)
+    print(format_multi_recipe_results(ordered_results))
+    print('=' * 70)
+    return 0 if all(result['status'] == 'ok' for result in ordered_results) else 1
+
+
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        sys.exit(run_multi_recipe_build(sys.argv[1:]))
+
     jsonFilePath = 'OpenReconLabel.json'
     schemaFilePath = '../OpenReconSchema_1.1.0.json'
     dockerfilePath = 'OpenRecon.dockerfile'
@@ -1301,6 +3270,7 @@ if __name__ == '__main__':
     forceLocalOnly = os.getenv('FORCE_LOCAL_ONLY', 'false').lower() == 'true'
     keepCache = os.getenv('KEEP_CACHE', 'false').lower() == 'true'
     packageSelection = get_package_selection()
+    openreconTarBuilder = get_openrecon_tar_builder()
     createOpenReconPackage = packageSelection in {'openrecon', 'both'}
     createFirePackage = packageSelection in {'fire', 'both'}
 
@@ -1320,10 +3290,19 @@ if __name__ == '__main__':
     if not os.path.isfile(docsFile):
         raise Exception('Could not find documentation file: ' + docsFile)
 
+    openreconZipPackager = get_openrecon_zip_packager()
+    compressionProfile = get_compression_profile('compressionProfile')
+    get_compression_profile('fireCompressionProfile')
+    benchmarkCompression = os.getenv(BENCHMARK_COMPRESSION_ENV, 'false').lower() == 'true'
+    coldStartBudgetSeconds = get_cold_start_budget_seconds()
+    # A configured budget is a regression gate, so it always runs the benchmark.
+    benchmarkColdStart = os.getenv(BENCHMARK_COLD_START_ENV, 'false').lower() == 'true' or coldStartBudgetSeconds is not None
+    benchmarkThroughput = os.getenv(BENCHMARK_THROUGHPUT_ENV, 'false').lower() == 'true'
+    profileResources = os.getenv(PROFILE_RESOURCES_ENV, 'false').lower() == 'true'
     zipExe = None
-    if createOpenReconPackage:
+    if createOpenReconPackage and openreconZipPackager == '7z':
         zipExe = shutil.which('7z')
-    if createOpenReconPackage and zipExe is None:
+    if createOpenReconPackage and openreconZipPackager == '7z' and zipExe is None:
         raise Exception('Could not find 7-Zip executable in PATH. Please download and install 7-Zip')
 
     version = jsonData['general']['version']
@@ -1332,12 +3311,15 @@ if __name__ == '__main__':
 
     openreconBundleBase = f'OpenRecon_{vendor}_{name}_V{version}'
     openreconTarName = openreconBundleBase + '.tar'
+    openreconZipName = openreconBundleBase + '.zip' if openreconZipPackager == 'stream' else None
     openreconPdfName = openreconBundleBase + '.pdf'
     fireBundleBase = get_fire_bundle_base(vendor, name, version)
     fireImgName = fireBundleBase + '.img'
-    fireRootfsTarName = fireBundleBase + '.rootfs.tar'
     fireSearchString = os.getenv('fireSearchString', 'python3').strip() or 'python3'
     fireFreeSpaceMb = parse_int_env('fireFreeSpaceMb', 50)
+    fireShrinkToFit = os.getenv('fireShrinkToFit', 'false').lower() == 'true'
+    pruneRules = get_prune_rules()
+    pruneOpenRecon = bool(pruneRules) and os.getenv('pruneOpenRecon', 'false').lower() == 'true'
     fireHostname = os.getenv('fireHostname', '192.168.2.2').strip() or '192.168.2.2'
     firePort = parse_int_env('firePort', int(jsonData.get('reconstruction', {}).get('port', 9002)))
     fireServerCommand = get_fire_server_command()
@@ -1347,64 +3329,173 @@ if __name__ == '__main__':
     dockerImagename = (f'OpenRecon_{vendor}_{name}:V{version}').lower()
 
     build_start = time.time()
+    build_report = create_build_report(dockerImagename)
     base_image_tar = None
     openrecon_zip_output_path = None
     fire_bundle_output_path = None
+    build_cache_key = None
 
     try:
-        print('=' * 70)
-        print('PRE-BUILD: Checking CUDA version in base image')
-        print('=' * 70)
-        print(f'Base image: {baseDockerImage}')
-        from checkCudaVersion import checkCudaVersionInContainer
-        checkCudaVersionInContainer(baseDockerImage, maxCudaVersion='11.8')
-
-        print('=' * 70)
-        print('PRE-BUILD: Checking user in base image')
-        print('=' * 70)
-        print(f'Base image: {baseDockerImage}')
-        from checkRootUser import checkRootUserInContainer
-        checkRootUserInContainer(baseDockerImage)
-
-        print('=' * 70)
-        print('PRE-BUILD: Checking README.md for PDF rendering issues')
-        print('=' * 70)
-        from checkReadmeIssues import check_readme_file
-        readme_path = 'README.md'
-        if os.path.isfile(readme_path):
-            print(f'Checking {readme_path}...')
-            if not check_readme_file(readme_path):
-                print('\n❌ README.md has issues that need to be fixed')
-                print('   These issues can cause blank PDFs or rendering problems.')
-                raise Exception('README validation failed')
-            print('✅ README.md passed all checks.')
-        else:
-            print('⚠️  No README.md found, skipping check')
+        if is_build_cache_enabled():
+            print('=' * 70)
+            print('BUILD CACHE: Looking up previous build outputs')
+            print('=' * 70)
+            base_image_id = resolve_docker_image_id(baseDockerImage)
+            if base_image_id is None:
+                print(f'ℹ️  {baseDockerImage} is not in the local Docker cache; build cache skipped for this run')
+            else:
+                build_cache_dir = get_build_cache_dir()
+                build_cache_key = compute_build_cache_key(jsonData, base_image_id, packageSelection, docsFile)
+                print(f'Cache directory: {build_cache_dir}')
+                print(f'Cache key: {build_cache_key}')
+                cache_entry_dir = lookup_build_cache_entry(build_cache_dir, build_cache_key)
+                if (
+                    cache_entry_dir is not None
+                    and coldStartBudgetSeconds is not None
+                    and 'cold_start_benchmark' not in read_build_cache_manifest(cache_entry_dir)
+                ):
+                    print('ℹ️  Cached outputs have no cold-start benchmark to check coldStartBudgetSeconds against')
+                    cache_entry_dir = None
+                if cache_entry_dir is not None:
+                    print('✓ Build cache hit; restoring packaged outputs')
+                    output_dir = determine_output_dir()
+                    restored_outputs = restore_build_cache_entry(cache_entry_dir, output_dir)
+                    if coldStartBudgetSeconds is not None:
+                        build_report['cold_start_benchmark'] = check_cached_cold_start_budget(
+                            cache_entry_dir,
+                            coldStartBudgetSeconds,
+                        )
+                    total_time = time.time() - build_start
+                    print('\n' + '=' * 70)
+                    print(f'✅ BUILD RESTORED FROM CACHE in {total_time:.1f} seconds')
+                    print('=' * 70)
+                    for kind, path in restored_outputs:
+                        print(f'📦 {kind} Output: {path}')
+                    print('=' * 70)
+                    sys.exit(0)
+                print('ℹ️  Build cache miss; running the full build')
+
+        with build_phase(build_report, 'pre-build-checks'):
+            print('=' * 70)
+            print('PRE-BUILD: Probing base image')
+            print('=' * 70)
+            print(f'Base image: {baseDockerImage}')
+            from probeImage import probe_image
+            baseImageProbe = probe_image(
+                baseDockerImage,
+                cache_dir=get_image_probe_cache_dir(),
+                method=get_image_probe_method(),
+            )
+            build_report['base_image_probe'] = baseImageProbe
+
+            print('=' * 70)
+            print('PRE-BUILD: Checking CUDA version in base image')
+            print('=' * 70)
+            from checkCudaVersion import checkCudaVersionInContainer
+            checkCudaVersionInContainer(baseDockerImage, maxCudaVersion='11.8', probe=baseImageProbe)
+
+            print('=' * 70)
+            print('PRE-BUILD: Checking user in base image')
+            print('=' * 70)
+            from checkRootUser import checkRootUserInContainer
+            checkRootUserInContainer(baseDockerImage, probe=baseImageProbe)
+
+            print('=' * 70)
+            print('PRE-BUILD: Checking README.md for PDF rendering issues')
+            print('=' * 70)
+            from checkReadmeIssues import check_readme_file
+            readme_path = 'README.md'
+            if os.path.isfile(readme_path):
+                print(f'Checking {readme_path}...')
+                if not check_readme_file(readme_path):
+                    print('\n❌ README.md has issues that need to be fixed')
+                    print('   These issues can cause blank PDFs or rendering problems.')
+                    raise Exception('README validation failed')
+                print('✅ README.md passed all checks.')
+            else:
+                print('⚠️  No README.md found, skipping check')
 
         print('=' * 70)
         print('STEP 1/6: Preparing Docker image build')
         print('=' * 70)
         print('Attempting to create Docker image with tag:', dockerImagename, '...')
         print(f'Package selection inside build.py: {packageSelection}')
-
-        base_image_tar = build_artifacts_in_dind(
-            docker_image_name=dockerImagename,
-            dockerfile_path=dockerfilePath,
-            openrecon_tar_name=openreconTarName,
-            fire_img_name=fireImgName,
-            fire_rootfs_tar_name=fireRootfsTarName,
-            create_openrecon_package=createOpenReconPackage,
-            create_fire_package=createFirePackage,
-            use_local_image=useLocalImage,
-            base_docker_image=baseDockerImage,
-            force_local_only=forceLocalOnly,
-            keep_cache=keepCache,
-            fire_free_space_mb=fireFreeSpaceMb,
-            fire_server_command=fireServerCommand,
-            startup_script_path=startupScriptPath,
-            validate_default_runtime=validateDefaultFireRuntime,
-            config_module_names=get_openrecon_config_module_names(jsonData),
-        )
+        print(f'OpenRecon tar builder: {openreconTarBuilder}')
+
+        for prune_target in ('openrecon', 'fire'):
+            if os.path.exists(get_prune_report_path(prune_target)):
+                os.remove(get_prune_report_path(prune_target))
+
+        rewriteOpenReconTar = createOpenReconPackage and openreconTarBuilder == 'rewrite'
+        if rewriteOpenReconTar and pruneOpenRecon:
+            print('ℹ️  pruneOpenRecon=true needs a squashed image layer; using the DinD builder instead of the tar rewrite')
+            rewriteOpenReconTar = False
+        if rewriteOpenReconTar:
+            with build_phase(build_report, 'openrecon-tar-rewrite') as phase:
+                build_openrecon_tar_by_rewrite(
+                    docker_image_name=dockerImagename,
+                    openrecon_tar_name=openreconTarName,
+                    base_docker_image=baseDockerImage,
+                    json_data=jsonData,
+                    use_local_image=useLocalImage,
+                    force_local_only=forceLocalOnly,
+                    openrecon_zip_name=openreconZipName,
+                    build_report=build_report,
+                )
+                phase['bytes'] = os.path.getsize(openreconZipName or openreconTarName)
+            # The rewritten image shares every layer with the base image, so the
+            # config modules are validated against the base image and the FIRE
+            # image is written from the base image filesystem without DinD.
+            print('🔍 Validating OpenRecon config modules against the base image...')
+            with build_phase(build_report, 'config-validation'):
+                run_host_config_module_validation(
+                    baseDockerImage,
+                    get_openrecon_config_module_names(jsonData),
+                    forceLocalOnly,
+                )
+            if createFirePackage:
+                with build_phase(build_report, 'fire-image'):
+                    build_fire_image_without_dind(
+                        base_docker_image=baseDockerImage,
+                        fire_img_name=fireImgName,
+                        fire_free_space_mb=fireFreeSpaceMb,
+                        fire_server_command=fireServerCommand,
+                        startup_script_path=startupScriptPath,
+                        validate_default_runtime=validateDefaultFireRuntime,
+                        force_local_only=forceLocalOnly,
+                        build_report=build_report,
+                        shrink_to_fit=fireShrinkToFit,
+                        prune_rules=pruneRules,
+                        config_module_names=get_openrecon_config_module_names(jsonData),
+                    )
+        else:
+            with build_phase(build_report, 'dind-build'):
+                base_image_tar = build_artifacts_in_dind(
+                    docker_image_name=dockerImagename,
+                    dockerfile_path=dockerfilePath,
+                    openrecon_tar_name=openreconTarName,
+                    fire_img_name=fireImgName,
+                    create_openrecon_package=createOpenReconPackage,
+                    create_fire_package=createFirePackage,
+                    use_local_image=useLocalImage,
+                    base_docker_image=baseDockerImage,
+                    force_local_only=forceLocalOnly,
+                    keep_cache=keepCache,
+                    fire_free_space_mb=fireFreeSpaceMb,
+                    fire_server_command=fireServerCommand,
+                    startup_script_path=startupScriptPath,
+                    validate_default_runtime=validateDefaultFireRuntime,
+                    config_module_names=get_openrecon_config_module_names(jsonData),
+                    build_report=build_report,
+                    fire_shrink_to_fit=fireShrinkToFit,
+                    prune_rules=pruneRules,
+                    prune_openrecon=pruneOpenRecon,
+                    openrecon_zip_name=openreconZipName,
+                )
+            streamed_zip_record = get_streamed_zip_record(build_report) if openreconZipName else None
+            if streamed_zip_record is not None:
+                record_packaging_run(build_report, 'openrecon-zip', 'stream', streamed_zip_record, profile=compressionProfile)
+        collect_prune_reports(build_report)
 
         print('\n' + '=' * 70)
         print('STEP 3/6: Preparing documentation')
@@ -1427,8 +3518,39 @@ if __name__ == '__main__':
             os.makedirs(openrecon_output_dir, exist_ok=True)
             openrecon_zip_output_path = os.path.join(openrecon_output_dir, openreconBundleBase + '.zip')
             print(f'📦 Packaging OpenRecon bundle into {os.path.basename(openrecon_zip_output_path)}...')
-            package_with_7z(zipExe, openrecon_zip_output_path, [openreconTarName, openreconPdfName])
-            print('✓ OpenRecon package created successfully')
+            with build_phase(build_report, 'openrecon-zip') as phase:
+                if openreconZipName:
+                    from zipStream import append_file_to_zip
+
+                    # The image tar entry was streamed into the zip during the
+                    # build; only the PDF is added here.
+                    append_file_to_zip(openreconZipName, openreconPdfName)
+                    phase['bytes'] = os.path.getsize(openreconZipName)
+                    move_file(openreconZipName, openrecon_zip_output_path)
+                else:
+                    phase['bytes'] = os.path.getsize(openreconTarName) + os.path.getsize(openreconPdfName)
+                    packaging_record = package_with_7z(
+                        zipExe,
+                        openrecon_zip_output_path,
+                        [openreconTarName, openreconPdfName],
+                        profile=compressionProfile,
+                    )
+                    record_packaging_run(build_report, 'openrecon-zip', '7z', packaging_record, profile=compressionProfile)
+            print(f'✓ OpenRecon package created successfully (compression profile: {compressionProfile})')
+            if benchmarkCompression:
+                run_compression_benchmark(build_report, 'openrecon', [openrecon_zip_output_path])
+            if benchmarkColdStart or benchmarkThroughput or profileResources:
+                run_image_benchmarks(
+                    build_report,
+                    dockerImagename,
+                    openrecon_zip_output_path,
+                    openreconTarName,
+                    jsonData,
+                    cold_start=benchmarkColdStart,
+                    throughput=benchmarkThroughput,
+                    resources=profileResources,
+                    budget_seconds=coldStartBudgetSeconds,
+                )
 
         if createFirePackage:
             fire_output_dir = os.path.join(output_dir, 'fire')
@@ -1443,34 +3565,44 @@ if __name__ == '__main__':
                 fire_port=firePort,
             )
             install_text = create_fire_install_text(fireImgName, fireIniName)
-            with tempfile.TemporaryDirectory(dir=os.getcwd(), prefix='fire-bundle-') as stage_dir_str:
-                stage_dir = Path(stage_dir_str)
-                build_fire_bundle_stage(
-                    stage_dir=stage_dir,
-                    fire_img_path=Path(fireImgName),
-                    fire_ini_name=fireIniName,
-                    fire_ini_text=fire_ini_text,
-                    install_text=install_text,
-                    docs_source_path=openreconPdfName,
-                    json_data=jsonData,
-                    package_name=name,
-                    recipe_dir=Path.cwd(),
-                )
-                if os.path.exists(fire_bundle_output_path):
-                    if os.path.isdir(fire_bundle_output_path):
-                        shutil.rmtree(fire_bundle_output_path)
-                    else:
-                        os.remove(fire_bundle_output_path)
-                print(f'📁 Writing FIRE bundle folder to {fire_bundle_output_path}...')
-                shutil.copytree(stage_dir, fire_bundle_output_path)
-                remove_platform_metadata_files(fire_bundle_output_path)
+            with build_phase(build_report, 'fire-bundle') as phase:
+                phase['bytes'] = os.path.getsize(fireImgName)
+                # The bundle is assembled next to its final location and the
+                # image is moved (not copied) into it, so the multi-GB image is
+                # never written again after the FIRE writer produced it.
+                with tempfile.TemporaryDirectory(dir=fire_output_dir, prefix='.fire-bundle-') as stage_parent:
+                    stage_dir = Path(stage_parent) / fireBundleBase
+                    build_fire_bundle_stage(
+                        stage_dir=stage_dir,
+                        fire_img_path=Path(fireImgName),
+                        fire_ini_name=fireIniName,
+                        fire_ini_text=fire_ini_text,
+                        install_text=install_text,
+                        docs_source_path=openreconPdfName,
+                        json_data=jsonData,
+                        package_name=name,
+                        recipe_dir=Path.cwd(),
+                        move_image=True,
+                    )
+                    remove_platform_metadata_files(stage_dir)
+                    if os.path.exists(fire_bundle_output_path):
+                        if os.path.isdir(fire_bundle_output_path):
+                            shutil.rmtree(fire_bundle_output_path)
+                        else:
+                            os.remove(fire_bundle_output_path)
+                    print(f'📁 Writing FIRE bundle folder to {fire_bundle_output_path}...')
+                    os.replace(stage_dir, fire_bundle_output_path)
             print('✓ FIRE bundle folder created successfully')
+            if benchmarkCompression:
+                run_compression_benchmark(build_report, 'fire', [fire_bundle_output_path])
 
         print('\n' + '=' * 70)
         print('STEP 6/6: Cleanup')
         print('=' * 70)
         print('🗑️  Cleaning up temporary files...')
-        for temp_path in [openreconTarName, openreconPdfName, fireImgName, fireRootfsTarName]:
+        for temp_path in [openreconTarName, openreconZipName, openreconPdfName, fireImgName]:
+            if temp_path is None:
+                continue
             try:
                 if os.path.exists(temp_path):
                     os.remove(temp_path)
@@ -1485,6 +3617,24 @@ if __name__ == '__main__':
                 os.remove(base_image_tar)
                 print(f'🗑️  Removed temporary tar file: {base_image_tar}')
 
+        if build_cache_key is not None:
+            cached_outputs = [
+                (kind, path)
+                for kind, path in [('openrecon', openrecon_zip_output_path), ('fire', fire_bundle_output_path)]
+                if path
+            ]
+            try:
+                cache_entry_dir = store_build_cache_entry(
+                    get_build_cache_dir(),
+                    build_cache_key,
+                    cached_outputs,
+                    packageSelection,
+                    cold_start_benchmark=build_report.get('cold_start_benchmark'),
+                )
+                print(f'💾 Stored build outputs in cache: {cache_entry_dir}')
+            except OSError as exc:
+                print(f'⚠️  Could not store build outputs in cache: {exc}')
+
         total_time = time.time() - build_start
         print('\n' + '=' * 70)
         print(f'✅ BUILD COMPLETED SUCCESSFULLY in {total_time:.1f} seconds ({total_time / 60:.1f} minutes)')
@@ -1495,8 +3645,14 @@ if __name__ == '__main__':
             print(f'📦 {label} Output: {path}')
             if os.path.exists(path):
                 size_bytes = get_path_size_bytes(path)
-                size_gb = size_bytes / (1024 ** 3)
-                print(f'📊 {label} Size: {size_gb:.2f} GiB')
+                allocated_bytes = get_path_allocated_bytes(path)
+                build_report.setdefault('outputs', []).append({
+                    'kind': label.lower(),
+                    'path': path,
+                    'apparent_bytes': size_bytes,
+                    'allocated_bytes': allocated_bytes,
+                })
+                print(f'📊 {label} Size: {size_bytes / (1024 ** 3):.2f} GiB (allocated on disk: {allocated_bytes / (1024 ** 3):.2f} GiB)')
         print('=' * 70)
 
     except subprocess.CalledProcessError as e:
@@ -1509,3 +3665,14 @@ if __name__ == '__main__':
     except Exception as e:
         print(f'Build failed: {e}')
         raise
+    finally:
+        try:
+            build_report_path = write_build_report(build_report, get_build_report_path(dockerImagename.replace(':', '_')))
+            print('⏱️  Build phases:')
+            for phase in build_report['phases']:
+                print(f'   {format_build_phase(phase)}')
+            for record in build_report.get('packaging', []):
+                print(f'   {format_packaging_record(record)}')
+            print(f'📝 Build report: {build_report_path}')
+        except OSError as exc:
+            print(f'⚠️  Could not write build report: {exc}')
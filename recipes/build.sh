@@ -8,6 +8,13 @@ REPOSITORY_ROOT=$(cd -- "$BUILD_SCRIPT_DIR/.." && pwd)
 # Command-line options
 IGNORE_MDPDF=false
 FORCE_LOCAL_CACHE=false
+USE_BUILD_CACHE=${OPENRECON_BUILD_CACHE:-false}
+DIND_BUILDER_MODE=${OPENRECON_DIND_BUILDER:-ephemeral}
+REGISTRY_MIRROR=${OPENRECON_REGISTRY_MIRROR:-}
+BENCHMARK_COMPRESSION=${OPENRECON_BENCHMARK_COMPRESSION:-false}
+BENCHMARK_COLD_START=${OPENRECON_BENCHMARK_COLD_START:-false}
+BENCHMARK_THROUGHPUT=${OPENRECON_BENCHMARK_THROUGHPUT:-false}
+PROFILE_RESOURCES=${OPENRECON_PROFILE_RESOURCES:-false}
 BUILD_PACKAGE_SELECTION=${BUILD_PACKAGE_SELECTION:-openrecon}
 
 usage() {
@@ -18,6 +25,20 @@ Options:
   --ignore-mdpdf               Skip README.md -> README.pdf generation
   --local-cache                Force using an already-cached local base Docker image
                                (auto-preloads the DinD bootstrap image if needed)
+  --build-cache                Restore unchanged builds from the local build cache
+                               and store new outputs in it
+  --persistent-builder         Reuse a long-lived DinD builder daemon and its
+                               layer store across builds
+  --registry-mirror[=URL]      Distribute base images to DinD through a registry
+                               mirror (a managed local registry:2 by default)
+  --benchmark-compression      Report the ratio and time of every compression
+                               profile on the finished packages
+  --benchmark-cold-start       Start the built OpenRecon image repeatedly and report
+                               the time until its server accepts a session
+  --benchmark-throughput       Stream synthetic MRD data through every config
+                               module of the built OpenRecon image
+  --profile-resources          Sweep CPU and memory limits on the built OpenRecon
+                               image and compare them with the label's minimums
   -h, --help                   Show this help message
 EOF
 }
@@ -32,6 +53,38 @@ while [[ $# -gt 0 ]]; do
             FORCE_LOCAL_CACHE=true
             shift
             ;;
+        --build-cache)
+            USE_BUILD_CACHE=true
+            shift
+            ;;
+        --persistent-builder)
+            DIND_BUILDER_MODE=persistent
+            shift
+            ;;
+        --registry-mirror)
+            REGISTRY_MIRROR=managed
+            shift
+            ;;
+        --registry-mirror=*)
+            REGISTRY_MIRROR="${1#*=}"
+            shift
+            ;;
+        --benchmark-compression)
+            BENCHMARK_COMPRESSION=true
+            shift
+            ;;
+        --benchmark-cold-start)
+            BENCHMARK_COLD_START=true
+            shift
+            ;;
+        --benchmark-throughput)
+            BENCHMARK_THROUGHPUT=true
+            shift
+            ;;
+        --profile-resources)
+            PROFILE_RESOURCES=true
+            shift
+            ;;
         -h|--help)
             usage
             exit 0
@@ -110,6 +163,14 @@ esac
 export BUILD_PACKAGE_SELECTION
 echo "Package selection: $BUILD_PACKAGE_SELECTION"
 
+export OPENRECON_BUILD_CACHE="$USE_BUILD_CACHE"
+export OPENRECON_DIND_BUILDER="$DIND_BUILDER_MODE"
+export OPENRECON_REGISTRY_MIRROR="$REGISTRY_MIRROR"
+export OPENRECON_BENCHMARK_COMPRESSION="$BENCHMARK_COMPRESSION"
+export OPENRECON_BENCHMARK_COLD_START="$BENCHMARK_COLD_START"
+export OPENRECON_BENCHMARK_THROUGHPUT="$BENCHMARK_THROUGHPUT"
+export OPENRECON_PROFILE_RESOURCES="$PROFILE_RESOURCES"
+
 # Cleanup function to restore backup on exit (including interruptions)
 cleanup() {
     exit_code=$?
@@ -150,7 +211,7 @@ if ! "$PYTHON_BIN" -m pip show packaging &> /dev/null; then
     "$PYTHON_BIN" -m pip install packaging
 fi
 
-if ! command -v 7z &> /dev/null; then
+if [[ "${OPENRECON_ZIP_PACKAGER:-7z}" == "7z" ]] && ! command -v 7z &> /dev/null; then
     # check if on MacOS
     if [[ "$OSTYPE" == "darwin"* ]]; then
     brew install p7zip
@@ -1,27 +1,6 @@
-import re
-import subprocess
 from packaging import version
 
-PYTORCH_CUDA_VERSION_PATTERN = re.compile(r'^\d+(?:\.\d+){1,2}$')
-
-def executeCommandDirectly(command):
-    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-    outputString, _ = process.communicate()
-    exitCode = process.wait()
-    return exitCode, outputString
-
-def _parse_pytorch_cuda_version(outputString):
-    for line in reversed(outputString.splitlines()):
-        value = line.strip()
-        if not value:
-            continue
-        if value in {'TORCH_NOT_FOUND', 'None'}:
-            return None
-        if PYTORCH_CUDA_VERSION_PATTERN.match(value):
-            return value
-    return None
-
-def checkCudaVersionInContainer(dockerImageName, maxCudaVersion="11.8"):
+def checkCudaVersionInContainer(dockerImageName, maxCudaVersion="11.8", probe=None):
     """
     Check CUDA version inside a Docker container.
     Checks both nvcc (CUDA toolkit) and PyTorch CUDA version.
@@ -29,58 +8,32 @@ def checkCudaVersionInContainer(dockerImageName, maxCudaVersion="11.8"):
     Args:
         dockerImageName: Name/tag of the Docker image to check
         maxCudaVersion: Maximum allowed CUDA version (inclusive)
+        probe: Probe document from probeImage.probe_image; the image is
+            probed when it is not given
     
     Raises:
         Exception: If CUDA version is greater than maxCudaVersion or if check fails
     """
     print("### Checking CUDA version in Docker container...")
+    if probe is None:
+        from probeImage import probe_image
+        probe = probe_image(dockerImageName)
     
     cuda_versions_found = []
     
     # Check 1: nvcc version (CUDA toolkit)
     print("#-> Checking CUDA toolkit (nvcc)...")
-    exitCode, outputString = executeCommandDirectly([
-        "docker", "run", "--rm", "--platform", "linux/amd64",
-        dockerImageName,
-        "sh", "-c", "nvcc --version 2>/dev/null || echo 'CUDA_NOT_FOUND'"
-    ])
-    
-    if exitCode != 0:
-        raise Exception(f"#-> Docker command failed: {outputString}")
-    
-    if "CUDA_NOT_FOUND" not in outputString:
-        # Parse CUDA version from nvcc output
-        # Output format: "Cuda compilation tools, release 11.8, V11.8.89"
-        try:
-            for line in outputString.split('\n'):
-                if 'release' in line.lower():
-                    # Extract version number after "release"
-                    parts = line.split('release')
-                    if len(parts) > 1:
-                        version_str = parts[1].split(',')[0].strip()
-                        cuda_versions_found.append(('CUDA Toolkit (nvcc)', version_str))
-                        print(f"   ✓ CUDA Toolkit version: {version_str}")
-                        break
-        except Exception as e:
-            print(f"   ⚠️  Could not parse nvcc version: {e}")
+    if probe.get('nvcc_cuda_version'):
+        cuda_versions_found.append(('CUDA Toolkit (nvcc)', probe['nvcc_cuda_version']))
+        print(f"   ✓ CUDA Toolkit version: {probe['nvcc_cuda_version']}")
     else:
         print("   ℹ️  CUDA toolkit (nvcc) not found")
     
     # Check 2: PyTorch CUDA version
     print("#-> Checking PyTorch CUDA version...")
-    exitCode, outputString = executeCommandDirectly([
-        "docker", "run", "--rm", "--platform", "linux/amd64",
-        dockerImageName,
-        "sh", "-c", "python3 -c 'import torch; print(torch.version.cuda)' 2>/dev/null || echo 'TORCH_NOT_FOUND'"
-    ])
-    
-    if exitCode != 0:
-        raise Exception(f"#-> Docker command failed: {outputString}")
-    
-    torch_cuda_version = _parse_pytorch_cuda_version(outputString)
-    if torch_cuda_version:
-        cuda_versions_found.append(('PyTorch CUDA', torch_cuda_version))
-        print(f"   ✓ PyTorch CUDA version: {torch_cuda_version}")
+    if probe.get('torch_cuda_version'):
+        cuda_versions_found.append(('PyTorch CUDA', probe['torch_cuda_version']))
+        print(f"   ✓ PyTorch CUDA version: {probe['torch_cuda_version']}")
     else:
         print("   ℹ️  PyTorch not found or no CUDA support")
     
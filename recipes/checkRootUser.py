@@ -1,56 +1,29 @@
-import subprocess
-
-def executeCommandDirectly(command):
-    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-    outputString, _ = process.communicate()
-    exitCode = process.wait()
-    return exitCode, outputString
-
-def _parse_user_id(outputString):
-    for line in reversed(outputString.splitlines()):
-        value = line.strip()
-        if value.isdigit():
-            return int(value)
-    raise ValueError(outputString.strip())
-
-def checkRootUserInContainer(dockerImageName):
+def checkRootUserInContainer(dockerImageName, probe=None):
     """
     Check if the default user in the Docker container is root.
     
     Args:
         dockerImageName: Name/tag of the Docker image to check
+        probe: Probe document from probeImage.probe_image; the image is
+            probed when it is not given
     
     Raises:
         Exception: If the user is not root
     """
     print("### Checking user in Docker container...")
+    if probe is None:
+        from probeImage import probe_image
+        probe = probe_image(dockerImageName)
     
     # Check the current user in the container
     print("#-> Checking if container runs as root user...")
-    exitCode, outputString = executeCommandDirectly([
-        "docker", "run", "--rm", "--platform", "linux/amd64",
-        dockerImageName,
-        "sh", "-c", "id -u"
-    ])
-    
-    if exitCode != 0:
-        raise Exception(f"#-> Docker command failed: {outputString}")
+    uid = probe['uid']
+    print(f"   ℹ️  Container user ID: {uid}")
     
-    # Parse the user ID
-    try:
-        uid = _parse_user_id(outputString)
-        print(f"   ℹ️  Container user ID: {uid}")
+    if uid != 0:
+        username = probe.get('username') or "unknown"
         
-        if uid != 0:
-            # Get username for better error message
-            exitCode, usernameOutput = executeCommandDirectly([
-                "docker", "run", "--rm", "--platform", "linux/amd64",
-                dockerImageName,
-                "sh", "-c", "whoami"
-            ])
-            username = usernameOutput.strip() if exitCode == 0 else "unknown"
-            
-            raise Exception(f"""
+        raise Exception(f"""
 ╔══════════════════════════════════════════════════════════════════════════════╗
 ║                              ROOT USER ERROR                                 ║
 ╚══════════════════════════════════════════════════════════════════════════════╝
@@ -65,11 +38,8 @@ Please rebuild your Docker image to run as root user. You may need to:
 
 Build stopped.
 """)
-        
-        print(f"   ✓ Container runs as root user ✓\n")
-        
-    except ValueError as e:
-        raise Exception(f"#-> Could not parse user ID from output: {outputString}. Error: {e}")
+    
+    print(f"   ✓ Container runs as root user ✓\n")
 
 if __name__ == '__main__':
     import sys
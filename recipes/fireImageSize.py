@@ -0,0 +1,292 @@
+import argparse
+import json
+import os
+import posixpath
+import stat
+import sys
+import tarfile
+
+
+# Layout constants for the ext3 images written by `mke2fs -t ext3`. ext3 has
+# no extents, so large files and directories need indirect mapping blocks.
+EXT3_BLOCK_SIZE = 4096
+EXT3_INODE_SIZE = 256
+EXT3_BLOCKS_PER_GROUP = EXT3_BLOCK_SIZE * 8
+EXT3_DIRECT_BLOCKS = 12
+EXT3_FIRST_INODE = 11
+EXT3_FAST_SYMLINK_MAX_BYTES = 59
+EXT3_DIR_ENTRY_HEADER_BYTES = 8
+EXT3_GROUP_DESCRIPTOR_BYTES = 32
+# Default mke2fs bytes-per-inode ratio, used for the inodes of the free space
+# left in the image for runtime files.
+EXT3_BYTES_PER_INODE = 16384
+
+# Entries mke2fs adds to the tree it is given: lost+found and its preallocated
+# directory blocks. A tar stream additionally lacks what the FIRE writer adds
+# after extraction (/dev nodes, the env and startup scripts, /tmp/share), which
+# these cover; the bake output is only counted by scanning the finished tree.
+ADDED_INODES = 32
+ADDED_BLOCKS = 64
+
+# Headroom on top of the computed layout, covering mke2fs allocation choices
+# (block group alignment and htree index blocks) that are not modelled exactly.
+SIZING_SLACK_RATIO = 0.01
+SIZING_SLACK_BYTES = 16 * 1024 * 1024
+
+
+def ceil_div(value, divisor):
+    return -(-value // divisor)
+
+
+def get_indirect_block_count(data_blocks, block_size=EXT3_BLOCK_SIZE):
+    """Return the number of ext3 indirect mapping blocks for a file."""
+    pointers_per_block = block_size // 4
+    remaining = data_blocks - EXT3_DIRECT_BLOCKS
+    if remaining <= 0:
+        return 0
+
+    indirect_blocks = 1
+    remaining -= pointers_per_block
+    if remaining <= 0:
+        return indirect_blocks
+
+    double_capacity = pointers_per_block ** 2
+    double_data = min(remaining, double_capacity)
+    indirect_blocks += 1 + ceil_div(double_data, pointers_per_block)
+    remaining -= double_data
+    if remaining <= 0:
+        return indirect_blocks
+
+    indirect_blocks += 1 + ceil_div(remaining, double_capacity) + ceil_div(remaining, pointers_per_block)
+    return indirect_blocks
+
+
+def get_file_block_count(size, block_size=EXT3_BLOCK_SIZE):
+    data_blocks = ceil_div(size, block_size)
+    return data_blocks + get_indirect_block_count(data_blocks, block_size)
+
+
+def get_dir_entry_bytes(name):
+    name_bytes = len(name.encode('utf-8', errors='surrogateescape'))
+    return (EXT3_DIR_ENTRY_HEADER_BYTES + name_bytes + 3) & ~3
+
+
+def get_directory_block_count(entry_names, block_size=EXT3_BLOCK_SIZE):
+    """Pack directory entries (plus . and ..) into blocks like ext3 does."""
+    blocks = 1
+    used = get_dir_entry_bytes('.') + get_dir_entry_bytes('..')
+    for name in entry_names:
+        entry_bytes = get_dir_entry_bytes(name)
+        if used + entry_bytes > block_size:
+            blocks += 1
+            used = 0
+        used += entry_bytes
+    return blocks + get_indirect_block_count(blocks, block_size)
+
+
+def get_default_journal_blocks(fs_blocks):
+    """Mirror ext2fs_default_journal_size for 4 KiB block filesystems."""
+    if fs_blocks < 32768:
+        return 1024
+    if fs_blocks < 256 * 1024:
+        return 4096
+    if fs_blocks < 512 * 1024:
+        return 8192
+    if fs_blocks < 4096 * 1024:
+        return 16384
+    if fs_blocks < 8192 * 1024:
+        return 32768
+    if fs_blocks < 16384 * 1024:
+        return 65536
+    if fs_blocks < 32768 * 1024:
+        return 131072
+    return 262144
+
+
+def get_reserved_gdt_blocks(fs_blocks, descriptor_blocks, block_size=EXT3_BLOCK_SIZE):
+    """Mirror calc_reserved_gdt_blocks: room to grow 1024x, up to 2^32 blocks.
+
+    With 4 KiB blocks the reservation grows with the image up to about 16 GiB,
+    where it approaches 1024 blocks per backup group.
+    """
+    max_blocks = 0xFFFFFFFF
+    if fs_blocks < max_blocks // 1024:
+        max_blocks = fs_blocks * 1024
+    reserved_groups = ceil_div(max_blocks, EXT3_BLOCKS_PER_GROUP)
+    reserved = ceil_div(reserved_groups, block_size // EXT3_GROUP_DESCRIPTOR_BYTES) - descriptor_blocks
+    return max(0, min(reserved, block_size // 4))
+
+
+def normalize_member_path(name):
+    return posixpath.normpath('/' + name)
+
+
+def scan_rootfs_tar(fileobj):
+    """Read tar headers from a stream and tally what the ext3 image needs.
+
+    Member data is skipped, never extracted. Hard links share their target's
+    inode and blocks; directories are sized from the names they will contain.
+    """
+    directories = {'/': set()}
+    inodes = 1
+    file_blocks = 0
+    apparent_bytes = 0
+
+    def add_directory(path):
+        while path not in directories:
+            directories[path] = set()
+            path = posixpath.dirname(path)
+
+    with tarfile.open(fileobj=fileobj, mode='r|*') as archive:
+        for member in archive:
+            path = normalize_member_path(member.name)
+            if path == '/':
+                continue
+            if member.isdir():
+                add_directory(path)
+                continue
+
+            add_directory(posixpath.dirname(path))
+            directories[posixpath.dirname(path)].add(posixpath.basename(path))
+            if member.islnk():
+                continue
+
+            inodes += 1
+            if member.isfile():
+                apparent_bytes += member.size
+                file_blocks += get_file_block_count(member.size)
+            elif member.issym() and len(member.linkname.encode('utf-8', errors='surrogateescape')) > EXT3_FAST_SYMLINK_MAX_BYTES:
+                file_blocks += 1
+
+    for path in directories:
+        if path != '/':
+            directories[posixpath.dirname(path)].add(posixpath.basename(path))
+
+    inodes += len(directories) - 1
+    directory_blocks = sum(get_directory_block_count(sorted(names)) for names in directories.values())
+    return {
+        'apparent_bytes': apparent_bytes,
+        'file_blocks': file_blocks,
+        'directory_blocks': directory_blocks,
+        'inodes': inodes,
+    }
+
+
+def scan_rootfs_tree(root):
+    """Walk an extracted rootfs and tally what the ext3 image needs.
+
+    Counts the same things as scan_rootfs_tar, from lstat instead of tar
+    headers, so files added to the tree after extraction are included.
+    """
+    inodes = 1
+    file_blocks = 0
+    directory_blocks = 0
+    apparent_bytes = 0
+    seen_links = set()
+
+    def raise_walk_error(error):
+        raise error
+
+    for dirpath, dirnames, filenames in os.walk(root, onerror=raise_walk_error):
+        names = dirnames + filenames
+        directory_blocks += get_directory_block_count(sorted(names))
+        for name in names:
+            path = os.path.join(dirpath, name)
+            info = os.lstat(path)
+            if stat.S_ISDIR(info.st_mode):
+                inodes += 1
+                continue
+            if info.st_nlink > 1:
+                if (info.st_dev, info.st_ino) in seen_links:
+                    continue
+                seen_links.add((info.st_dev, info.st_ino))
+
+            inodes += 1
+            if stat.S_ISREG(info.st_mode):
+                apparent_bytes += info.st_size
+                file_blocks += get_file_block_count(info.st_size)
+            elif stat.S_ISLNK(info.st_mode) and len(os.readlink(os.fsencode(path))) > EXT3_FAST_SYMLINK_MAX_BYTES:
+                file_blocks += 1
+
+    return {
+        'apparent_bytes': apparent_bytes,
+        'file_blocks': file_blocks,
+        'directory_blocks': directory_blocks,
+        'inodes': inodes,
+    }
+
+
+def compute_ext3_image_size(scan, free_space_bytes=0, block_size=EXT3_BLOCK_SIZE):
+    """Return the image byte size and inode count for a scanned rootfs."""
+    content_blocks = scan['file_blocks'] + scan['directory_blocks'] + ADDED_BLOCKS
+    free_blocks = ceil_div(free_space_bytes, block_size)
+    inode_count = EXT3_FIRST_INODE + scan['inodes'] + ADDED_INODES + free_space_bytes // EXT3_BYTES_PER_INODE
+    inode_table_blocks = ceil_div(inode_count * EXT3_INODE_SIZE, block_size)
+
+    fs_blocks = content_blocks + free_blocks + inode_table_blocks
+    for _ in range(8):
+        groups = ceil_div(fs_blocks, EXT3_BLOCKS_PER_GROUP)
+        descriptor_blocks = ceil_div(groups * EXT3_GROUP_DESCRIPTOR_BYTES, block_size)
+        reserved_gdt_blocks = get_reserved_gdt_blocks(fs_blocks, descriptor_blocks, block_size)
+        # Superblock and descriptor backups live in groups 0, 1 and powers
+        # of 3, 5 and 7 (sparse_super); bound them by every group.
+        backup_groups = min(groups, 3 + 3 * max(1, groups.bit_length()))
+        group_metadata_blocks = (
+            groups * 2
+            + backup_groups * (1 + descriptor_blocks + reserved_gdt_blocks)
+        )
+        required = (
+            content_blocks
+            + free_blocks
+            + inode_table_blocks
+            + group_metadata_blocks
+            + get_default_journal_blocks(fs_blocks)
+        )
+        if required <= fs_blocks:
+            break
+        fs_blocks = required
+
+    image_bytes = fs_blocks * block_size
+    image_bytes += int(image_bytes * SIZING_SLACK_RATIO) + SIZING_SLACK_BYTES
+    image_bytes = ceil_div(image_bytes, 1024 * 1024) * 1024 * 1024
+    return {
+        'block_size': block_size,
+        'image_bytes': image_bytes,
+        'inode_count': inode_count,
+        'content_blocks': content_blocks,
+        'metadata_blocks': fs_blocks - content_blocks - free_blocks,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Size an ext3 FIRE image from a rootfs tar stream or directory.')
+    parser.add_argument('--free-space-mb', type=int, default=0, help='Free space to leave in the image, in MiB')
+    parser.add_argument('--format', choices=['json', 'shell'], default='json', help='Output format')
+    parser.add_argument('--rootfs-dir', help='Size this extracted rootfs directory instead of a tar stream')
+    parser.add_argument('source', nargs='?', default='-', help='Input tar path, or - for stdin')
+    args = parser.parse_args(argv)
+
+    if args.rootfs_dir:
+        scan = scan_rootfs_tree(args.rootfs_dir)
+    else:
+        source = sys.stdin.buffer if args.source == '-' else open(args.source, 'rb')
+        try:
+            scan = scan_rootfs_tar(source)
+            # Drain anything after the end-of-archive marker so a tee feeding
+            # this process never sees a broken pipe.
+            while source.read(1024 * 1024):
+                pass
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+
+    result = {**scan, **compute_ext3_image_size(scan, args.free_space_mb * 1024 * 1024)}
+    if args.format == 'shell':
+        for key, value in result.items():
+            print(f'fire_{key}={value}')
+    else:
+        print(json.dumps(result, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,352 @@
+import argparse
+import hashlib
+import io
+import json
+import posixpath
+import sys
+import tarfile
+import time
+
+
+# Image metadata (manifest.json, index.json, repositories, image configs and
+# OCI manifests) is tiny compared to layer blobs. Members up to this size are
+# held in memory until the whole archive has been read; larger members are
+# streamed straight through to the output archive.
+METADATA_MEMBER_MAX_BYTES = 16 * 1024 * 1024
+OCI_BLOB_PREFIX = 'blobs/sha256/'
+OCI_IMAGE_INDEX_MEDIA_TYPES = {
+    'application/vnd.oci.image.index.v1+json',
+    'application/vnd.docker.distribution.manifest.list.v2+json',
+}
+WHITEOUT_PREFIX = '.wh.'
+OPAQUE_WHITEOUT_NAME = '.wh..wh..opq'
+INSPECT_CONTENT_MAX_BYTES = 1024 * 1024
+
+
+def split_repo_tag(repo_tag):
+    name, separator, tag = repo_tag.rpartition(':')
+    if not separator or '/' in tag:
+        return repo_tag, 'latest'
+    return name, tag
+
+
+def get_rfc3339_timestamp(timestamp=None):
+    if timestamp is None:
+        timestamp = time.time()
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(timestamp))
+
+
+def encode_json_blob(data):
+    blob = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return blob, hashlib.sha256(blob).hexdigest()
+
+
+def rewrite_image_config(config, labels=None, cmd=None, created=None):
+    if created is None:
+        created = get_rfc3339_timestamp()
+
+    config = json.loads(json.dumps(config))
+    container_config = config.setdefault('config', {})
+    history = config.setdefault('history', [])
+
+    if labels:
+        container_labels = container_config.get('Labels') or {}
+        container_labels.update(labels)
+        container_config['Labels'] = container_labels
+        label_text = ' '.join(f'{json.dumps(key)}={json.dumps(value)}' for key, value in labels.items())
+        history.append({
+            'created': created,
+            'created_by': f'LABEL {label_text}',
+            'comment': 'openrecon-image-rewrite',
+            'empty_layer': True,
+        })
+
+    if cmd is not None:
+        container_config['Cmd'] = list(cmd)
+        history.append({
+            'created': created,
+            'created_by': f'CMD {json.dumps(list(cmd))}',
+            'comment': 'openrecon-image-rewrite',
+            'empty_layer': True,
+        })
+
+    config['created'] = created
+    return config
+
+
+def new_metadata_member(name, size, mtime):
+    member = tarfile.TarInfo(name)
+    member.size = size
+    member.mode = 0o644
+    member.mtime = int(mtime)
+    return member
+
+
+def add_bytes_member(archive, name, data, mtime):
+    archive.addfile(new_metadata_member(name, len(data), mtime), io.BytesIO(data))
+
+
+def get_single_manifest_entry(manifest):
+    if not isinstance(manifest, list) or len(manifest) != 1:
+        raise ValueError('Expected exactly one image in manifest.json; save a single image per archive')
+    return manifest[0]
+
+
+def rewrite_oci_index(buffered, new_config_name, new_config_blob, repo_tag):
+    index = json.loads(buffered['index.json'][1])
+    manifests = index.get('manifests', [])
+    if len(manifests) != 1:
+        raise ValueError(f'Expected exactly one manifest in index.json, found {len(manifests)}')
+
+    descriptor = manifests[0]
+    if descriptor.get('mediaType') in OCI_IMAGE_INDEX_MEDIA_TYPES:
+        raise ValueError('Multi-platform image indexes are not supported; save a single-platform image')
+
+    old_manifest_name = OCI_BLOB_PREFIX + descriptor['digest'].split(':', 1)[1]
+    if old_manifest_name not in buffered:
+        raise ValueError(f'OCI image manifest {old_manifest_name} is missing from the archive')
+
+    image_manifest = json.loads(buffered[old_manifest_name][1])
+    image_manifest['config']['digest'] = 'sha256:' + new_config_name[len(OCI_BLOB_PREFIX):]
+    image_manifest['config']['size'] = len(new_config_blob)
+    manifest_blob, manifest_hex = encode_json_blob(image_manifest)
+
+    descriptor['digest'] = f'sha256:{manifest_hex}'
+    descriptor['size'] = len(manifest_blob)
+    annotations = descriptor.setdefault('annotations', {})
+    annotations['io.containerd.image.name'] = repo_tag
+    annotations['org.opencontainers.image.ref.name'] = split_repo_tag(repo_tag)[1]
+    index_blob = json.dumps(index, separators=(',', ':')).encode('utf-8')
+
+    return old_manifest_name, {
+        OCI_BLOB_PREFIX + manifest_hex: manifest_blob,
+        'index.json': index_blob,
+    }
+
+
+def rewrite_image_archive(source_fileobj, target_fileobj, repo_tag, labels=None, cmd=None, created=None):
+    """Copy a `docker save` archive while rewriting only its image config.
+
+    Layer blobs are copied through unchanged; the image config, manifest.json,
+    repositories and (for OCI layout archives) index.json and the OCI image
+    manifest are regenerated. Returns the new image ID (config digest).
+    """
+    mtime = time.time()
+    buffered = {}
+
+    with tarfile.open(fileobj=source_fileobj, mode='r|*') as source, \
+            tarfile.open(fileobj=target_fileobj, mode='w|', format=tarfile.PAX_FORMAT) as target:
+        for member in source:
+            if member.isfile() and member.size <= METADATA_MEMBER_MAX_BYTES:
+                buffered[member.name] = (member, source.extractfile(member).read())
+            elif member.isfile():
+                target.addfile(member, source.extractfile(member))
+            else:
+                target.addfile(member)
+
+        if 'manifest.json' not in buffered:
+            raise ValueError('Image archive does not contain manifest.json')
+
+        manifest = json.loads(buffered['manifest.json'][1])
+        entry = get_single_manifest_entry(manifest)
+        old_config_name = entry['Config']
+        if old_config_name not in buffered:
+            raise ValueError(f'Image config {old_config_name} is missing from the archive')
+
+        config = rewrite_image_config(json.loads(buffered[old_config_name][1]), labels=labels, cmd=cmd, created=created)
+        config_blob, config_hex = encode_json_blob(config)
+        is_oci_layout = old_config_name.startswith(OCI_BLOB_PREFIX)
+        new_config_name = OCI_BLOB_PREFIX + config_hex if is_oci_layout else f'{config_hex}.json'
+
+        replaced_names = {old_config_name, 'manifest.json', 'repositories'}
+        generated = {new_config_name: config_blob}
+
+        if is_oci_layout and 'index.json' in buffered:
+            old_manifest_name, oci_blobs = rewrite_oci_index(buffered, new_config_name, config_blob, repo_tag)
+            replaced_names.update({old_manifest_name, 'index.json'})
+            generated.update(oci_blobs)
+
+        entry['Config'] = new_config_name
+        entry['RepoTags'] = [repo_tag]
+        generated['manifest.json'] = json.dumps(manifest, separators=(',', ':')).encode('utf-8')
+
+        if 'repositories' in buffered:
+            repositories = json.loads(buffered['repositories'][1])
+            top_layer_ids = [layer_id for tags in repositories.values() for layer_id in tags.values()]
+            if top_layer_ids:
+                repo_name, tag = split_repo_tag(repo_tag)
+                generated['repositories'] = json.dumps({repo_name: {tag: top_layer_ids[0]}}).encode('utf-8')
+
+        for name, (member, data) in buffered.items():
+            if name in replaced_names or name in generated:
+                continue
+            target.addfile(member, io.BytesIO(data))
+
+        for name, data in generated.items():
+            add_bytes_member(target, name, data, mtime)
+
+    return f'sha256:{config_hex}'
+
+
+def normalize_layer_path(name):
+    return posixpath.normpath('/' + name)
+
+
+def scan_layer_tar(fileobj, tracked_pattern, content_pattern):
+    """Record one layer's whiteouts, symlinks and tracked paths.
+
+    Paths matching tracked_pattern are recorded as present; those also
+    matching content_pattern keep their (small) file content.
+    """
+    layer = {'whiteouts': [], 'opaque_dirs': [], 'symlinks': {}, 'files': {}, 'replaced': set()}
+    with tarfile.open(fileobj=fileobj, mode='r|*') as archive:
+        for member in archive:
+            path = normalize_layer_path(member.name)
+            directory, name = posixpath.split(path)
+            if name == OPAQUE_WHITEOUT_NAME:
+                layer['opaque_dirs'].append(directory)
+                continue
+            if name.startswith(WHITEOUT_PREFIX):
+                layer['whiteouts'].append(posixpath.join(directory, name[len(WHITEOUT_PREFIX):]))
+                continue
+            # Entries that can shadow a lower layer's symlink or tracked file.
+            if member.isdir() or member.issym() or tracked_pattern.search(path):
+                layer['replaced'].add(path)
+            if member.issym():
+                layer['symlinks'][path] = member.linkname
+            elif member.islnk():
+                link_target = normalize_layer_path(member.linkname)
+                if link_target in layer['files']:
+                    layer['files'][path] = layer['files'][link_target]
+                elif tracked_pattern.search(path):
+                    layer['files'][path] = None
+            elif tracked_pattern.search(path):
+                content = None
+                if member.isfile() and member.size <= INSPECT_CONTENT_MAX_BYTES and content_pattern.search(path):
+                    content = archive.extractfile(member).read()
+                layer['files'][path] = content
+    return layer
+
+
+def remove_subtree(entries, path, keep_self=False):
+    prefix = path.rstrip('/') + '/'
+    for entry_path in [entry_path for entry_path in entries if entry_path.startswith(prefix)]:
+        del entries[entry_path]
+    if not keep_self:
+        entries.pop(path, None)
+
+
+def apply_layer(state, layer):
+    """Apply a scanned layer on top of the merged filesystem state."""
+    for maps in (state['files'], state['symlinks']):
+        for directory in layer['opaque_dirs']:
+            remove_subtree(maps, directory, keep_self=True)
+        for path in layer['whiteouts']:
+            remove_subtree(maps, path)
+        for path in layer['replaced']:
+            maps.pop(path, None)
+    state['symlinks'].update(layer['symlinks'])
+    state['files'].update(layer['files'])
+
+
+def inspect_image_archive(source_fileobj, tracked_pattern, content_pattern):
+    """Read a `docker save` stream once and return its config and merged files.
+
+    Every layer is scanned as it streams past; the layers are then applied in
+    manifest order with whiteouts, so the result reflects the final image
+    filesystem. Only symlinks and paths matching tracked_pattern are kept,
+    plus the content of small files matching content_pattern.
+    """
+    buffered = {}
+    scanned_layers = {}
+    aliases = {}
+
+    with tarfile.open(fileobj=source_fileobj, mode='r|*') as source:
+        for member in source:
+            if member.issym():
+                aliases[member.name] = posixpath.normpath(posixpath.join(posixpath.dirname(member.name), member.linkname))
+            elif member.isfile() and member.size <= METADATA_MEMBER_MAX_BYTES:
+                buffered[member.name] = source.extractfile(member).read()
+            elif member.isfile():
+                try:
+                    scanned_layers[member.name] = scan_layer_tar(source.extractfile(member), tracked_pattern, content_pattern)
+                except tarfile.ReadError:
+                    continue
+
+    if 'manifest.json' not in buffered:
+        raise ValueError('Image archive does not contain manifest.json')
+    entry = get_single_manifest_entry(json.loads(buffered['manifest.json']))
+    if entry['Config'] not in buffered:
+        raise ValueError(f'Image config {entry["Config"]} is missing from the archive')
+
+    state = {'files': {}, 'symlinks': {}}
+    for layer_name in entry.get('Layers', []):
+        layer_name = aliases.get(layer_name, layer_name)
+        if layer_name in scanned_layers:
+            layer = scanned_layers[layer_name]
+        elif layer_name in buffered:
+            layer = scan_layer_tar(io.BytesIO(buffered[layer_name]), tracked_pattern, content_pattern)
+        else:
+            raise ValueError(f'Image layer {layer_name} is missing from the archive')
+        apply_layer(state, layer)
+
+    return {'config': json.loads(buffered[entry['Config']]), **state}
+
+
+def resolve_image_path(path, symlinks, max_links=40):
+    """Resolve path inside an inspected image, following its symlinks."""
+    parts = [part for part in path.split('/') if part]
+    resolved = '/'
+    followed = 0
+    while parts:
+        part = parts.pop(0)
+        if part == '.':
+            continue
+        if part == '..':
+            resolved = posixpath.dirname(resolved)
+            continue
+        candidate = posixpath.join(resolved, part)
+        target = symlinks.get(candidate)
+        if target is None:
+            resolved = candidate
+            continue
+        followed += 1
+        if followed > max_links:
+            return None
+        if target.startswith('/'):
+            resolved = '/'
+        parts = [part for part in target.split('/') if part] + parts
+    return resolved
+
+
+def parse_label_argument(value):
+    key, separator, label_value = value.partition('=')
+    if not separator or not key:
+        raise argparse.ArgumentTypeError(f'Labels must use KEY=VALUE syntax, got: {value!r}')
+    return key, label_value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rewrite the image config of a docker save archive.')
+    parser.add_argument('--repo-tag', required=True, help='Repository tag for the rewritten image')
+    parser.add_argument('--label', action='append', default=[], type=parse_label_argument, help='KEY=VALUE label to add')
+    parser.add_argument('--cmd-json', help='JSON array to use as the image CMD')
+    parser.add_argument('source', help='Input archive path, or - for stdin')
+    parser.add_argument('target', help='Output archive path, or - for stdout')
+    args = parser.parse_args(argv)
+
+    cmd = json.loads(args.cmd_json) if args.cmd_json else None
+    source = sys.stdin.buffer if args.source == '-' else open(args.source, 'rb')
+    target = sys.stdout.buffer if args.target == '-' else open(args.target, 'wb')
+    try:
+        image_id = rewrite_image_archive(source, target, args.repo_tag, labels=dict(args.label), cmd=cmd)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if target is not sys.stdout.buffer:
+            target.close()
+    print(image_id, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,440 @@
+import argparse
+import contextlib
+import json
+import os
+import posixpath
+import re
+import subprocess
+import sys
+import tarfile
+import time
+from pathlib import Path
+
+
+# Bump when the probe script or document layout changes so cached documents
+# from older probes are ignored.
+PROBE_VERSION = 2
+PROBE_SECTION_MARKER = '##openrecon-probe'
+ISMRMRD_SERVER_DIR = '/opt/code/python-ismrmrd-server'
+PYTORCH_CUDA_VERSION_PATTERN = re.compile(r'^\d+(?:\.\d+){1,2}$')
+PROBE_METHODS = ('container', 'static')
+DEFAULT_IMAGE_PATH = '/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin'
+# Paths the static inspection keeps from the image layers, and the subset whose
+# content it reads.
+STATIC_TRACKED_PATTERN = re.compile(
+    r'(?:/bin/(?:nvcc|python(?:\d+(?:\.\d+)?)?)$'
+    r'|/cuda[^/]*/version\.(?:json|txt)$'
+    r'|/(?:site|dist)-packages/(?:torch/version\.py|ismrmrd/__init__\.py)$'
+    r'|^/etc/passwd$'
+    r'|^/opt/code/python-ismrmrd-server$)'
+)
+STATIC_CONTENT_PATTERN = re.compile(r'(?:/version\.(?:json|txt|py)|^/etc/passwd)$')
+TORCH_CUDA_ASSIGNMENT_PATTERN = re.compile(r'^cuda\s*(?::[^=\n]*)?=\s*(.+?)\s*$', re.MULTILINE)
+CUDA_VERSION_TXT_PATTERN = re.compile(r'CUDA Version (\d+\.\d+)')
+PYTHON_BINARY_VERSION_PATTERN = re.compile(r'^python(\d+\.\d+)$')
+PYTHON_INTERPRETER_CANDIDATES = (
+    'python3',
+    'python',
+    '/opt/conda/bin/python3',
+    '/opt/conda/bin/python',
+    '/usr/local/bin/python3',
+    '/usr/bin/python3',
+)
+
+# Run once in the image with its default user and entrypoint. Every fact is
+# printed in its own section so shell warnings on stdout cannot be mistaken for
+# values. torch and ismrmrd are imported in a single interpreter start.
+PROBE_PYTHON = '''
+import json
+result = {}
+try:
+    import torch
+    result["torch_cuda"] = torch.version.cuda
+except Exception:
+    result["torch_cuda"] = "TORCH_NOT_FOUND"
+try:
+    import ismrmrd
+    result["ismrmrd"] = True
+except Exception:
+    result["ismrmrd"] = False
+print(json.dumps(result))
+'''
+PROBE_SCRIPT = f'''
+section() {{ echo "{PROBE_SECTION_MARKER} $1"; }}
+section uid
+id -u
+section username
+id -un 2>/dev/null || whoami 2>/dev/null
+section nvcc
+nvcc --version 2>/dev/null || echo CUDA_NOT_FOUND
+section pythons
+for candidate in {' '.join(PYTHON_INTERPRETER_CANDIDATES)}; do
+    path=$(command -v "$candidate" 2>/dev/null) || continue
+    version=$("$path" -c 'import sys; print("%d.%d.%d" % sys.version_info[:3])' 2>/dev/null) || continue
+    echo "$path $version"
+done
+section python-modules
+python3 -c '{PROBE_PYTHON.strip()}' 2>/dev/null || echo PYTHON_NOT_FOUND
+section ismrmrd-server
+if [ -d {ISMRMRD_SERVER_DIR} ]; then echo present; else echo missing; fi
+'''
+
+
+def get_default_cache_dir():
+    cache_home = os.getenv('XDG_CACHE_HOME')
+    if cache_home and cache_home.strip():
+        return Path(cache_home.strip()) / 'openrecon' / 'image-probes'
+    return Path.home() / '.cache' / 'openrecon' / 'image-probes'
+
+
+def resolve_image_id(image):
+    try:
+        output = subprocess.check_output(
+            ['docker', 'image', 'inspect', '--format', '{{.Id}}', image],
+            stderr=subprocess.DEVNULL,
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+    return output.decode('utf-8', errors='replace').strip() or None
+
+
+def parse_user_id(output):
+    for line in reversed(output.splitlines()):
+        value = line.strip()
+        if value.isdigit():
+            return int(value)
+    raise ValueError(output.strip())
+
+
+def parse_pytorch_cuda_version(output):
+    for line in reversed(output.splitlines()):
+        value = line.strip()
+        if not value:
+            continue
+        if value in {'TORCH_NOT_FOUND', 'None'}:
+            return None
+        if PYTORCH_CUDA_VERSION_PATTERN.match(value):
+            return value
+    return None
+
+
+def parse_nvcc_cuda_version(output):
+    """Return the release from `nvcc --version` ("release 11.8, V11.8.89")."""
+    if 'CUDA_NOT_FOUND' in output:
+        return None
+    for line in output.splitlines():
+        if 'release' in line.lower():
+            parts = line.split('release')
+            if len(parts) > 1:
+                return parts[1].split(',')[0].strip() or None
+    return None
+
+
+def split_probe_sections(output):
+    sections = {}
+    current = None
+    for line in output.splitlines():
+        if line.startswith(PROBE_SECTION_MARKER + ' '):
+            current = line[len(PROBE_SECTION_MARKER) + 1:].strip()
+            sections[current] = []
+        elif current is not None:
+            sections[current].append(line)
+    return {name: '\n'.join(lines) for name, lines in sections.items()}
+
+
+def parse_probe_output(output):
+    """Turn the probe script's sectioned output into the probe document fields."""
+    sections = split_probe_sections(output)
+    if 'uid' not in sections:
+        raise ValueError(f'Probe output has no uid section: {output.strip()}')
+
+    python_modules = {}
+    for line in reversed(sections.get('python-modules', '').splitlines()):
+        try:
+            python_modules = json.loads(line)
+            break
+        except ValueError:
+            continue
+    torch_cuda = python_modules.get('torch_cuda')
+
+    interpreters = []
+    for line in sections.get('pythons', '').splitlines():
+        path, _, interpreter_version = line.strip().partition(' ')
+        if path.startswith('/') and interpreter_version and path not in (entry['path'] for entry in interpreters):
+            interpreters.append({'path': path, 'version': interpreter_version})
+
+    username_lines = [line.strip() for line in sections.get('username', '').splitlines() if line.strip()]
+    return {
+        'uid': parse_user_id(sections['uid']),
+        'username': username_lines[-1] if username_lines else None,
+        'nvcc_cuda_version': parse_nvcc_cuda_version(sections.get('nvcc', '')),
+        'torch_cuda_version': parse_pytorch_cuda_version(str(torch_cuda)) if torch_cuda else None,
+        'python_interpreters': interpreters,
+        'ismrmrd_importable': bool(python_modules.get('ismrmrd')),
+        'ismrmrd_server_present': sections.get('ismrmrd-server', '').strip().endswith('present'),
+    }
+
+
+def get_image_env(config):
+    env = {}
+    for entry in (config.get('config') or {}).get('Env') or []:
+        name, _, value = entry.partition('=')
+        env[name] = value
+    return env
+
+
+def parse_passwd(content):
+    users = []
+    for line in (content or b'').decode('utf-8', errors='replace').splitlines():
+        fields = line.split(':')
+        if len(fields) >= 6 and fields[2].isdigit():
+            users.append({'name': fields[0], 'uid': int(fields[2]), 'home': fields[5]})
+    return users
+
+
+def get_static_user(config, passwd_users):
+    """Resolve the image's configured USER to (uid, username, home)."""
+    user = ((config.get('config') or {}).get('User') or '').split(':')[0]
+    if not user:
+        user = '0'
+    for entry in passwd_users:
+        if (user.isdigit() and entry['uid'] == int(user)) or entry['name'] == user:
+            return entry['uid'], entry['name'], entry['home']
+    if user.isdigit():
+        return int(user), 'root' if user == '0' else None, '/root' if user == '0' else None
+    raise ValueError(f'user {user!r} is not in /etc/passwd')
+
+
+def find_image_command(name, inspection, search_path):
+    """Return (path on PATH, resolved path) like `command -v` inside the image."""
+    from imageArchive import resolve_image_path
+
+    for directory in search_path.split(':'):
+        if not directory:
+            continue
+        candidate = posixpath.join(directory, name)
+        resolved = resolve_image_path(candidate, inspection['symlinks'])
+        if resolved in inspection['files']:
+            return candidate, resolved
+    return None, None
+
+
+def get_static_nvcc_cuda_version(nvcc_path, files):
+    cuda_home = posixpath.dirname(posixpath.dirname(nvcc_path))
+    version_json = files.get(posixpath.join(cuda_home, 'version.json'))
+    if version_json:
+        cuda_version = json.loads(version_json).get('cuda', {}).get('version', '')
+        return '.'.join(cuda_version.split('.')[:2]) or None
+    version_txt = files.get(posixpath.join(cuda_home, 'version.txt'))
+    match = CUDA_VERSION_TXT_PATTERN.search((version_txt or b'').decode('utf-8', errors='replace'))
+    if match:
+        return match.group(1)
+    raise ValueError(f'no CUDA version file next to {nvcc_path}')
+
+
+def get_python_search_dirs(python_path, env, home):
+    """Return the site directories python3 would search, in sys.path order."""
+    prefix = posixpath.dirname(posixpath.dirname(python_path))
+    match = PYTHON_BINARY_VERSION_PATTERN.match(posixpath.basename(python_path))
+    if match is None:
+        raise ValueError(f'cannot tell the Python version of {python_path}')
+    python_version = match.group(1)
+    search_dirs = [entry for entry in env.get('PYTHONPATH', '').split(':') if entry]
+    if home:
+        search_dirs.append(f'{home}/.local/lib/python{python_version}/site-packages')
+    search_dirs.append(f'{prefix}/lib/python{python_version}/site-packages')
+    if prefix in ('/usr', '/usr/local'):
+        search_dirs.extend([
+            f'/usr/local/lib/python{python_version}/dist-packages',
+            f'/usr/local/lib/python{python_version}/site-packages',
+            '/usr/lib/python3/dist-packages',
+            f'/usr/lib/python{python_version}/dist-packages',
+        ])
+    return search_dirs
+
+
+def parse_torch_version_py(content):
+    match = TORCH_CUDA_ASSIGNMENT_PATTERN.search(content.decode('utf-8', errors='replace'))
+    if match is None:
+        raise ValueError('torch/version.py has no cuda assignment')
+    return parse_pytorch_cuda_version(match.group(1).strip('\'"'))
+
+
+def derive_static_probe(inspection):
+    """Answer the probe questions from an inspected image filesystem.
+
+    Raises ValueError when a fact cannot be derived without running the
+    image, so callers can fall back to the container probe.
+    """
+    from imageArchive import resolve_image_path
+
+    config = inspection['config']
+    files = inspection['files']
+    env = get_image_env(config)
+    search_path = env.get('PATH', DEFAULT_IMAGE_PATH)
+    uid, username, home = get_static_user(config, parse_passwd(files.get('/etc/passwd')))
+
+    _, nvcc_path = find_image_command('nvcc', inspection, search_path)
+    nvcc_cuda_version = get_static_nvcc_cuda_version(nvcc_path, files) if nvcc_path else None
+
+    torch_cuda_version = None
+    ismrmrd_importable = False
+    _, python_path = find_image_command('python3', inspection, search_path)
+    if python_path:
+        search_dirs = get_python_search_dirs(python_path, env, home)
+        torch_version_py = next(
+            (posixpath.join(directory, 'torch/version.py') for directory in search_dirs
+             if posixpath.join(directory, 'torch/version.py') in files),
+            None,
+        )
+        if torch_version_py:
+            torch_cuda_version = parse_torch_version_py(files[torch_version_py] or b'')
+        ismrmrd_importable = any(posixpath.join(directory, 'ismrmrd/__init__.py') in files for directory in search_dirs)
+
+    interpreters = []
+    for candidate in PYTHON_INTERPRETER_CANDIDATES:
+        if candidate.startswith('/'):
+            path, resolved = candidate, resolve_image_path(candidate, inspection['symlinks'])
+            if resolved not in files:
+                continue
+        else:
+            path, resolved = find_image_command(candidate, inspection, search_path)
+            if path is None:
+                continue
+        match = PYTHON_BINARY_VERSION_PATTERN.match(posixpath.basename(resolved))
+        if path not in (entry['path'] for entry in interpreters):
+            interpreters.append({'path': path, 'version': match.group(1) if match else None})
+
+    return {
+        'uid': uid,
+        'username': username,
+        'nvcc_cuda_version': nvcc_cuda_version,
+        'torch_cuda_version': torch_cuda_version,
+        'python_interpreters': interpreters,
+        'ismrmrd_importable': ismrmrd_importable,
+        'ismrmrd_server_present': ISMRMRD_SERVER_DIR in files,
+    }
+
+
+def inspect_image_statically(image):
+    """Stream `docker save` once and derive the probe fields without a container."""
+    from imageArchive import inspect_image_archive
+
+    save_cmd = ['docker', 'save', image]
+    process = subprocess.Popen(save_cmd, stdout=subprocess.PIPE)
+    try:
+        inspection = inspect_image_archive(process.stdout, STATIC_TRACKED_PATTERN, STATIC_CONTENT_PATTERN)
+        # Drain the end-of-archive padding so docker save exits cleanly.
+        while process.stdout.read(1024 * 1024):
+            pass
+    except BaseException:
+        process.kill()
+        raise
+    finally:
+        process.stdout.close()
+        process.wait()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, save_cmd)
+    return derive_static_probe(inspection)
+
+
+def get_probe_cache_path(cache_dir, image_id, method):
+    # Static probes only know major.minor interpreter versions, so each method
+    # has its own cache entry.
+    return Path(cache_dir) / f'{image_id.replace(":", "_")}.{method}.json'
+
+
+def load_cached_probe(cache_dir, image_id, method):
+    if cache_dir is None or image_id is None:
+        return None
+    try:
+        probe = json.loads(get_probe_cache_path(cache_dir, image_id, method).read_text())
+    except (OSError, ValueError):
+        return None
+    if probe.get('probe_version') != PROBE_VERSION or probe.get('image_id') != image_id:
+        return None
+    return probe
+
+
+def store_cached_probe(cache_dir, probe, method):
+    cache_path = get_probe_cache_path(cache_dir, probe['image_id'], method)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    partial_path = cache_path.with_name(cache_path.name + '.partial')
+    partial_path.write_text(json.dumps(probe, indent=2, sort_keys=True) + '\n')
+    os.replace(partial_path, cache_path)
+
+
+def probe_image(image, cache_dir=None, platform='linux/amd64', method='container'):
+    """Collect the facts the pre-build checks need from one container run.
+
+    With method='static' the image config and layers are inspected from
+    `docker save` instead, without starting a container; the container probe
+    is then only the fallback when a fact cannot be derived statically.
+    The document is cached in cache_dir keyed by image ID and method, so an
+    unchanged image is never probed the same way again. Images that are not local yet are pulled by
+    `docker run` and cached under the ID they resolve to afterwards.
+    """
+    if method not in PROBE_METHODS:
+        raise ValueError(f'Probe method must be one of {sorted(PROBE_METHODS)}, got: {method}')
+    image_id = resolve_image_id(image)
+    cached = load_cached_probe(cache_dir, image_id, method)
+    if cached is not None:
+        print(f'#-> Using cached probe of {image} ({image_id})')
+        return cached
+
+    started = time.monotonic()
+    fields = None
+    if method == 'static' and image_id is not None:
+        print(f'#-> Inspecting {image} layers without starting a container...')
+        try:
+            fields = inspect_image_statically(image)
+            method_used = 'static'
+        except (ValueError, tarfile.TarError, subprocess.CalledProcessError) as exc:
+            print(f'#-> Static inspection was inconclusive ({exc}); falling back to a probe container')
+
+    if fields is None:
+        print(f'#-> Probing {image} in one container...')
+        result = subprocess.run(
+            ['docker', 'run', '--rm', '--platform', platform, image, 'sh', '-c', PROBE_SCRIPT],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise Exception(f'#-> Docker command failed: {result.stdout}{result.stderr}')
+        fields = parse_probe_output(result.stdout)
+        method_used = 'container'
+
+    probe = {
+        'probe_version': PROBE_VERSION,
+        'image': image,
+        'image_id': image_id or resolve_image_id(image),
+        'method': method_used,
+        'probe_seconds': round(time.monotonic() - started, 3),
+        **fields,
+    }
+    if cache_dir is not None and probe['image_id']:
+        try:
+            store_cached_probe(cache_dir, probe, method)
+        except OSError as exc:
+            print(f'⚠️  Could not cache the probe of {image}: {exc}')
+    return probe
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Probe a Docker image once and print the result as JSON.')
+    parser.add_argument('image', help='Image to probe')
+    parser.add_argument('--cache-dir', default=None, help='Probe cache directory (default: ~/.cache/openrecon/image-probes)')
+    parser.add_argument('--no-cache', action='store_true', help='Ignore and do not reuse cached probes')
+    parser.add_argument('--method', choices=PROBE_METHODS, default='container', help='Probe in a container or inspect the layers')
+    args = parser.parse_args(argv)
+
+    cache_dir = None if args.no_cache else Path(args.cache_dir) if args.cache_dir else get_default_cache_dir()
+    with contextlib.redirect_stdout(sys.stderr):
+        probe = probe_image(args.image, cache_dir=cache_dir, method=args.method)
+    json.dump(probe, sys.stdout, indent=2, sort_keys=True)
+    print()
+
+
+if __name__ == '__main__':
+    main()
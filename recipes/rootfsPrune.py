@@ -0,0 +1,304 @@
+import argparse
+import fnmatch
+import json
+import os
+import posixpath
+import re
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+
+# Named rule sets for content the OpenRecon/FIRE runtime never reads. Patterns
+# are fnmatch globs on absolute paths, where `*` also crosses `/`; a pattern
+# that matches a directory prunes its whole subtree.
+PRUNE_RULE_PRESETS = {
+    'pip-cache': ('/root/.cache/pip', '/home/*/.cache/pip', '/tmp/pip-*'),
+    'conda-pkgs': (
+        '/opt/conda/pkgs/*',
+        '/opt/miniconda*/pkgs/*',
+        '/opt/miniforge*/pkgs/*',
+        '/opt/mambaforge/pkgs/*',
+    ),
+    'docs': ('/usr/share/doc/*', '/usr/share/man/*', '/usr/share/info/*', '/usr/local/share/doc/*', '/opt/conda/share/doc/*'),
+    'tests': ('*/site-packages/*/tests', '*/site-packages/*/test'),
+    'static-libs': ('*/lib/*.a', '*/lib64/*.a'),
+    # Handled by is_stale_pycache: bytecode compiled for a different Python
+    # than the lib/pythonX.Y tree it lives in.
+    'stale-pycache': (),
+}
+PRESET_RULE_PREFIX = '@'
+# Image config keys that create_docker_import_changes restores, and keys that
+# only describe how a container was created and have no image-level effect.
+IMPORT_CHANGE_CONFIG_KEYS = frozenset((
+    'Env', 'Labels', 'ExposedPorts', 'Volumes', 'WorkingDir', 'User', 'StopSignal', 'Healthcheck', 'OnBuild',
+    'Entrypoint', 'Cmd',
+))
+IMPORT_IGNORED_CONFIG_KEYS = frozenset((
+    'Hostname', 'Domainname', 'AttachStdin', 'AttachStdout', 'AttachStderr', 'Tty', 'OpenStdin', 'StdinOnce',
+    'ArgsEscaped', 'Image', 'NetworkDisabled', 'MacAddress',
+))
+STALE_PYCACHE_PATTERN = re.compile(r'/lib/python(\d)\.(\d+)/(?:.*/)?__pycache__/[^/]+\.cpython-(\d+)[^/]*\.pyc$')
+
+# Pruned regular files are kept on disk until the end of the stream in case a
+# later kept hard link refers to them; beyond this budget such links fail.
+SPILL_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+
+def parse_prune_rules(rule_texts):
+    """Validate prune rules: `@preset` names or absolute/`*` glob patterns."""
+    rules = []
+    for rule in rule_texts:
+        rule = rule.strip()
+        if not rule or rule.startswith('#'):
+            continue
+        if rule.startswith(PRESET_RULE_PREFIX):
+            preset = rule[len(PRESET_RULE_PREFIX):]
+            if preset not in PRUNE_RULE_PRESETS:
+                raise ValueError(
+                    f'Unknown prune preset {rule!r}. Valid presets: '
+                    + ', '.join(PRESET_RULE_PREFIX + name for name in sorted(PRUNE_RULE_PRESETS))
+                )
+        elif not rule.startswith(('/', '*')):
+            raise ValueError(f'Prune rule {rule!r} must be an absolute path glob or an @preset name')
+        if rule not in rules:
+            rules.append(rule)
+    return rules
+
+
+def is_stale_pycache(path):
+    match = STALE_PYCACHE_PATTERN.search(path)
+    return bool(match) and match.group(3) != match.group(1) + match.group(2)
+
+
+def match_prune_rule(path, rules):
+    """Return the first rule that prunes path, or None."""
+    for rule in rules:
+        if rule.startswith(PRESET_RULE_PREFIX):
+            preset = rule[len(PRESET_RULE_PREFIX):]
+            if preset == 'stale-pycache':
+                if is_stale_pycache(path):
+                    return rule
+                continue
+            patterns = PRUNE_RULE_PRESETS[preset]
+        else:
+            patterns = (rule,)
+        if any(fnmatch.fnmatchcase(path, pattern) for pattern in patterns):
+            return rule
+    return None
+
+
+def normalize_member_path(name):
+    return posixpath.normpath('/' + name)
+
+
+def prune_rootfs_tar(source_fileobj, target_fileobj, rules, spill_dir=None):
+    """Stream a rootfs tar, dropping members matched by rules.
+
+    Returns a report with the members and bytes pruned per rule. A kept hard
+    link whose target was pruned is written out as a regular file instead.
+    """
+    report = {rule: {'members': 0, 'bytes': 0} for rule in rules}
+    pruned_dirs = {}
+    pruned_files = {}
+    relinked = {}
+    spill_bytes = 0
+    spill_count = 0
+
+    with tempfile.TemporaryDirectory(dir=spill_dir) as spill_root, \
+            tarfile.open(fileobj=source_fileobj, mode='r|*') as source, \
+            tarfile.open(fileobj=target_fileobj, mode='w|', format=tarfile.PAX_FORMAT) as target:
+        for member in source:
+            path = normalize_member_path(member.name)
+            rule = None
+            parent = posixpath.dirname(path)
+            while parent != '/' and rule is None:
+                rule = pruned_dirs.get(parent)
+                parent = posixpath.dirname(parent)
+            if rule is None and path != '/':
+                rule = match_prune_rule(path, rules)
+
+            if rule is not None:
+                report[rule]['members'] += 1
+                if member.isdir():
+                    pruned_dirs[path] = rule
+                elif member.isfile():
+                    report[rule]['bytes'] += member.size
+                    spill_path = None
+                    if spill_bytes + member.size <= SPILL_MAX_BYTES:
+                        spill_path = os.path.join(spill_root, str(spill_count))
+                        with open(spill_path, 'wb') as spill:
+                            shutil.copyfileobj(source.extractfile(member), spill)
+                        spill_bytes += member.size
+                        spill_count += 1
+                    pruned_files[path] = (member, spill_path)
+                continue
+
+            if member.islnk():
+                link_target = normalize_member_path(member.linkname)
+                if link_target in relinked:
+                    member.linkname = relinked[link_target]
+                elif link_target in pruned_files:
+                    target_member, spill_path = pruned_files.pop(link_target)
+                    if spill_path is None:
+                        raise ValueError(
+                            f'{member.name} is a hard link to pruned file {member.linkname}, which was too large '
+                            'to keep; narrow the prune rule or exclude that file'
+                        )
+                    member.type = tarfile.REGTYPE
+                    member.linkname = ''
+                    member.size = target_member.size
+                    with open(spill_path, 'rb') as spill:
+                        target.addfile(member, spill)
+                    os.remove(spill_path)
+                    spill_bytes -= target_member.size
+                    relinked[link_target] = member.name
+                    continue
+
+            if member.isfile():
+                target.addfile(member, source.extractfile(member))
+            else:
+                target.addfile(member)
+
+    return {
+        'rules': report,
+        'pruned_members': sum(entry['members'] for entry in report.values()),
+        'pruned_bytes': sum(entry['bytes'] for entry in report.values()),
+    }
+
+
+def quote_dockerfile_value(value):
+    # Dockerfile instructions expand $VAR inside double quotes.
+    return json.dumps(value).replace('$', '\\$')
+
+
+def format_go_duration(nanoseconds):
+    if nanoseconds % 1_000_000_000 == 0:
+        return f'{nanoseconds // 1_000_000_000}s'
+    return f'{nanoseconds // 1_000_000}ms'
+
+
+def create_healthcheck_change(healthcheck):
+    test = healthcheck.get('Test') or []
+    if not test or test[0] == 'NONE':
+        return 'HEALTHCHECK NONE'
+    options = []
+    for key, option in (
+        ('Interval', 'interval'),
+        ('Timeout', 'timeout'),
+        ('StartPeriod', 'start-period'),
+        ('StartInterval', 'start-interval'),
+    ):
+        if healthcheck.get(key):
+            options.append(f'--{option}={format_go_duration(healthcheck[key])}')
+    if healthcheck.get('Retries'):
+        options.append(f'--retries={healthcheck["Retries"]}')
+    command = test[1] if test[0] == 'CMD-SHELL' else json.dumps(test[1:])
+    return ' '.join(['HEALTHCHECK', *options, 'CMD', command])
+
+
+def create_docker_import_changes(image_config):
+    """Return `docker import --change` arguments restoring an image config."""
+    config = image_config or {}
+    changes = []
+    for env in config.get('Env') or []:
+        name, _, value = env.partition('=')
+        changes.append(f'ENV {name}={quote_dockerfile_value(value)}')
+    for key, value in sorted((config.get('Labels') or {}).items()):
+        changes.append(f'LABEL {json.dumps(key)}={quote_dockerfile_value(value)}')
+    for port in sorted(config.get('ExposedPorts') or {}):
+        changes.append(f'EXPOSE {port}')
+    if config.get('Volumes'):
+        changes.append(f'VOLUME {json.dumps(sorted(config["Volumes"]))}')
+    if config.get('WorkingDir'):
+        changes.append(f'WORKDIR {config["WorkingDir"]}')
+    if config.get('User'):
+        changes.append(f'USER {config["User"]}')
+    if config.get('StopSignal'):
+        changes.append(f'STOPSIGNAL {config["StopSignal"]}')
+    if config.get('Healthcheck'):
+        changes.append(create_healthcheck_change(config['Healthcheck']))
+    for trigger in config.get('OnBuild') or []:
+        changes.append(f'ONBUILD {trigger}')
+    if config.get('Entrypoint'):
+        changes.append(f'ENTRYPOINT {json.dumps(config["Entrypoint"])}')
+    if config.get('Cmd'):
+        changes.append(f'CMD {json.dumps(config["Cmd"])}')
+
+    args = []
+    for change in changes:
+        args.extend(['--change', change])
+    return args
+
+
+def get_dropped_import_config_keys(image_config):
+    """Return set config keys that `docker import --change` cannot restore."""
+    config = image_config or {}
+    return sorted(key for key in config if key not in IMPORT_CHANGE_CONFIG_KEYS | IMPORT_IGNORED_CONFIG_KEYS and config[key])
+
+
+def squash_pruned_image(image, rules, platform='linux/amd64'):
+    """Replace image with a single-layer copy of its pruned filesystem."""
+    inspect_output = subprocess.check_output(['docker', 'image', 'inspect', '--format', '{{json .Config}}', image])
+    image_config = json.loads(inspect_output)
+    import_args = create_docker_import_changes(image_config)
+    dropped_keys = get_dropped_import_config_keys(image_config)
+    if dropped_keys:
+        print(f'⚠️  The squashed {image} loses image config it cannot carry over: {", ".join(dropped_keys)}', file=sys.stderr)
+    container_id = subprocess.check_output(['docker', 'create', '--platform', platform, image]).decode('utf-8').strip()
+    try:
+        export_process = subprocess.Popen(['docker', 'export', container_id], stdout=subprocess.PIPE)
+        import_process = subprocess.Popen(
+            ['docker', 'import', '--platform', platform, *import_args, '-', image],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            report = prune_rootfs_tar(export_process.stdout, import_process.stdin, rules)
+        finally:
+            import_process.stdin.close()
+            export_process.stdout.close()
+        if export_process.wait() != 0:
+            raise subprocess.CalledProcessError(export_process.returncode, ['docker', 'export', container_id])
+        if import_process.wait() != 0:
+            raise subprocess.CalledProcessError(import_process.returncode, ['docker', 'import', image])
+    finally:
+        subprocess.run(['docker', 'rm', '-f', container_id], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    report['dropped_config_keys'] = dropped_keys
+    return report
+
+
+def print_prune_report(report, stream=sys.stderr):
+    for rule, entry in report['rules'].items():
+        print(f'   {rule}: {entry["bytes"] / 1e6:.1f} MB in {entry["members"]} entries', file=stream)
+    print(f'   Total pruned: {report["pruned_bytes"] / 1e6:.1f} MB', file=stream)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Prune unneeded files from a container rootfs.')
+    parser.add_argument('--rule', action='append', default=[], help='Glob pattern or @preset to prune (repeatable)')
+    parser.add_argument('--report', help='Write the per-rule JSON report to this path')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    filter_parser = subparsers.add_parser('filter', help='Filter a rootfs tar stream from stdin to stdout')
+    filter_parser.add_argument('--spill-dir', help='Directory for pruned files that may still be hard-linked')
+    squash_parser = subparsers.add_parser('squash', help='Replace an image with its pruned, single-layer filesystem')
+    squash_parser.add_argument('image', help='Image to prune in place')
+    args = parser.parse_args(argv)
+
+    rules = parse_prune_rules(args.rule)
+    if args.command == 'filter':
+        report = prune_rootfs_tar(sys.stdin.buffer, sys.stdout.buffer, rules, spill_dir=args.spill_dir)
+    else:
+        report = squash_pruned_image(args.image, rules)
+
+    print('✂️  Rootfs pruning:', file=sys.stderr)
+    print_prune_report(report)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
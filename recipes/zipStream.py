@@ -0,0 +1,537 @@
+import argparse
+import collections
+import concurrent.futures
+import json
+import os
+import struct
+import sys
+import time
+import zipfile
+import zlib
+
+
+DEFAULT_CHUNK_BYTES = 4 * 1024 * 1024
+DEFAULT_COMPRESSION_LEVEL = 6
+# Named profiles, all producing plain Deflate (or stored) ZIP entries that the
+# scanner can open. `level` drives the streaming packager, which deflates one
+# entry on every thread; `7z_args` drive 7-Zip, which only parallelises across
+# files when writing ZIP.
+COMPRESSION_PROFILES = {
+    'store': {'level': 0, '7z_args': ('-mm=Copy', '-mx=0')},
+    'fast': {'level': 1, '7z_args': ('-mm=Deflate', '-mx=1', '-mmt=on')},
+    'default': {'level': DEFAULT_COMPRESSION_LEVEL, '7z_args': ('-mm=Deflate', '-mx=5', '-mmt=on')},
+    'max': {'level': 9, '7z_args': ('-mm=Deflate', '-mx=9', '-mmt=on')},
+}
+DEFAULT_COMPRESSION_PROFILE = 'default'
+# The benchmark compresses one chunk out of every this many.
+BENCHMARK_SAMPLE_EVERY = 16
+PROGRESS_INTERVAL_SECONDS = 10
+READ_BYTES = 1024 * 1024
+DEFLATE_WINDOW_BYTES = 32 * 1024
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP64_MARKER = 0xFFFFFFFF
+ZIP64_VERSION = 45
+ZIP_UNIX_VERSION_MADE_BY = (3 << 8) | ZIP64_VERSION
+LOCAL_HEADER_STRUCT = struct.Struct('<IHHHHHIIIHH')
+CENTRAL_HEADER_STRUCT = struct.Struct('<IHHHHHHIIIHHHHHII')
+END_RECORD_STRUCT = struct.Struct('<IHHHHIIH')
+ZIP64_END_RECORD_STRUCT = struct.Struct('<IQHHIIQQQQ')
+ZIP64_END_LOCATOR_STRUCT = struct.Struct('<IIQI')
+
+
+def deflate_chunk(chunk, zdict, level, final):
+    """Raw-deflate one chunk so that chunks concatenate into a single stream.
+
+    Non-final chunks end with a sync flush (byte aligned, not final) and are
+    primed with the previous 32 KiB, like pigz, so the ratio stays close to a
+    single-threaded deflate.
+    """
+    if zdict:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=zdict)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(chunk) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class ParallelDeflater:
+    """Deflate a byte stream on a pool of threads, preserving output order.
+
+    zlib releases the GIL while compressing, so independent chunks compress in
+    parallel. At most two chunks per thread are in flight to bound memory.
+    """
+
+    def __init__(self, level=DEFAULT_COMPRESSION_LEVEL, threads=None, chunk_bytes=DEFAULT_CHUNK_BYTES):
+        self.level = level
+        self.threads = threads or os.cpu_count() or 1
+        self.chunk_bytes = chunk_bytes
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.threads)
+        self._pending = collections.deque()
+        self._buffer = bytearray()
+        self._window = b''
+
+    def _submit(self, chunk, final):
+        zdict = self._window
+        self._window = (self._window + chunk)[-DEFLATE_WINDOW_BYTES:]
+        self._pending.append(self._executor.submit(deflate_chunk, chunk, zdict, self.level, final))
+
+    def _collect(self, wait_all=False):
+        output = []
+        while self._pending and (wait_all or self._pending[0].done() or len(self._pending) > self.threads * 2):
+            output.append(self._pending.popleft().result())
+        return b''.join(output)
+
+    def compress(self, data):
+        self._buffer += data
+        while len(self._buffer) >= self.chunk_bytes:
+            chunk = bytes(self._buffer[:self.chunk_bytes])
+            del self._buffer[:self.chunk_bytes]
+            self._submit(chunk, final=False)
+        return self._collect()
+
+    def flush(self):
+        self._submit(bytes(self._buffer), final=True)
+        self._buffer = bytearray()
+        try:
+            return self._collect(wait_all=True)
+        finally:
+            self._executor.shutdown()
+
+
+class ProgressReporter:
+    """Print throttled progress, throughput and ETA for one packaging run."""
+
+    def __init__(self, label, total_bytes=None, interval_seconds=PROGRESS_INTERVAL_SECONDS, stream=None):
+        self.label = label
+        self.total_bytes = total_bytes
+        self.interval_seconds = interval_seconds
+        self.stream = stream
+        self.bytes_done = 0
+        self.output_bytes = None
+        self.started = time.monotonic()
+        self._last_report = self.started
+
+    def _print(self, text):
+        print(text, file=self.stream or sys.stderr, flush=True)
+
+    def format(self, now):
+        elapsed = max(now - self.started, 1e-9)
+        rate = self.bytes_done / elapsed
+        text = f'   {self.label}: {self.bytes_done / (1024 ** 3):.2f} GiB at {rate / 1e6:.1f} MB/s'
+        if self.total_bytes and rate > 0:
+            percent = min(100.0, self.bytes_done * 100 / self.total_bytes)
+            eta = max(self.total_bytes - self.bytes_done, 0) / rate
+            text += f', {percent:.0f}%, ETA {eta:.0f}s'
+        if self.output_bytes and self.bytes_done:
+            text += f', ratio {self.output_bytes / self.bytes_done:.3f}'
+        return text
+
+    def update(self, bytes_done, output_bytes=None):
+        self.bytes_done = bytes_done
+        self.output_bytes = output_bytes
+        now = time.monotonic()
+        if now - self._last_report >= self.interval_seconds:
+            self._last_report = now
+            self._print(self.format(now))
+
+    def finish(self, bytes_done=None, output_bytes=None):
+        """Print the final line and return the run's throughput record."""
+        if bytes_done is not None:
+            self.bytes_done = bytes_done
+        if output_bytes is not None:
+            self.output_bytes = output_bytes
+        seconds = time.monotonic() - self.started
+        record = {
+            'input_bytes': self.bytes_done,
+            'output_bytes': self.output_bytes,
+            'seconds': round(seconds, 3),
+            'throughput_mb_per_second': round(self.bytes_done / seconds / 1e6, 2) if seconds > 0 else None,
+            'ratio': round(self.output_bytes / self.bytes_done, 4) if self.output_bytes and self.bytes_done else None,
+        }
+        text = f'   {self.label}: {self.bytes_done / (1024 ** 3):.2f} GiB in {seconds:.1f}s'
+        if record['throughput_mb_per_second'] is not None:
+            text += f' ({record["throughput_mb_per_second"]:.1f} MB/s)'
+        if record['ratio'] is not None:
+            text += f', ratio {record["ratio"]:.3f}'
+        self._print(text)
+        return record
+
+
+def get_dos_datetime(timestamp=None):
+    year, month, day, hour, minute, second = time.localtime(timestamp)[:6]
+    year = max(year, 1980)
+    return ((year - 1980) << 9) | (month << 5) | day, (hour << 11) | (minute << 5) | (second // 2)
+
+
+class ZipEntryWriter:
+    """File-like writer for one entry of a StreamingZipWriter."""
+
+    def __init__(self, archive, name, compress, level, threads, progress=None):
+        self._archive = archive
+        self._progress = progress
+        self._fileobj = archive.fileobj
+        self.name = name
+        self.method = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        self.flags = 0x800 if not name.isascii() else 0
+        self.date, self.time = get_dos_datetime()
+        self.crc = 0
+        self.size = 0
+        self.compressed_size = 0
+        self._deflater = ParallelDeflater(level=level, threads=threads) if compress else None
+        self.header_offset = self._fileobj.tell()
+        # Sizes are unknown until the stream ends, so the local header always
+        # carries a ZIP64 extra field that close() patches in place.
+        encoded_name = name.encode('utf-8')
+        self._fileobj.write(LOCAL_HEADER_STRUCT.pack(
+            0x04034b50, ZIP64_VERSION, self.flags, self.method, self.time, self.date,
+            0, ZIP64_MARKER, ZIP64_MARKER, len(encoded_name), 20,
+        ))
+        self._fileobj.write(encoded_name)
+        self._zip64_extra_offset = self._fileobj.tell()
+        self._fileobj.write(struct.pack('<HHQQ', 0x0001, 16, 0, 0))
+        self.closed = False
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data_length = len(data)
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += data_length
+        if self._deflater is not None:
+            data = self._deflater.compress(data)
+        self._fileobj.write(data)
+        self.compressed_size += len(data)
+        if self._progress is not None:
+            self._progress(self.size, self.compressed_size)
+        return data_length
+
+    def close(self):
+        if self.closed:
+            return
+        if self._deflater is not None:
+            tail = self._deflater.flush()
+            self._fileobj.write(tail)
+            self.compressed_size += len(tail)
+        else:
+            self.compressed_size = self.size
+        end_offset = self._fileobj.tell()
+        self._fileobj.seek(self.header_offset + 14)
+        self._fileobj.write(struct.pack('<I', self.crc))
+        self._fileobj.seek(self._zip64_extra_offset + 4)
+        self._fileobj.write(struct.pack('<QQ', self.size, self.compressed_size))
+        self._fileobj.seek(end_offset)
+        self.closed = True
+        self._archive.entries.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+class ZipEntryRecord:
+    """Central directory fields of an entry already in the archive."""
+
+    def __init__(self, info):
+        year, month, day, hour, minute, second = info.date_time
+        self.name = info.filename
+        self.method = info.compress_type
+        self.flags = info.flag_bits
+        self.date = ((year - 1980) << 9) | (month << 5) | day
+        self.time = (hour << 11) | (minute << 5) | (second // 2)
+        self.crc = info.CRC
+        self.size = info.file_size
+        self.compressed_size = info.compress_size
+        self.header_offset = info.header_offset
+
+
+class StreamingZipWriter:
+    """Write a ZIP64 archive to a seekable file from streams of unknown size."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.entries = []
+
+    @classmethod
+    def for_append(cls, fileobj):
+        """Reopen an archive written by this class to add entries to it.
+
+        The central directory is dropped and written again on close, so every
+        entry keeps the same ZIP64 layout in its local and central records.
+        """
+        with zipfile.ZipFile(fileobj) as existing:
+            infos = existing.infolist()
+            cd_offset = existing.start_dir
+        archive = cls(fileobj)
+        archive.entries.extend(ZipEntryRecord(info) for info in infos)
+        fileobj.seek(cd_offset)
+        fileobj.truncate()
+        return archive
+
+    def open_entry(self, name, compress=True, level=DEFAULT_COMPRESSION_LEVEL, threads=None, progress=None):
+        """Start an entry; progress(size, compressed_size) is called per write."""
+        return ZipEntryWriter(self, name, compress, level, threads, progress=progress)
+
+    def write_stream(self, name, source, compress=True, level=DEFAULT_COMPRESSION_LEVEL, threads=None, progress=None):
+        with self.open_entry(name, compress=compress, level=level, threads=threads, progress=progress) as entry:
+            while True:
+                data = source.read(READ_BYTES)
+                if not data:
+                    break
+                entry.write(data)
+        return entry
+
+    def close(self):
+        cd_offset = self.fileobj.tell()
+        for entry in self.entries:
+            # Like the local header, the central record always moves both
+            # sizes into the ZIP64 extra field, so strict readers see the same
+            # layout in both places.
+            extra_values = [entry.size, entry.compressed_size]
+            size = compressed_size = ZIP64_MARKER
+            header_offset = entry.header_offset
+            if header_offset >= ZIP64_LIMIT:
+                extra_values.append(header_offset)
+                header_offset = ZIP64_MARKER
+            extra = struct.pack(f'<HH{len(extra_values)}Q', 0x0001, 8 * len(extra_values), *extra_values)
+            encoded_name = entry.name.encode('utf-8')
+            self.fileobj.write(CENTRAL_HEADER_STRUCT.pack(
+                0x02014b50, ZIP_UNIX_VERSION_MADE_BY, ZIP64_VERSION, entry.flags, entry.method,
+                entry.time, entry.date, entry.crc, compressed_size, size,
+                len(encoded_name), len(extra), 0, 0, 0, (0o100644 << 16), header_offset,
+            ))
+            self.fileobj.write(encoded_name)
+            self.fileobj.write(extra)
+
+        cd_end = self.fileobj.tell()
+        cd_size = cd_end - cd_offset
+        entry_count = len(self.entries)
+        if entry_count >= 0xFFFF or cd_offset >= ZIP64_LIMIT or cd_size >= ZIP64_LIMIT:
+            self.fileobj.write(ZIP64_END_RECORD_STRUCT.pack(
+                0x06064b50, ZIP64_END_RECORD_STRUCT.size - 12, ZIP_UNIX_VERSION_MADE_BY, ZIP64_VERSION,
+                0, 0, entry_count, entry_count, cd_size, cd_offset,
+            ))
+            self.fileobj.write(ZIP64_END_LOCATOR_STRUCT.pack(0x07064b50, 0, cd_end, 1))
+            entry_count = min(entry_count, 0xFFFF)
+            cd_size = min(cd_size, ZIP64_MARKER)
+            cd_offset = min(cd_offset, ZIP64_MARKER)
+        self.fileobj.write(END_RECORD_STRUCT.pack(0x06054b50, 0, 0, entry_count, entry_count, cd_size, cd_offset, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+
+
+def get_compression_profile(name):
+    profile = (name or DEFAULT_COMPRESSION_PROFILE).strip().lower()
+    if profile not in COMPRESSION_PROFILES:
+        raise ValueError(f'Unknown compression profile {name!r}. Valid profiles: {", ".join(COMPRESSION_PROFILES)}')
+    return profile
+
+
+def iter_benchmark_sources(paths):
+    """Yield (name, fileobj, size, seekable) for every input of a benchmark.
+
+    Directories contribute every regular file below them and ZIP archives
+    contribute their entries, so a finished OpenRecon zip is measured on the
+    image tar it contains. `-` reads stdin, whose size is not known upfront.
+    """
+    for path in paths:
+        if path == '-':
+            yield '<stdin>', sys.stdin.buffer, None, False
+        elif os.path.isdir(path):
+            for root, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    file_path = os.path.join(root, filename)
+                    if os.path.isfile(file_path) and not os.path.islink(file_path):
+                        with open(file_path, 'rb') as handle:
+                            yield file_path, handle, os.path.getsize(file_path), True
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir():
+                        with archive.open(info) as handle:
+                            yield f'{path}:{info.filename}', handle, info.file_size, False
+        else:
+            with open(path, 'rb') as handle:
+                yield path, handle, os.path.getsize(path), True
+
+
+def iter_sample_chunks(fileobj, seekable, start_offset=0, sample_every=BENCHMARK_SAMPLE_EVERY, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Yield (chunk, bytes_consumed) for the chunks of one benchmark input.
+
+    Samples start every sample_every chunks of the concatenated inputs, with
+    start_offset the position of this input in that concatenation, so many
+    small files do not each contribute a sample. Seekable inputs skip the data
+    between samples; streams read and discard it.
+    """
+    stride = sample_every * chunk_bytes
+    position = 0
+    while True:
+        next_sample = -(start_offset + position) % stride
+        if next_sample:
+            if seekable:
+                fileobj.seek(next_sample, os.SEEK_CUR)
+                position += next_sample
+            else:
+                while next_sample:
+                    skipped = fileobj.read(min(next_sample, READ_BYTES))
+                    if not skipped:
+                        return
+                    position += len(skipped)
+                    next_sample -= len(skipped)
+        chunk = fileobj.read(chunk_bytes)
+        if not chunk:
+            return
+        position += len(chunk)
+        yield chunk, position
+
+
+def benchmark_compression(
+    paths, profiles=None, threads=None, sample_every=BENCHMARK_SAMPLE_EVERY, chunk_bytes=DEFAULT_CHUNK_BYTES,
+):
+    """Compress samples of an artifact with each profile and project the totals.
+
+    Returns one result per profile with the sampled ratio (compressed over
+    uncompressed bytes), the single-thread throughput, and the estimated
+    archive size and packaging time for the whole artifact at `threads`.
+    """
+    profiles = [get_compression_profile(name) for name in (profiles or COMPRESSION_PROFILES)]
+    threads = threads or os.cpu_count() or 1
+    totals = {name: {'compressed_bytes': 0, 'seconds': 0.0} for name in profiles}
+    crc_seconds = 0.0
+    sample_bytes = 0
+    total_bytes = 0
+
+    for _, fileobj, size, seekable in iter_benchmark_sources(paths):
+        consumed = 0
+        for chunk, consumed in iter_sample_chunks(fileobj, seekable, total_bytes, sample_every, chunk_bytes):
+            sample_bytes += len(chunk)
+            start = time.perf_counter()
+            zlib.crc32(chunk)
+            crc_seconds += time.perf_counter() - start
+            for name in profiles:
+                level = COMPRESSION_PROFILES[name]['level']
+                if level == 0:
+                    totals[name]['compressed_bytes'] += len(chunk)
+                    continue
+                start = time.perf_counter()
+                compressed = deflate_chunk(chunk, b'', level, final=True)
+                totals[name]['seconds'] += time.perf_counter() - start
+                totals[name]['compressed_bytes'] += len(compressed)
+        total_bytes += size if size is not None else consumed
+
+    results = []
+    for name in profiles:
+        entry = totals[name]
+        ratio = entry['compressed_bytes'] / sample_bytes if sample_bytes else 1.0
+        seconds = entry['seconds'] + crc_seconds
+        scale = total_bytes / sample_bytes if sample_bytes else 0
+        results.append({
+            'profile': name,
+            'level': COMPRESSION_PROFILES[name]['level'],
+            'sample_bytes': sample_bytes,
+            'total_bytes': total_bytes,
+            'ratio': round(ratio, 4),
+            'mb_per_second': round(sample_bytes / seconds / 1e6, 1) if seconds else None,
+            'estimated_bytes': int(total_bytes * ratio),
+            'estimated_seconds': round(scale * (entry['seconds'] / threads + crc_seconds), 1),
+            'threads': threads,
+        })
+    return results
+
+
+def print_compression_benchmark(results, stream=sys.stderr):
+    if not results:
+        return
+    print(
+        f'   Sampled {results[0]["sample_bytes"] / 1e6:.0f} MB of {results[0]["total_bytes"] / 1e6:.0f} MB '
+        f'(estimates at {results[0]["threads"]} threads):',
+        file=stream,
+    )
+    for result in results:
+        throughput = f'{result["mb_per_second"]:.1f} MB/s' if result['mb_per_second'] else 'n/a'
+        print(
+            f'   {result["profile"]:<8} ratio {result["ratio"]:.3f}  {throughput:>12} per thread  '
+            f'~{result["estimated_bytes"] / 1e9:.2f} GB in ~{result["estimated_seconds"]:.0f}s',
+            file=stream,
+        )
+
+
+def append_file_to_zip(zip_path, path, arcname=None):
+    """Append a small file (such as the PDF) to an archive written by this module."""
+    with open(zip_path, 'r+b') as fileobj, open(path, 'rb') as source:
+        with StreamingZipWriter.for_append(fileobj) as archive:
+            archive.write_stream(arcname or os.path.basename(path), source, threads=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stream data into a ZIP64 archive with parallel deflate.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    stream_parser = subparsers.add_parser('stream', help='Write one archive entry from a stream')
+    stream_parser.add_argument('--entry-name', required=True, help='Name of the archive entry')
+    stream_parser.add_argument('--profile', default=DEFAULT_COMPRESSION_PROFILE, help='Compression profile')
+    stream_parser.add_argument('--threads', type=int, default=None, help='Compression threads (default: CPU count)')
+    stream_parser.add_argument('output', help='Archive path to create')
+    stream_parser.add_argument('source', nargs='?', default='-', help='Input path, or - for stdin')
+
+    benchmark_parser = subparsers.add_parser('benchmark', help='Report ratio and time of each profile on samples of an artifact')
+    benchmark_parser.add_argument('--profile', action='append', default=[], help='Profile to measure (repeatable, default: all)')
+    benchmark_parser.add_argument('--threads', type=int, default=None, help='Threads to project packaging time for')
+    benchmark_parser.add_argument('--sample-every', type=int, default=BENCHMARK_SAMPLE_EVERY, help='Compress one chunk out of every N')
+    benchmark_parser.add_argument('--json', help='Write the results to this path')
+    benchmark_parser.add_argument('paths', nargs='+', help='Files, directories, ZIP archives, or - for stdin')
+
+    seven_zip_parser = subparsers.add_parser('7z-args', help='Print the 7-Zip switches of a profile')
+    seven_zip_parser.add_argument('profile', help='Compression profile')
+    args = parser.parse_args(argv)
+    try:
+        profiles = [get_compression_profile(name) for name in args.profile] if args.command == 'benchmark' \
+            else get_compression_profile(args.profile)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    if args.command == '7z-args':
+        print(' '.join(COMPRESSION_PROFILES[profiles]['7z_args']))
+        return
+
+    if args.command == 'benchmark':
+        results = benchmark_compression(args.paths, profiles, threads=args.threads, sample_every=args.sample_every)
+        print('🧪 Compression benchmark:', file=sys.stderr)
+        print_compression_benchmark(results)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as handle:
+                json.dump(results, handle, indent=2)
+        return
+
+    level = COMPRESSION_PROFILES[profiles]['level']
+    source = sys.stdin.buffer if args.source == '-' else open(args.source, 'rb')
+    total_bytes = None if args.source == '-' else os.path.getsize(args.source)
+    reporter = ProgressReporter(f'compressing {args.entry_name}', total_bytes=total_bytes)
+    try:
+        with open(args.output, 'wb') as output, StreamingZipWriter(output) as archive:
+            entry = archive.write_stream(
+                args.entry_name,
+                source,
+                compress=level > 0,
+                level=level,
+                threads=args.threads,
+                progress=reporter.update,
+            )
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+
+    reporter.finish(entry.size, entry.compressed_size)
+    # The uncompressed entry size on stdout lets shell callers record it.
+    print(entry.size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+import contextlib
+import importlib.util
+import io
+import json
+import pathlib
+import socket
+import threading
+import unittest
+from unittest import mock
+
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+BENCHMARK_IMAGE_PY = REPO_ROOT / 'recipes' / 'benchmarkImage.py'
+SPEC = importlib.util.spec_from_file_location('benchmark_image', BENCHMARK_IMAGE_PY)
+benchmark_image = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(benchmark_image)
+
+
+def read_exactly(connection, size):
+    data = b''
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+class FakeMrdServer:
+    """Accept MRD sessions on localhost and answer each close with a close."""
+
+    def __init__(self, close_immediately=False):
+        self.close_immediately = close_immediately
+        self.configs = []
+        self.listener = socket.create_server(('127.0.0.1', 0))
+        self.listener.settimeout(0.05)
+        self.stopped = threading.Event()
+        self.port = self.listener.getsockname()[1]
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        while not self.stopped.is_set():
+            try:
+                connection, _ = self.listener.accept()
+            except socket.timeout:
+                continue
+            with connection:
+                if self.close_immediately:
+                    continue
+                header = read_exactly(connection, 2 + benchmark_image.MRD_CONFIG_FILE_BYTES)
+                if header is None:
+                    continue
+                self.configs.append(header[2:].rstrip(b'\0').decode())
+                read_exactly(connection, 2)
+                length = benchmark_image.MRD_LENGTH_STRUCT.unpack(read_exactly(connection, 4))[0]
+                read_exactly(connection, length + 2)
+                connection.sendall(benchmark_image.MRD_MESSAGE_ID_STRUCT.pack(benchmark_image.MRD_MESSAGE_CLOSE))
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+        self.listener.close()
+
+
+class FakeReconServer(FakeMrdServer):
+    """Read whole MRD sessions and return one image per slice of input."""
+
+    def __init__(self, inputs_per_image):
+        self.inputs_per_image = inputs_per_image
+        self.parameters = []
+        super().__init__()
+
+    def serve(self):
+        while not self.stopped.is_set():
+            try:
+                connection, _ = self.listener.accept()
+            except socket.timeout:
+                continue
+            with connection, connection.makefile('rb') as reader:
+                if len(reader.read(2)) != 2:
+                    continue
+                length = benchmark_image.MRD_LENGTH_STRUCT.unpack(reader.read(4))[0]
+                self.parameters.append(json.loads(reader.read(length))['parameters'])
+                inputs = []
+                while True:
+                    message_id = benchmark_image.read_mrd_message(reader)
+                    if message_id in (None, benchmark_image.MRD_MESSAGE_CLOSE):
+                        break
+                    if message_id != benchmark_image.MRD_MESSAGE_METADATA_XML_TEXT:
+                        inputs.append(message_id)
+                _, images = benchmark_image.create_synthetic_inputs('image', matrix=8, slices=len(inputs) // self.inputs_per_image)
+                connection.sendall(b''.join(images) + benchmark_image.MRD_MESSAGE_ID_STRUCT.pack(benchmark_image.MRD_MESSAGE_CLOSE))
+
+
+class BenchmarkImageTests(unittest.TestCase):
+    def test_summarizes_nearest_rank_percentiles_and_checks_budget(self):
+        summary = benchmark_image.summarize_samples([5.0, 1.0, 2.0, 4.0, 3.0])
+        self.assertEqual((summary['p50'], summary['p90'], summary['max']), (3.0, 5.0, 5.0))
+
+        report = {'image': 'openrecon:v1', 'handshake_seconds': summary}
+        self.assertIsNone(benchmark_image.check_cold_start_budget(report, 5))
+        self.assertIn('over the 4.5 s budget', benchmark_image.check_cold_start_budget(report, 4.5))
+        self.assertEqual(report['budget'], {'seconds': 4.5, 'percentile': 'p90'})
+
+    def test_accept_needs_a_server_that_keeps_the_connection_open(self):
+        server = FakeMrdServer()
+        proxy_without_backend = FakeMrdServer(close_immediately=True)
+        try:
+            self.assertTrue(benchmark_image.try_accept('127.0.0.1', server.port))
+            self.assertFalse(benchmark_image.try_accept('127.0.0.1', proxy_without_backend.port))
+        finally:
+            server.close()
+            proxy_without_backend.close()
+
+    def test_measures_accept_and_handshake_of_a_started_container(self):
+        server = FakeMrdServer()
+
+        def check_output(cmd, **kwargs):
+            if cmd[:2] == ['docker', 'run']:
+                return 'abc123\n'
+            self.assertEqual(cmd, ['docker', 'port', 'abc123', '9002/tcp'])
+            return f'127.0.0.1:{server.port}\n'
+
+        try:
+            with (
+                mock.patch.object(benchmark_image.subprocess, 'check_output', side_effect=check_output),
+                mock.patch.object(benchmark_image.subprocess, 'run') as run_mock,
+                contextlib.redirect_stderr(io.StringIO()),
+            ):
+                report = benchmark_image.benchmark_cold_start('openrecon:v1', 'musclemap', samples=2, timeout=10)
+        finally:
+            server.close()
+
+        self.assertEqual(report['samples'], 2)
+        self.assertEqual(len(report['handshake_seconds']['values']), 2)
+        self.assertLessEqual(report['accept_seconds']['max'], report['handshake_seconds']['max'])
+        self.assertEqual(server.configs[-2:], ['musclemap', 'musclemap'])
+        run_mock.assert_called_with(['docker', 'rm', '-f', 'abc123'], stdout=mock.ANY, stderr=mock.ANY)
+
+    def test_compares_starts_with_and_without_precompiled_bytecode(self):
+        handshakes = iter([1.0, 3.0, 2.0, 5.0])
+
+        def measure(image, config_name, timeout):
+            return {'accept_seconds': 0.5, 'handshake_seconds': next(handshakes)}
+
+        with (
+            mock.patch.object(benchmark_image, 'create_no_bytecode_image', return_value='openrecon-no-bytecode:abc'),
+            mock.patch.object(benchmark_image, 'measure_cold_start', side_effect=measure) as measure_mock,
+            mock.patch.object(benchmark_image.subprocess, 'run') as run_mock,
+            contextlib.redirect_stderr(io.StringIO()),
+        ):
+            report = benchmark_image.benchmark_cold_start('openrecon:v1', 'musclemap', samples=2, compare_bytecode=True)
+
+        self.assertEqual(
+            [call.args[0] for call in measure_mock.call_args_list],
+            ['openrecon:v1', 'openrecon-no-bytecode:abc', 'openrecon:v1', 'openrecon-no-bytecode:abc'],
+        )
+        run_mock.assert_called_once()
+        self.assertEqual(run_mock.call_args.args[0], ['docker', 'image', 'rm', 'openrecon-no-bytecode:abc'])
+        self.assertEqual(report['handshake_seconds']['values'], [1.0, 2.0])
+        self.assertEqual(report['without_bytecode']['handshake_seconds']['values'], [3.0, 5.0])
+        self.assertEqual(report['bytecode_gain_seconds'], 2.0)
+        stream = io.StringIO()
+        benchmark_image.print_cold_start_report(report, stream=stream)
+        self.assertIn('bytecode saves 2.00 s at p50', stream.getvalue())
+
+    def test_no_bytecode_copy_only_drops_the_baked_pycache(self):
+        with mock.patch.object(benchmark_image.sys, 'path', [str(BENCHMARK_IMAGE_PY.parent), *benchmark_image.sys.path]):
+            dockerfile = benchmark_image.create_no_bytecode_dockerfile('openrecon:v1')
+
+        self.assertTrue(dockerfile.startswith('FROM openrecon:v1\n'))
+        self.assertIn('done < /etc/openrecon-bytecode-paths', dockerfile)
+        self.assertIn('ENV PYTHONDONTWRITEBYTECODE=1', dockerfile)
+        self.assertNotIn('PYTHONPYCACHEPREFIX', dockerfile)
+
+    def test_synthetic_inputs_round_trip_through_the_message_reader(self):
+        metadata_xml, acquisitions = benchmark_image.create_synthetic_inputs('raw', matrix=16, slices=2, channels=3)
+        self.assertIn('<receiverChannels>3</receiverChannels>', metadata_xml)
+        self.assertEqual(len(acquisitions), 32)
+        self.assertEqual(len(acquisitions[0]), 2 + 340 + 16 * 3 * 8)
+        _, images = benchmark_image.create_synthetic_inputs('image', matrix=16, slices=2)
+
+        stream = io.BytesIO(acquisitions[-1] + images[0] + benchmark_image.MRD_MESSAGE_ID_STRUCT.pack(4))
+        message_ids = [benchmark_image.read_mrd_message(stream) for _ in range(4)]
+        self.assertEqual(message_ids, [1008, 1022, 4, None])
+        header = benchmark_image.MRD_ACQUISITION_HEADER_STRUCT.unpack(acquisitions[-1][2:342])
+        self.assertTrue(header[1] & benchmark_image.MRD_ACQ_LAST_IN_MEASUREMENT)
+        with self.assertRaises(ValueError):
+            benchmark_image.create_synthetic_inputs('spectra')
+
+    def test_streams_synthetic_data_through_every_config_module(self):
+        server = FakeReconServer(inputs_per_image=16)
+        label = {
+            'reconstruction': {'emitter': 'raw'},
+            'parameters': [
+                {'id': 'config', 'values': [{'id': 'grid'}, {'id': 'nufft'}], 'default': 'grid'},
+                {'id': 'sendoriginal', 'default': True},
+            ],
+        }
+        with mock.patch.object(benchmark_image.sys, 'path', [str(BENCHMARK_IMAGE_PY.parent), *benchmark_image.sys.path]):
+            plan = benchmark_image.get_label_benchmark_plan(label)
+
+        with (
+            mock.patch.object(benchmark_image.subprocess, 'check_output', side_effect=['abc123\n', f'127.0.0.1:{server.port}\n']),
+            mock.patch.object(benchmark_image.subprocess, 'run'),
+            contextlib.redirect_stderr(io.StringIO()),
+        ):
+            try:
+                report = benchmark_image.benchmark_throughput(
+                    'openrecon:v1',
+                    plan['configs'],
+                    plan['emitter'],
+                    parameters=plan['parameters'],
+                    samples=2,
+                    matrix=16,
+                    slices=3,
+                    channels=2,
+                )
+            finally:
+                server.close()
+
+        self.assertEqual(report['input_kind'], 'acquisitions')
+        self.assertEqual(report['inputs'], 48)
+        self.assertEqual(list(report['configs']), ['grid', 'nufft'])
+        self.assertEqual(report['configs']['nufft']['images'], 3)
+        self.assertEqual(len(report['configs']['grid']['latency_seconds']['values']), 2)
+        # Two measured sessions and one warm-up per config module.
+        self.assertEqual(
+            [parameters['config'] for parameters in server.parameters],
+            ['grid', 'grid', 'grid', 'nufft', 'nufft', 'nufft'],
+        )
+        self.assertTrue(server.parameters[0]['sendoriginal'])
+
+    def test_resource_warnings_flag_declared_values_far_from_measured_ones(self):
+        self.assertEqual(benchmark_image.get_cpu_sweep(6), [1, 2, 4, 6])
+        self.assertEqual(benchmark_image.get_resource_warnings(4000, 4, 3000, 4, 8), [])
+        warnings = benchmark_image.get_resource_warnings(40096, 32, 3000, 4, 8)
+        self.assertEqual(len(warnings), 2)
+        self.assertIn('over 2x the measured peak of 3000 MB', warnings[0])
+        self.assertIn('stops improving beyond 4 CPUs', warnings[1])
+        warnings = benchmark_image.get_resource_warnings(2000, 1, 3000, 8, 8)
+        self.assertIn('peaked at 3000 MB', warnings[0])
+        self.assertIn('keeps improving up to 8 CPUs', warnings[1])
+        # A host with fewer CPUs than declared cannot show over-declaration.
+        self.assertEqual(benchmark_image.get_resource_warnings(None, 32, None, 4, 4), [])
+
+    def test_profile_sweeps_cpus_then_memory_caps(self):
+        points = {
+            (1, None): {'wall_seconds': 8.0, 'peak_memory_mb': 1800},
+            (2, None): {'wall_seconds': 4.2, 'peak_memory_mb': 2000},
+            (4, None): {'wall_seconds': 4.0, 'peak_memory_mb': 1900},
+            (4, 1000): {'oom_killed': True, 'error': 'container exited'},
+            (4, 2500): {'wall_seconds': 4.1, 'peak_memory_mb': 2000},
+            (4, 8000): {'wall_seconds': 4.0, 'peak_memory_mb': 2000},
+        }
+
+        def measure(image, config_name, metadata_xml, inputs, cpus=None, memory_mb=None, **kwargs):
+            return {'cpus': cpus, 'memory_mb': memory_mb, **points[(cpus, memory_mb)]}
+
+        with (
+            mock.patch.object(benchmark_image, 'get_docker_host_resources', return_value=(4, 16000)),
+            mock.patch.object(benchmark_image, 'measure_resource_point', side_effect=measure),
+            contextlib.redirect_stderr(io.StringIO()),
+        ):
+            report = benchmark_image.profile_resources(
+                'openrecon:v1', 'grid', 'image', declared_memory_mb=8000, declared_cpus=16, matrix=8, slices=1,
+            )
+
+        self.assertEqual([point['cpus'] for point in report['cpu_sweep']], [1, 2, 4])
+        self.assertEqual(report['cpu_sweep'][2]['speedup'], 2.0)
+        self.assertEqual([point['memory_mb'] for point in report['memory_sweep']], [1000, 2500, 8000])
+        self.assertEqual(
+            report['measured'],
+            {'peak_memory_mb': 2000, 'effective_cpus': 2, 'min_working_memory_mb': 2500},
+        )
+        self.assertEqual(len(report['warnings']), 2)
+        self.assertIn('over 2x the measured peak', report['warnings'][0])
+        self.assertIn('stops improving beyond 2 CPUs', report['warnings'][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
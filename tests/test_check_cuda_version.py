@@ -1,4 +1,6 @@
+import contextlib
 import importlib.util
+import io
 import pathlib
 import unittest
 
@@ -11,23 +13,18 @@ SPEC.loader.exec_module(check_cuda_version)
 
 
 class CheckCudaVersionTests(unittest.TestCase):
-    def test_parses_pytorch_cuda_version_after_shell_warning(self):
-        output = (
-            'bash: /opt/conda/lib/libtinfo.so.6: no version information '
-            'available (required by bash)\n'
-            '11.8\n'
-        )
-
-        self.assertEqual(check_cuda_version._parse_pytorch_cuda_version(output), '11.8')
-
-    def test_treats_pytorch_without_cuda_as_missing(self):
-        output = (
-            'bash: /opt/conda/lib/libtinfo.so.6: no version information '
-            'available (required by bash)\n'
-            'None\n'
-        )
-
-        self.assertIsNone(check_cuda_version._parse_pytorch_cuda_version(output))
+    def test_accepts_probe_without_cuda(self):
+        probe = {'nvcc_cuda_version': None, 'torch_cuda_version': None}
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            check_cuda_version.checkCudaVersionInContainer('image:test', probe=probe)
+
+    def test_rejects_probe_with_newer_pytorch_cuda(self):
+        probe = {'nvcc_cuda_version': '11.8', 'torch_cuda_version': '12.1'}
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaisesRegex(Exception, 'PyTorch CUDA version 12.1'):
+                check_cuda_version.checkCudaVersionInContainer('image:test', maxCudaVersion='11.8', probe=probe)
 
 
 if __name__ == '__main__':
@@ -1,4 +1,6 @@
+import contextlib
 import importlib.util
+import io
 import pathlib
 import unittest
 
@@ -11,23 +13,14 @@ SPEC.loader.exec_module(check_root_user)
 
 
 class CheckRootUserTests(unittest.TestCase):
-    def test_parses_uid_after_shell_warning(self):
-        output = (
-            'bash: /opt/conda/lib/libtinfo.so.6: no version information '
-            'available (required by bash)\n'
-            '0\n'
-        )
-
-        self.assertEqual(check_root_user._parse_user_id(output), 0)
-
-    def test_rejects_output_without_uid(self):
-        output = (
-            'bash: /opt/conda/lib/libtinfo.so.6: no version information '
-            'available (required by bash)\n'
-        )
-
-        with self.assertRaises(ValueError):
-            check_root_user._parse_user_id(output)
+    def test_accepts_probe_of_root_image(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            check_root_user.checkRootUserInContainer('image:test', probe={'uid': 0, 'username': 'root'})
+
+    def test_rejects_probe_of_non_root_image(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaisesRegex(Exception, "user 'neuro' \\(UID: 1000\\)"):
+                check_root_user.checkRootUserInContainer('image:test', probe={'uid': 1000, 'username': 'neuro'})
 
 
 if __name__ == '__main__':
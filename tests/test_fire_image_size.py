@@ -0,0 +1,133 @@
+import importlib.util
+import io
+import os
+import pathlib
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import unittest
+
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+FIRE_IMAGE_SIZE_PY = REPO_ROOT / 'recipes' / 'fireImageSize.py'
+SPEC = importlib.util.spec_from_file_location('fire_image_size', FIRE_IMAGE_SIZE_PY)
+fire_image_size = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(fire_image_size)
+
+
+def rootfs_tar_bytes(entries):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w', format=tarfile.PAX_FORMAT) as archive:
+        for name, kind, value in entries:
+            member = tarfile.TarInfo(name)
+            if kind == 'dir':
+                member.type = tarfile.DIRTYPE
+                archive.addfile(member)
+            elif kind == 'file':
+                member.size = len(value)
+                archive.addfile(member, io.BytesIO(value))
+            elif kind == 'symlink':
+                member.type = tarfile.SYMTYPE
+                member.linkname = value
+                archive.addfile(member)
+            elif kind == 'hardlink':
+                member.type = tarfile.LNKTYPE
+                member.linkname = value
+                archive.addfile(member)
+    return buffer.getvalue()
+
+
+class FireImageSizeTests(unittest.TestCase):
+    def test_counts_ext3_indirect_blocks(self):
+        self.assertEqual(fire_image_size.get_file_block_count(0), 0)
+        self.assertEqual(fire_image_size.get_file_block_count(12 * 4096), 12)
+        self.assertEqual(fire_image_size.get_file_block_count(13 * 4096), 14)
+        self.assertEqual(fire_image_size.get_file_block_count((12 + 1024) * 4096), 12 + 1024 + 1)
+        self.assertEqual(fire_image_size.get_file_block_count((12 + 1024 + 1) * 4096), 12 + 1024 + 1 + 1 + 2)
+
+    def test_scans_tar_headers_for_blocks_and_inodes(self):
+        scan = fire_image_size.scan_rootfs_tar(io.BytesIO(rootfs_tar_bytes([
+            ('./usr', 'dir', None),
+            ('./usr/bin/python3', 'file', b'x' * 5000),
+            ('./usr/bin/python', 'hardlink', 'usr/bin/python3'),
+            ('./usr/bin/py', 'symlink', 'python3'),
+            ('./usr/lib/long', 'symlink', '/' + 'a' * 80),
+            ('./etc/empty', 'file', b''),
+        ])))
+
+        self.assertEqual(scan['apparent_bytes'], 5000)
+        # python3 needs two data blocks and the long symlink one; the short
+        # symlink and the hard link need none.
+        self.assertEqual(scan['file_blocks'], 3)
+        # root, usr, usr/bin, usr/lib, etc: one block each.
+        self.assertEqual(scan['directory_blocks'], 5)
+        # root, 4 directories, python3, py, long and empty.
+        self.assertEqual(scan['inodes'], 9)
+
+    def test_scans_extracted_tree_like_its_tar_stream(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            rootfs = pathlib.Path(tmpdir) / 'rootfs'
+            (rootfs / 'usr' / 'bin').mkdir(parents=True)
+            (rootfs / 'usr' / 'lib' / '__pycache__').mkdir(parents=True)
+            (rootfs / 'etc').mkdir()
+            (rootfs / 'usr' / 'bin' / 'python3').write_bytes(b'x' * 5000)
+            os.link(rootfs / 'usr' / 'bin' / 'python3', rootfs / 'usr' / 'bin' / 'python')
+            (rootfs / 'usr' / 'bin' / 'py').symlink_to('python3')
+            (rootfs / 'usr' / 'lib' / 'long').symlink_to('/' + 'a' * 80)
+            (rootfs / 'usr' / 'lib64').symlink_to('lib')
+            (rootfs / 'usr' / 'lib' / '__pycache__' / 'site.cpython-311.pyc').write_bytes(b'c' * 100)
+            (rootfs / 'etc' / 'empty').write_bytes(b'')
+
+            tar_path = pathlib.Path(tmpdir) / 'rootfs.tar'
+            with tarfile.open(tar_path, 'w') as archive:
+                archive.add(rootfs, arcname='.')
+            with open(tar_path, 'rb') as source:
+                tar_scan = fire_image_size.scan_rootfs_tar(source)
+
+            self.assertEqual(fire_image_size.scan_rootfs_tree(rootfs), tar_scan)
+
+    def test_reserved_gdt_blocks_follow_mke2fs(self):
+        # Values reported by dumpe2fs for 1, 5 and 20 GiB mke2fs -t ext3 images.
+        for fs_blocks, reserved in ((262144, 63), (1310720, 319), (5242880, 1022)):
+            descriptor_blocks = fire_image_size.ceil_div(fire_image_size.ceil_div(fs_blocks, 32768) * 32, 4096)
+            self.assertEqual(fire_image_size.get_reserved_gdt_blocks(fs_blocks, descriptor_blocks), reserved)
+
+    def test_image_size_covers_free_space_and_inode_budget(self):
+        scan = {'apparent_bytes': 0, 'file_blocks': 1000, 'directory_blocks': 10, 'inodes': 500}
+
+        sized = fire_image_size.compute_ext3_image_size(scan, free_space_bytes=64 * 1024 * 1024)
+
+        self.assertEqual(sized['image_bytes'] % (1024 * 1024), 0)
+        self.assertGreater(sized['image_bytes'], (1010 * 4096) + 64 * 1024 * 1024)
+        self.assertGreaterEqual(sized['inode_count'], 500 + 64 * 1024 * 1024 // 16384)
+
+    @unittest.skipUnless(shutil.which('mke2fs'), 'mke2fs is not installed')
+    def test_computed_size_fits_mke2fs_populated_image(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir = pathlib.Path(tmpdir)
+            rootfs = tmpdir / 'rootfs'
+            for index in range(300):
+                package_dir = rootfs / 'usr' / 'lib' / f'package_{index // 50}'
+                package_dir.mkdir(parents=True, exist_ok=True)
+                (package_dir / f'module_with_a_long_name_{index}.py').write_bytes(b'#' * (index * 97))
+            (rootfs / 'opt').mkdir()
+            (rootfs / 'opt' / 'weights.bin').write_bytes(b'w' * (6 * 1024 * 1024))
+
+            sized = fire_image_size.compute_ext3_image_size(fire_image_size.scan_rootfs_tree(rootfs))
+
+            image_path = tmpdir / 'FIRE_test.img'
+            with open(image_path, 'wb') as image:
+                image.truncate(sized['image_bytes'])
+            subprocess.run(
+                [
+                    'mke2fs', '-F', '-q', '-t', 'ext3', '-b', str(sized['block_size']), '-I', '256',
+                    '-N', str(sized['inode_count']), '-d', str(rootfs), str(image_path),
+                ],
+                check=True,
+                capture_output=True,
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
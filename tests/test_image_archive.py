@@ -0,0 +1,200 @@
+import hashlib
+import importlib.util
+import io
+import json
+import pathlib
+import re
+import tarfile
+import unittest
+
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+IMAGE_ARCHIVE_PY = REPO_ROOT / 'recipes' / 'imageArchive.py'
+SPEC = importlib.util.spec_from_file_location('image_archive', IMAGE_ARCHIVE_PY)
+image_archive = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(image_archive)
+
+
+def tar_bytes(members):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w', format=tarfile.USTAR_FORMAT) as archive:
+        for name, data in members.items():
+            member = tarfile.TarInfo(name)
+            member.size = len(data)
+            archive.addfile(member, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def read_tar_members(data):
+    with tarfile.open(fileobj=io.BytesIO(data), mode='r') as archive:
+        return {member.name: archive.extractfile(member).read() for member in archive if member.isfile()}
+
+
+BASE_CONFIG = {
+    'architecture': 'amd64',
+    'os': 'linux',
+    'config': {'Env': ['PATH=/usr/bin'], 'Entrypoint': None, 'Cmd': ['bash'], 'Labels': {'base': 'yes'}},
+    'rootfs': {'type': 'layers', 'diff_ids': ['sha256:layer']},
+    'history': [{'created_by': 'base'}],
+}
+
+
+class ImageArchiveRewriteTests(unittest.TestCase):
+    def rewrite(self, source_members):
+        source = io.BytesIO(tar_bytes(source_members))
+        target = io.BytesIO()
+        image_id = image_archive.rewrite_image_archive(
+            source,
+            target,
+            'openrecon_test:v1.0.0',
+            labels={'openrecon.metadata': 'encoded'},
+            cmd=['/bin/bash', '-c', 'exec server'],
+            created='2026-01-01T00:00:00Z',
+        )
+        return image_id, read_tar_members(target.getvalue())
+
+    def test_rewrites_docker_save_config_and_keeps_layers(self):
+        layer = tar_bytes({'opt/code/main.py': b'print(1)\n'})
+        image_id, members = self.rewrite({
+            'abc/layer.tar': layer,
+            'abc/json': b'{"id":"abc"}',
+            'oldconfig.json': json.dumps(BASE_CONFIG).encode(),
+            'manifest.json': json.dumps([
+                {'Config': 'oldconfig.json', 'RepoTags': ['base:1'], 'Layers': ['abc/layer.tar']},
+            ]).encode(),
+            'repositories': json.dumps({'base': {'1': 'abc'}}).encode(),
+        })
+
+        manifest = json.loads(members['manifest.json'])
+        config_name = manifest[0]['Config']
+        config_blob = members[config_name]
+        config = json.loads(config_blob)
+
+        self.assertEqual(members['abc/layer.tar'], layer)
+        self.assertNotIn('oldconfig.json', members)
+        self.assertEqual(image_id, 'sha256:' + hashlib.sha256(config_blob).hexdigest())
+        self.assertEqual(config_name, hashlib.sha256(config_blob).hexdigest() + '.json')
+        self.assertEqual(manifest[0]['RepoTags'], ['openrecon_test:v1.0.0'])
+        self.assertEqual(manifest[0]['Layers'], ['abc/layer.tar'])
+        self.assertEqual(config['config']['Labels'], {'base': 'yes', 'openrecon.metadata': 'encoded'})
+        self.assertEqual(config['config']['Cmd'], ['/bin/bash', '-c', 'exec server'])
+        self.assertEqual(config['config']['Env'], ['PATH=/usr/bin'])
+        self.assertEqual(config['rootfs'], BASE_CONFIG['rootfs'])
+        self.assertTrue(all(entry['empty_layer'] for entry in config['history'][1:]))
+        self.assertEqual(json.loads(members['repositories']), {'openrecon_test': {'v1.0.0': 'abc'}})
+
+    def test_rewrites_oci_layout_manifest_and_index(self):
+        layer = b'layer-bytes'
+        layer_hex = hashlib.sha256(layer).hexdigest()
+        config_blob = json.dumps(BASE_CONFIG).encode()
+        config_hex = hashlib.sha256(config_blob).hexdigest()
+        oci_manifest = json.dumps({
+            'schemaVersion': 2,
+            'mediaType': 'application/vnd.oci.image.manifest.v1+json',
+            'config': {'mediaType': 'application/vnd.oci.image.config.v1+json', 'digest': f'sha256:{config_hex}', 'size': len(config_blob)},
+            'layers': [{'mediaType': 'application/vnd.oci.image.layer.v1.tar', 'digest': f'sha256:{layer_hex}', 'size': len(layer)}],
+        }).encode()
+        manifest_hex = hashlib.sha256(oci_manifest).hexdigest()
+
+        _, members = self.rewrite({
+            f'blobs/sha256/{layer_hex}': layer,
+            f'blobs/sha256/{config_hex}': config_blob,
+            f'blobs/sha256/{manifest_hex}': oci_manifest,
+            'oci-layout': b'{"imageLayoutVersion":"1.0.0"}',
+            'index.json': json.dumps({
+                'schemaVersion': 2,
+                'manifests': [{'mediaType': 'application/vnd.oci.image.manifest.v1+json', 'digest': f'sha256:{manifest_hex}', 'size': len(oci_manifest)}],
+            }).encode(),
+            'manifest.json': json.dumps([
+                {'Config': f'blobs/sha256/{config_hex}', 'RepoTags': ['base:1'], 'Layers': [f'blobs/sha256/{layer_hex}']},
+            ]).encode(),
+        })
+
+        index = json.loads(members['index.json'])
+        descriptor = index['manifests'][0]
+        new_manifest_blob = members['blobs/sha256/' + descriptor['digest'].split(':', 1)[1]]
+        new_manifest = json.loads(new_manifest_blob)
+        new_config_name = 'blobs/sha256/' + new_manifest['config']['digest'].split(':', 1)[1]
+
+        self.assertEqual(members[f'blobs/sha256/{layer_hex}'], layer)
+        self.assertNotIn(f'blobs/sha256/{config_hex}', members)
+        self.assertNotIn(f'blobs/sha256/{manifest_hex}', members)
+        self.assertEqual(descriptor['size'], len(new_manifest_blob))
+        self.assertEqual(descriptor['annotations']['io.containerd.image.name'], 'openrecon_test:v1.0.0')
+        self.assertEqual(new_manifest['config']['size'], len(members[new_config_name]))
+        self.assertEqual(json.loads(members['manifest.json'])[0]['Config'], new_config_name)
+        self.assertEqual(json.loads(members[new_config_name])['config']['Labels']['openrecon.metadata'], 'encoded')
+
+    def test_rejects_archives_with_multiple_images(self):
+        with self.assertRaisesRegex(ValueError, 'exactly one image'):
+            self.rewrite({
+                'a.json': b'{}',
+                'manifest.json': json.dumps([{'Config': 'a.json'}, {'Config': 'a.json'}]).encode(),
+            })
+
+
+def layer_bytes(entries):
+    """Build a layer tar from (name, data) files, (name, None) dirs and (name, '->target') symlinks."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w', format=tarfile.PAX_FORMAT) as archive:
+        for name, data in entries:
+            member = tarfile.TarInfo(name)
+            if data is None:
+                member.type = tarfile.DIRTYPE
+                archive.addfile(member)
+            elif isinstance(data, str):
+                member.type = tarfile.SYMTYPE
+                member.linkname = data[2:]
+                archive.addfile(member)
+            else:
+                member.size = len(data)
+                archive.addfile(member, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+class ImageArchiveInspectionTests(unittest.TestCase):
+    def test_applies_layers_in_manifest_order_with_whiteouts(self):
+        lower = layer_bytes([
+            ('opt/app/version.txt', b'1'),
+            ('opt/app/old/version.txt', b'old'),
+            ('opt/cache/version.txt', b'cached'),
+            ('opt/current', '->app'),
+        ])
+        upper = layer_bytes([
+            ('opt/app/.wh..wh..opq', b''),
+            ('opt/app/version.txt', b'2'),
+            ('opt/.wh.cache', b''),
+            ('opt/unrelated.txt', b'skip'),
+        ])
+        config = json.dumps(BASE_CONFIG).encode()
+        # Layers are listed out of order in the archive, and the upper layer
+        # is stored as a symlink to a deduplicated copy as docker save does.
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode='w', format=tarfile.PAX_FORMAT) as target:
+            for name, data in [('upper/layer.tar', upper), ('lower/layer.tar', lower), ('config.json', config)]:
+                member = tarfile.TarInfo(name)
+                member.size = len(data)
+                target.addfile(member, io.BytesIO(data))
+            alias = tarfile.TarInfo('alias/layer.tar')
+            alias.type = tarfile.SYMTYPE
+            alias.linkname = '../upper/layer.tar'
+            target.addfile(alias)
+            manifest = json.dumps([{'Config': 'config.json', 'Layers': ['lower/layer.tar', 'alias/layer.tar']}]).encode()
+            member = tarfile.TarInfo('manifest.json')
+            member.size = len(manifest)
+            target.addfile(member, io.BytesIO(manifest))
+        archive.seek(0)
+
+        inspection = image_archive.inspect_image_archive(archive, re.compile(r'/version\.txt$'), re.compile(r'/app/'))
+
+        self.assertEqual(inspection['config'], BASE_CONFIG)
+        self.assertEqual(inspection['files'], {'/opt/app/version.txt': b'2'})
+        self.assertEqual(inspection['symlinks'], {'/opt/current': 'app'})
+        self.assertEqual(
+            image_archive.resolve_image_path('/opt/current/version.txt', inspection['symlinks']),
+            '/opt/app/version.txt',
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
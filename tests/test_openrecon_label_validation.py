@@ -1,8 +1,15 @@
+import base64
+import contextlib
 import importlib.util
+import io
 import json
+import os
 import pathlib
+import re
+import shlex
 import subprocess
 import tempfile
+import time
 import unittest
 from unittest import mock
 
@@ -368,6 +375,9 @@ class OpenReconLabelValidationTests(unittest.TestCase):
         self.assertIn('"$OPENRECON_PYTHON" - "$@"', script)
         self.assertIn('Nested validation container could not start', script)
         self.assertIn('docker cp "${tmp_container}:/." "${validation_root}"', script)
+        self.assertIn('.GraphDriver.Data.UpperDir', script)
+        self.assertIn('mount -t overlay overlay -o "lowerdir=${image_layer_dirs},upperdir=', script)
+        self.assertIn('mount -t tmpfs tmpfs "${validation_scratch}"', script)
         self.assertIn('create_chroot_device urandom 1 9', script)
         self.assertIn('mknod -m 666 "${device_path}"', script)
         self.assertIn('openrecon_config_validation_env.sh', script)
@@ -385,7 +395,7 @@ class OpenReconLabelValidationTests(unittest.TestCase):
 
         self.assertIn('run_direct_config_validation=0', script)
         self.assertIn(
-            'Compatibility mode: using copied-rootfs validation',
+            'Compatibility mode: using chroot validation',
             script,
         )
         self.assertIn('docker cp "${tmp_container}:/." "${validation_root}"', script)
@@ -409,7 +419,6 @@ class OpenReconLabelValidationTests(unittest.TestCase):
                 dockerfile_path='OpenRecon.dockerfile',
                 openrecon_tar_name='OpenRecon_test.tar',
                 fire_img_name='FIRE_test.img',
-                fire_rootfs_tar_name='FIRE_test.rootfs.tar',
                 create_openrecon_package=False,
                 create_fire_package=True,
                 use_local_image=False,
@@ -424,10 +433,10 @@ class OpenReconLabelValidationTests(unittest.TestCase):
             )
 
         docker_build_script = run_dind_mock.call_args.args[0][-1]
-        fire_device_path = 'device_path="${mount_dir}/dev/${device_name}"'
+        fire_device_path = 'device_path="${extract_dir}/dev/${device_name}"'
         fire_validation = 'echo "🔍 Validating FIRE chroot contents..."'
 
-        self.assertIn('mkdir -p "${mount_dir}/dev"', docker_build_script)
+        self.assertIn('mkdir -p "${extract_dir}/dev"', docker_build_script)
         self.assertIn(fire_device_path, docker_build_script)
         self.assertIn('create_chroot_device null 1 3', docker_build_script)
         self.assertIn('create_chroot_device zero 1 5', docker_build_script)
@@ -435,6 +444,634 @@ class OpenReconLabelValidationTests(unittest.TestCase):
         self.assertIn('create_chroot_device urandom 1 9', docker_build_script)
         self.assertLess(docker_build_script.index(fire_device_path), docker_build_script.index(fire_validation))
 
+    def test_fire_image_is_populated_without_loop_mount(self):
+        script = openrecon_build.create_fire_image_writer_script(
+            'FIRE_test.img',
+            50,
+            openrecon_build.get_fire_server_command(),
+            '/usr/local/bin/start-fire-openrecon.sh',
+            True,
+        )
+
+        self.assertIn('tar -xf - -C "${extract_dir}"', script)
+        self.assertIn(
+            'mke2fs -F -q -t ext3 -b "${fire_block_size}" -I 256 -N "${fire_inode_count}" -d "${extract_dir}" /workspace/FIRE_test.img',
+            script,
+        )
+        self.assertIn('fireImageSize.py --format shell --free-space-mb 50 --rootfs-dir "${extract_dir}"', script)
+        self.assertIn('( set -o pipefail; cat | tar -xf - -C "${extract_dir}" )', script)
+        self.assertNotIn('du -sb', script)
+        self.assertIn('> "${extract_dir}/etc/openrecon-fire-env.sh"', script)
+        self.assertIn('> "${extract_dir}/usr/local/bin/start-fire-openrecon.sh"', script)
+        self.assertNotIn('mount', script)
+        self.assertNotIn('cp -a', script)
+        self.assertLess(script.index('openrecon_phase end fire-validate'), script.index('mke2fs'))
+        # The image is sized after the bake so its bytecode and linker cache fit.
+        self.assertLess(script.index('/tmp/openrecon_bake.sh;'), script.index('fireImageSize.py'))
+        self.assertLess(script.index('fireImageSize.py'), script.index('truncate -s'))
+
+    def test_fire_image_bakes_linker_cache_and_python_inside_the_chroot(self):
+        script = openrecon_build.create_fire_image_writer_script(
+            'FIRE_test.img',
+            50,
+            openrecon_build.get_fire_server_command(),
+            '/usr/local/bin/start-fire-openrecon.sh',
+            True,
+        )
+        bake_b64 = re.search(r'echo (\S+) \| base64 -d > "\$\{extract_dir\}/tmp/openrecon_bake.sh"', script).group(1)
+        bake_sh = base64.b64decode(bake_b64).decode()
+
+        self.assertTrue(bake_sh.startswith('set -eu\n. /etc/openrecon-fire-env.sh\n'))
+        self.assertIn('/usr/sbin/ldconfig -v', bake_sh)
+        self.assertIn('> /etc/openrecon-python', bake_sh)
+        self.assertIn('> /etc/openrecon-ld-dirs', bake_sh)
+        self.assertLess(script.index('/tmp/openrecon_bake.sh;'), script.index('OPENRECON_FIRE_VALIDATE_STARTUP=1'))
+
+    def test_fire_image_shrink_to_fit_is_optional(self):
+        args = ('FIRE_test.img', 50, openrecon_build.get_fire_server_command(), '/usr/local/bin/start-fire-openrecon.sh', True)
+
+        default_script = openrecon_build.create_fire_image_writer_script(*args)
+        shrink_script = openrecon_build.create_fire_image_writer_script(*args, shrink_to_fit=True)
+
+        self.assertIn('if [ "0" = "1" ]; then', default_script)
+        self.assertIn('if [ "1" = "1" ]; then', shrink_script)
+        self.assertIn('resize2fs -M /workspace/FIRE_test.img >/dev/null;', shrink_script)
+        # Alpine ships resize2fs and dumpe2fs in e2fsprogs-extra.
+        self.assertIn('e2fsprogs-extra', openrecon_build.BUILD_TOOLS_IMAGE_PACKAGES)
+        self.assertIn('target_blocks=$(( min_blocks + (50 * 1048576 + fire_block_size - 1) / fire_block_size ))', shrink_script)
+        self.assertIn('openrecon_phase metric fire-image-bytes-shrunk "${shrunk_img_bytes}"', shrink_script)
+        self.assertLess(shrink_script.index('e2fsck -f -y'), shrink_script.index('resize2fs -M'))
+        self.assertLess(shrink_script.index('openrecon_phase end fire-populate'), shrink_script.index('resize2fs -M'))
+
+    def test_prune_rules_come_from_params_and_sidecar_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            recipe_dir = pathlib.Path(tmpdir)
+            (recipe_dir / 'prune.rules').write_text('# caches\n@pip-cache\n/opt/fsl/doc/*\n')
+            with (
+                mock.patch.dict(openrecon_build.os.environ, {'pruneRules': '@docs @pip-cache'}),
+                mock.patch.object(openrecon_build.sys, 'path', [str(BUILD_PY.parent), *openrecon_build.sys.path]),
+            ):
+                rules = openrecon_build.get_prune_rules(recipe_dir)
+
+        self.assertEqual(rules, ['@docs', '@pip-cache', '/opt/fsl/doc/*'])
+
+    def test_fire_writer_prunes_stream_and_revalidates_config_modules(self):
+        script = openrecon_build.create_fire_image_writer_script(
+            'FIRE_test.img',
+            50,
+            openrecon_build.get_fire_server_command(),
+            '/usr/local/bin/start-fire-openrecon.sh',
+            True,
+            prune_rules=['@docs', '/opt/big data/*'],
+            config_module_names=['openreconexample'],
+        )
+
+        self.assertIn(
+            "( set -o pipefail; python3 /opt/openrecon-build/rootfsPrune.py --rule @docs --rule '/opt/big data/*' "
+            '--report /workspace/.openrecon-prune-fire.json filter --spill-dir /tmp | tar -xf - -C "${extract_dir}"',
+            script,
+        )
+        self.assertIn('if [ "1" = "1" ]; then\n                echo "🔍 Validating OpenRecon config modules inside the pruned FIRE chroot..."', script)
+        self.assertIn('chroot "${extract_dir}" /bin/sh /tmp/openrecon_config_validation.sh \'["openreconexample"]\'', script)
+        self.assertLess(script.index('openrecon_config_validation.sh'), script.index('mke2fs'))
+
+        unpruned_script = openrecon_build.create_fire_image_writer_script(
+            'FIRE_test.img', 50, openrecon_build.get_fire_server_command(), '/usr/local/bin/start-fire-openrecon.sh', True,
+        )
+        self.assertIn('( set -o pipefail; cat | tar -xf -', unpruned_script)
+        self.assertNotIn('rootfsPrune.py', unpruned_script)
+
+    def test_rewrite_builder_streams_base_rootfs_into_unprivileged_fire_writer(self):
+        with (
+            mock.patch.object(openrecon_build, 'ensure_build_tools_image', return_value='openrecon-build-tools:test'),
+            mock.patch.object(openrecon_build, 'run_dind_build_process') as run_dind_mock,
+            mock.patch.object(
+                openrecon_build.subprocess,
+                'check_output',
+                side_effect=[b'["PATH=/usr/bin","NAME=it\'s"]\n', b'abc123\n'],
+            ),
+            mock.patch.object(openrecon_build.subprocess, 'run') as run_mock,
+        ):
+            openrecon_build.build_fire_image_without_dind(
+                base_docker_image='base:test',
+                fire_img_name='FIRE_test.img',
+                fire_free_space_mb=50,
+                fire_server_command=openrecon_build.get_fire_server_command(),
+                startup_script_path='/usr/local/bin/start-fire-openrecon.sh',
+                validate_default_runtime=True,
+                force_local_only=False,
+            )
+
+        dind_args = run_dind_mock.call_args.args[0]
+        script = dind_args[-1]
+
+        self.assertNotIn('--privileged', dind_args)
+        self.assertIn('-i', dind_args)
+        self.assertIn('openrecon-build-tools:test', dind_args)
+        self.assertNotIn('apk add', script)
+        self.assertEqual(run_dind_mock.call_args.kwargs['stdin_command'], ['docker', 'export', 'abc123'])
+        self.assertIn("printf '%s\\n' PATH=/usr/bin 'NAME=it'\"'\"'s'", script)
+        self.assertIn('write_fire_image "${fire_env_lines}"', script)
+        run_mock.assert_called_once_with(['docker', 'rm', '-f', 'abc123'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        result = subprocess.run(['sh', '-n'], input=script, text=True, capture_output=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_build_tools_image_is_built_once_and_then_reused(self):
+        missing = subprocess.CalledProcessError(1, ['docker', 'image', 'inspect'])
+        with (
+            mock.patch.object(openrecon_build, 'ensure_dind_image_available') as ensure_dind_mock,
+            mock.patch.object(openrecon_build.subprocess, 'check_output', side_effect=[missing, b'']) as check_output_mock,
+            contextlib.redirect_stdout(io.StringIO()),
+        ):
+            image_name = openrecon_build.ensure_build_tools_image(force_local_only=True)
+
+        self.assertEqual(image_name, openrecon_build.get_build_tools_image())
+        self.assertTrue(image_name.startswith('openrecon-build-tools:'))
+        ensure_dind_mock.assert_called_once_with('docker:24.0-dind', True)
+        build_call = check_output_mock.call_args_list[1]
+        self.assertEqual(build_call.args[0][-3:], ['-t', image_name, '-'])
+        self.assertIn(b'RUN apk add --no-cache e2fsprogs e2fsprogs-extra python3', build_call.kwargs['input'])
+
+        with (
+            mock.patch.object(openrecon_build, 'ensure_dind_image_available') as ensure_dind_mock,
+            mock.patch.object(openrecon_build.subprocess, 'check_output', return_value=b'[]') as check_output_mock,
+        ):
+            self.assertEqual(openrecon_build.ensure_build_tools_image(force_local_only=True), image_name)
+
+        check_output_mock.assert_called_once_with(['docker', 'image', 'inspect', image_name], stderr=subprocess.STDOUT)
+        ensure_dind_mock.assert_not_called()
+
+    def test_openrecon_save_and_fire_export_run_concurrently(self):
+        with (
+            mock.patch.object(openrecon_build, 'ensure_dind_image_available'),
+            mock.patch.object(openrecon_build, 'run_dind_build_process') as run_dind_mock,
+            mock.patch.object(openrecon_build.subprocess, 'check_output'),
+            mock.patch.object(openrecon_build.subprocess, 'run'),
+        ):
+            openrecon_build.build_artifacts_in_dind(
+                docker_image_name='openrecon_test:v1.0.0',
+                dockerfile_path='OpenRecon.dockerfile',
+                openrecon_tar_name='OpenRecon_test.tar',
+                fire_img_name='FIRE_test.img',
+                create_openrecon_package=True,
+                create_fire_package=True,
+                use_local_image=False,
+                base_docker_image='base:test',
+                force_local_only=False,
+                keep_cache=False,
+                fire_free_space_mb=50,
+                fire_server_command=openrecon_build.get_fire_server_command(),
+                startup_script_path='/usr/local/bin/start-fire-openrecon.sh',
+                validate_default_runtime=True,
+                config_module_names=['test'],
+            )
+
+        docker_build_script = run_dind_mock.call_args.args[0][-1]
+
+        self.assertIn('create_fire_chroot_image() (', docker_build_script)
+        self.assertIn('create_openrecon_image_tar &', docker_build_script)
+        self.assertIn('create_fire_chroot_image &', docker_build_script)
+        self.assertIn('echo "❌ OpenRecon image tar creation failed"', docker_build_script)
+        self.assertIn('echo "❌ FIRE chroot image creation failed"', docker_build_script)
+        self.assertLess(
+            docker_build_script.index('create_fire_chroot_image &'),
+            docker_build_script.index('wait "${openrecon_pid}"'),
+        )
+        result = subprocess.run(['sh', '-n'], input=docker_build_script, text=True, capture_output=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_openrecon_zip_is_streamed_from_docker_save(self):
+        with (
+            mock.patch.object(openrecon_build, 'ensure_dind_image_available'),
+            mock.patch.object(openrecon_build, 'run_dind_build_process') as run_dind_mock,
+            mock.patch.object(openrecon_build.subprocess, 'check_output'),
+            mock.patch.object(openrecon_build.subprocess, 'run'),
+            mock.patch.object(openrecon_build.sys, 'path', [str(BUILD_PY.parent), *openrecon_build.sys.path]),
+            mock.patch.dict(openrecon_build.os.environ, {'OPENRECON_ZIP_THREADS': '3', 'compressionProfile': 'fast'}),
+        ):
+            openrecon_build.build_artifacts_in_dind(
+                docker_image_name='openrecon_test:v1.0.0',
+                dockerfile_path='OpenRecon.dockerfile',
+                openrecon_tar_name='OpenRecon_test.tar',
+                fire_img_name='FIRE_test.img',
+                create_openrecon_package=True,
+                create_fire_package=False,
+                use_local_image=False,
+                base_docker_image='base:test',
+                force_local_only=False,
+                keep_cache=False,
+                fire_free_space_mb=50,
+                fire_server_command=openrecon_build.get_fire_server_command(),
+                startup_script_path='/usr/local/bin/start-fire-openrecon.sh',
+                validate_default_runtime=True,
+                config_module_names=['test'],
+                openrecon_zip_name='OpenRecon_test.zip',
+            )
+
+        docker_build_script = run_dind_mock.call_args.args[0][-1]
+
+        self.assertIn(
+            'docker save openrecon_test:v1.0.0 | python3 /opt/openrecon-build/zipStream.py stream '
+            '--entry-name OpenRecon_test.tar --profile fast --threads 3 /workspace/OpenRecon_test.zip',
+            docker_build_script,
+        )
+        self.assertNotIn('docker save -o', docker_build_script)
+        result = subprocess.run(['sh', '-n'], input=docker_build_script, text=True, capture_output=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_openrecon_zip_packager_defaults_to_7z(self):
+        with mock.patch.dict(openrecon_build.os.environ, {}, clear=False):
+            openrecon_build.os.environ.pop('OPENRECON_ZIP_PACKAGER', None)
+            self.assertEqual(openrecon_build.get_openrecon_zip_packager(), '7z')
+
+    def test_openrecon_zip_packager_rejects_unknown_value(self):
+        with mock.patch.dict(openrecon_build.os.environ, {'OPENRECON_ZIP_PACKAGER': 'gzip'}):
+            with self.assertRaisesRegex(ValueError, 'OPENRECON_ZIP_PACKAGER must be one of'):
+                openrecon_build.get_openrecon_zip_packager()
+
+    def test_persistent_dind_builder_reuses_daemon_and_preloaded_base_image(self):
+        with (
+            mock.patch.dict(openrecon_build.os.environ, {'OPENRECON_DIND_BUILDER': 'persistent'}),
+            mock.patch.object(openrecon_build, 'ensure_dind_image_available'),
+            mock.patch.object(openrecon_build, 'ensure_persistent_dind_builder') as ensure_builder_mock,
+            mock.patch.object(openrecon_build, 'resolve_docker_image_id', return_value='sha256:base'),
+            mock.patch.object(openrecon_build, 'get_persistent_dind_builder_image_id', return_value='sha256:base'),
+            mock.patch.object(openrecon_build, 'record_dind_builder_image_use'),
+            mock.patch.object(openrecon_build, 'evict_persistent_dind_builder_images') as evict_mock,
+            mock.patch.object(openrecon_build, 'run_dind_build_process') as run_dind_mock,
+            mock.patch.object(openrecon_build.subprocess, 'check_output') as check_output_mock,
+            mock.patch.object(openrecon_build.subprocess, 'run'),
+        ):
+            base_image_tar = openrecon_build.build_artifacts_in_dind(
+                docker_image_name='openrecon_test:v1.0.0',
+                dockerfile_path='OpenRecon.dockerfile',
+                openrecon_tar_name='OpenRecon_test.tar',
+                fire_img_name='FIRE_test.img',
+                create_openrecon_package=True,
+                create_fire_package=False,
+                use_local_image=True,
+                base_docker_image='base:test',
+                force_local_only=False,
+                keep_cache=False,
+                fire_free_space_mb=50,
+                fire_server_command=openrecon_build.get_fire_server_command(),
+                startup_script_path='/usr/local/bin/start-fire-openrecon.sh',
+                validate_default_runtime=True,
+                config_module_names=['test'],
+            )
+
+        dind_args = run_dind_mock.call_args.args[0]
+        docker_build_script = dind_args[-1]
+
+        self.assertIsNone(base_image_tar)
+        ensure_builder_mock.assert_called_once_with('openrecon-dind-builder', False, registry_mirror=None)
+        self.assertFalse(any('volume' in call.args[0] for call in check_output_mock.call_args_list))
+        self.assertIn('openrecon-dind-builder-run:/var/run/openrecon', dind_args)
+        self.assertNotIn('dockerd --host', docker_build_script)
+        self.assertNotIn('docker load', docker_build_script)
+        self.assertIn('export DOCKER_HOST=unix:///var/run/openrecon/docker.sock', docker_build_script)
+        evict_mock.assert_called_once_with(
+            'openrecon-dind-builder',
+            200 * 1000 ** 3,
+            keep_images=['base:test', 'openrecon_test:v1.0.0'],
+        )
+
+    def test_local_base_image_is_streamed_into_dind_without_tar(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with (
+                mock.patch.object(openrecon_build.os, 'getcwd', return_value=tmpdir),
+                mock.patch.dict(openrecon_build.os.environ, {'OPENRECON_DIND_BUILDER': 'ephemeral'}),
+                mock.patch.object(openrecon_build, 'ensure_dind_image_available'),
+                mock.patch.object(openrecon_build, 'run_dind_build_process') as run_dind_mock,
+                mock.patch.object(openrecon_build.subprocess, 'check_output') as check_output_mock,
+                mock.patch.object(openrecon_build.subprocess, 'run'),
+            ):
+                base_image_tar = openrecon_build.build_artifacts_in_dind(
+                    docker_image_name='openrecon_test:v1.0.0',
+                    dockerfile_path='OpenRecon.dockerfile',
+                    openrecon_tar_name='OpenRecon_test.tar',
+                    fire_img_name='FIRE_test.img',
+                    create_openrecon_package=True,
+                    create_fire_package=False,
+                    use_local_image=True,
+                    base_docker_image='base:test',
+                    force_local_only=False,
+                    keep_cache=False,
+                    fire_free_space_mb=50,
+                    fire_server_command=openrecon_build.get_fire_server_command(),
+                    startup_script_path='/usr/local/bin/start-fire-openrecon.sh',
+                    validate_default_runtime=True,
+                    config_module_names=['test'],
+                )
+
+        dind_args = run_dind_mock.call_args.args[0]
+        docker_build_script = dind_args[-1]
+
+        self.assertIsNone(base_image_tar)
+        self.assertEqual(run_dind_mock.call_args.kwargs['stdin_command'], ['docker', 'save', 'base:test'])
+        self.assertIn('-i', dind_args)
+        self.assertIn('docker load\n', docker_build_script)
+        self.assertNotIn('docker load -i', docker_build_script)
+        self.assertFalse(any('save' in call.args[0] for call in check_output_mock.call_args_list))
+
+    def test_registry_mirror_only_serves_tagged_docker_hub_images(self):
+        self.assertEqual(openrecon_build.get_docker_hub_repository('ubuntu'), ('library/ubuntu', 'latest'))
+        self.assertEqual(openrecon_build.get_docker_hub_repository('vnmd/qsmxt_8.0.0:20250113'), ('vnmd/qsmxt_8.0.0', '20250113'))
+        self.assertEqual(openrecon_build.get_docker_hub_repository('docker.io/vnmd/fsl:6.0'), ('vnmd/fsl', '6.0'))
+        self.assertIsNone(openrecon_build.get_docker_hub_repository('ghcr.io/neurodesk/base:1'))
+        self.assertIsNone(openrecon_build.get_docker_hub_repository('localhost:5000/base:1'))
+        self.assertIsNone(openrecon_build.get_docker_hub_repository('vnmd/base@sha256:abc'))
+
+    def test_registry_mirror_replaces_base_image_stream(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with (
+                mock.patch.object(openrecon_build.os, 'getcwd', return_value=tmpdir),
+                mock.patch.dict(openrecon_build.os.environ, {
+                    'OPENRECON_DIND_BUILDER': 'ephemeral',
+                    'OPENRECON_REGISTRY_MIRROR': 'mirror.local:5000',
+                }),
+                mock.patch.object(openrecon_build, 'ensure_dind_image_available'),
+                mock.patch.object(openrecon_build, 'publish_base_image_to_registry_mirror', return_value=True) as publish_mock,
+                mock.patch.object(openrecon_build, 'run_dind_build_process') as run_dind_mock,
+                mock.patch.object(openrecon_build.subprocess, 'check_output'),
+                mock.patch.object(openrecon_build.subprocess, 'run'),
+            ):
+                base_image_tar = openrecon_build.build_artifacts_in_dind(
+                    docker_image_name='openrecon_test:v1.0.0',
+                    dockerfile_path='OpenRecon.dockerfile',
+                    openrecon_tar_name='OpenRecon_test.tar',
+                    fire_img_name='FIRE_test.img',
+                    create_openrecon_package=True,
+                    create_fire_package=False,
+                    use_local_image=True,
+                    base_docker_image='vnmd/base:test',
+                    force_local_only=False,
+                    keep_cache=False,
+                    fire_free_space_mb=50,
+                    fire_server_command=openrecon_build.get_fire_server_command(),
+                    startup_script_path='/usr/local/bin/start-fire-openrecon.sh',
+                    validate_default_runtime=True,
+                    config_module_names=['test'],
+                )
+
+        dind_args = run_dind_mock.call_args.args[0]
+        docker_build_script = dind_args[-1]
+
+        self.assertIsNone(base_image_tar)
+        publish_mock.assert_called_once_with(
+            'vnmd/base:test',
+            {'url': 'http://mirror.local:5000', 'push_host': 'mirror.local:5000', 'network': None},
+            True,
+        )
+        self.assertIsNone(run_dind_mock.call_args.kwargs['stdin_command'])
+        self.assertNotIn('-i', dind_args)
+        self.assertNotIn('docker load', docker_build_script)
+        self.assertIn('docker pull --platform linux/amd64 vnmd/base:test', docker_build_script)
+        self.assertIn('--registry-mirror=http://mirror.local:5000 --insecure-registry=mirror.local:5000 &', docker_build_script)
+
+    def test_dind_build_process_pipes_stdin_command_into_container(self):
+        class FakeProcess:
+            def __init__(self, returncode, lines=()):
+                self.stdout = mock.MagicMock()
+                self.stdout.__iter__.return_value = iter(lines)
+                self.returncode = returncode
+
+            def wait(self):
+                return self.returncode
+
+            def poll(self):
+                return self.returncode
+
+        save_process = FakeProcess(0)
+        dind_process = FakeProcess(0, ['✓ Base image loaded into DinD daemon\n'])
+
+        with mock.patch.object(openrecon_build.subprocess, 'Popen', side_effect=[save_process, dind_process]) as popen_mock:
+            output = openrecon_build.run_dind_build_process(
+                ['docker', 'run', '-i', 'docker:24.0-dind'],
+                max_attempts=1,
+                stdin_command=['docker', 'save', 'base:test'],
+            )
+
+        self.assertIn('Base image loaded', output)
+        self.assertEqual(popen_mock.call_args_list[0].args[0], ['docker', 'save', 'base:test'])
+        self.assertIs(popen_mock.call_args_list[1].kwargs['stdin'], save_process.stdout)
+        save_process.stdout.close.assert_called_once()
+
+    def test_dind_build_process_records_phase_markers(self):
+        class FakeProcess:
+            def __init__(self, lines):
+                self.stdout = mock.MagicMock()
+                self.stdout.__iter__.return_value = iter(lines)
+                self.returncode = 0
+
+            def wait(self):
+                return self.returncode
+
+        lines = [
+            '##openrecon-phase start openrecon-save\n',
+            '💾 Saving OpenRecon image tar...\n',
+            '##openrecon-phase end openrecon-save 2000000000\n',
+            '##openrecon-phase metric fire-image-bytes-shrunk 734003200\n',
+            '##openrecon-phase start fire-export\n',
+        ]
+        report = openrecon_build.create_build_report('test')
+        output = io.StringIO()
+        with (
+            mock.patch.object(openrecon_build.subprocess, 'Popen', return_value=FakeProcess(lines)),
+            mock.patch.object(openrecon_build.time, 'time', side_effect=[100.0, 110.0, 112.0, 113.0]),
+            contextlib.redirect_stdout(output),
+        ):
+            openrecon_build.run_dind_build_process(['docker', 'run'], max_attempts=1, build_report=report)
+
+        self.assertNotIn('##openrecon-phase', output.getvalue())
+        self.assertIn('openrecon-save: 10.0s (2.00 GB, 200.0 MB/s)', output.getvalue())
+        self.assertEqual(
+            [(phase['name'], phase['status'], phase['duration_seconds']) for phase in report['phases']],
+            [('openrecon-save', 'ok', 10.0), ('fire-export', 'failed', 1.0)],
+        )
+        self.assertEqual(report['phases'][0]['bytes'], 2000000000)
+        self.assertEqual(report['phases'][0]['throughput_mb_per_second'], 200.0)
+        self.assertEqual(report['metrics'], {'fire-image-bytes-shrunk': 734003200})
+
+    def test_build_phase_writes_json_report(self):
+        report = openrecon_build.create_build_report('test')
+        with self.assertRaises(RuntimeError):
+            with openrecon_build.build_phase(report, 'openrecon-zip') as phase:
+                phase['bytes'] = 10
+                raise RuntimeError('7z failed')
+        with openrecon_build.build_phase(report, 'pre-build-checks'):
+            pass
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            report_path = pathlib.Path(tmpdir) / 'report.json'
+            with mock.patch.dict(openrecon_build.os.environ, {'OPENRECON_BUILD_REPORT': str(report_path)}):
+                written_path = openrecon_build.write_build_report(report, openrecon_build.get_build_report_path('test'))
+            written = json.loads(report_path.read_text())
+
+        self.assertEqual(written_path, report_path)
+        self.assertEqual([phase['name'] for phase in written['phases']], ['openrecon-zip', 'pre-build-checks'])
+        self.assertEqual(written['phases'][0]['status'], 'failed')
+        self.assertEqual(written['phases'][0]['bytes'], 10)
+        self.assertIn('duration_seconds', written)
+
+    def test_package_with_7z_follows_its_progress_stream(self):
+        fake_7z_source = '''#!/usr/bin/env python3
+import sys
+args = sys.argv[1:]
+if '-bsp1' not in args:
+    sys.exit(2)
+output = next(arg for arg in args if arg.endswith('.zip'))
+sys.stdout.write('Scanning\\n  0%' + '\\b' * 4 + ' 40% 1 + OpenRecon_test.tar' + '\\b' * 30 + '100%\\n')
+with open(output, 'wb') as handle:
+    handle.write(b'z' * 250)
+'''
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir = pathlib.Path(tmpdir)
+            fake_7z = tmpdir / '7z'
+            fake_7z.write_text(fake_7z_source)
+            fake_7z.chmod(0o755)
+            (tmpdir / 'OpenRecon_test.tar').write_bytes(b't' * 1000)
+            output = io.StringIO()
+            with (
+                mock.patch.object(openrecon_build.sys, 'path', [str(BUILD_PY.parent), *openrecon_build.sys.path]),
+                contextlib.redirect_stdout(output),
+            ):
+                record = openrecon_build.package_with_7z(
+                    str(fake_7z), str(tmpdir / 'OpenRecon_test.zip'), ['OpenRecon_test.tar'], cwd=tmpdir, profile='fast',
+                )
+
+        self.assertEqual(record['input_bytes'], 1000)
+        self.assertEqual(record['output_bytes'], 250)
+        self.assertEqual(record['ratio'], 0.25)
+        self.assertIn('compressing: 0.00 GiB in', output.getvalue())
+
+    def test_streamed_zip_record_comes_from_save_phase_and_zip_size_metric(self):
+        report = openrecon_build.create_build_report('test')
+        openrecon_build.record_build_phase(report, 'openrecon-save', 100.0, 110.0, 2000000000)
+        report['metrics'] = {'openrecon-zip-bytes': 500000000}
+
+        record = openrecon_build.record_packaging_run(
+            report, 'openrecon-zip', 'stream', openrecon_build.get_streamed_zip_record(report), profile='fast',
+        )
+
+        self.assertEqual(report['packaging'], [record])
+        self.assertEqual(record['ratio'], 0.25)
+        self.assertEqual(
+            openrecon_build.format_packaging_record(record),
+            'openrecon-zip (stream, fast): 2.00 GB in 10.0s, 200.0 MB/s, ratio 0.250',
+        )
+
+    def test_parses_docker_system_df_sizes(self):
+        self.assertEqual(openrecon_build.parse_docker_size('0B'), 0)
+        self.assertEqual(openrecon_build.parse_docker_size('12.5kB'), 12500)
+        self.assertEqual(openrecon_build.parse_docker_size('1.5GB (30%)'), 1500000000)
+        with self.assertRaises(ValueError):
+            openrecon_build.parse_docker_size('lots')
+
+    def test_persistent_dind_builder_evicts_least_recently_used_images(self):
+        usage = iter([300, 200, 100])
+
+        with tempfile.TemporaryDirectory() as tmpdir, \
+                mock.patch.dict(openrecon_build.os.environ, {'XDG_CACHE_HOME': tmpdir}), \
+                mock.patch.object(openrecon_build, 'get_persistent_dind_builder_usage_bytes', side_effect=lambda _: next(usage)), \
+                mock.patch.object(
+                    openrecon_build,
+                    'list_persistent_dind_builder_images',
+                    return_value=['new:1', 'old:1', 'current:1', 'unknown:1'],
+                ), \
+                mock.patch.object(openrecon_build.subprocess, 'run') as run_mock:
+            openrecon_build.record_dind_builder_image_use('builder', ['old:1'], timestamp=10)
+            openrecon_build.record_dind_builder_image_use('builder', ['new:1', 'current:1'], timestamp=20)
+
+            evicted = openrecon_build.evict_persistent_dind_builder_images('builder', 150, keep_images=['current:1'])
+
+        self.assertEqual(evicted, ['unknown:1', 'old:1'])
+        removed = [call.args[0][-1] for call in run_mock.call_args_list if 'rmi' in call.args[0]]
+        self.assertEqual(removed, ['unknown:1', 'old:1'])
+
+    def test_multi_recipe_driver_resolves_recipe_names(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name in ('qsmxt', 'musclemap'):
+                (pathlib.Path(tmpdir) / name).mkdir()
+                (pathlib.Path(tmpdir) / name / 'params.sh').write_text('')
+                (pathlib.Path(tmpdir) / name / 'OpenReconLabel.json').write_text('{}')
+            (pathlib.Path(tmpdir) / '__pycache__').mkdir()
+
+            self.assertEqual(openrecon_build.resolve_recipe_names('all', tmpdir), ['musclemap', 'qsmxt'])
+            self.assertEqual(openrecon_build.resolve_recipe_names('qsmxt, musclemap,qsmxt', tmpdir), ['qsmxt', 'musclemap'])
+            with self.assertRaisesRegex(ValueError, 'unknown'):
+                openrecon_build.resolve_recipe_names('qsmxt,unknown', tmpdir)
+
+    def test_multi_recipe_driver_respects_job_budgets(self):
+        disk_usage = mock.Mock(free=50 * 1024 ** 3)
+        with (
+            mock.patch.object(openrecon_build.shutil, 'disk_usage', return_value=disk_usage),
+            mock.patch.object(openrecon_build.os, 'getloadavg', return_value=(0.0, 0.0, 0.0), create=True),
+            mock.patch.object(openrecon_build, 'get_available_memory_bytes', return_value=8 * 1024 ** 3),
+        ):
+            self.assertTrue(openrecon_build.has_multi_recipe_job_capacity(0, 1, '.', 100 * 1024 ** 3, 0))
+            self.assertTrue(openrecon_build.has_multi_recipe_job_capacity(1, 4, '.', 20 * 1024 ** 3, 4 * 1024 ** 3))
+            self.assertFalse(openrecon_build.has_multi_recipe_job_capacity(4, 4, '.', 0, 0))
+            self.assertFalse(openrecon_build.has_multi_recipe_job_capacity(1, 4, '.', 60 * 1024 ** 3, 0))
+            self.assertFalse(openrecon_build.has_multi_recipe_job_capacity(1, 4, '.', 0, 16 * 1024 ** 3))
+
+    def test_multi_recipe_driver_shares_builder_and_reports_results(self):
+        class FakeProcess:
+            def __init__(self, returncode):
+                self.returncode = returncode
+
+            def poll(self):
+                return self.returncode
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = io.StringIO()
+            with (
+                mock.patch.object(openrecon_build, 'resolve_recipe_names', return_value=['qsmxt', 'musclemap']),
+                mock.patch.object(openrecon_build, 'has_multi_recipe_job_capacity', return_value=True),
+                mock.patch.object(openrecon_build, 'prepare_registry_mirror', return_value=None),
+                mock.patch.object(openrecon_build, 'ensure_persistent_dind_builder') as ensure_builder_mock,
+                mock.patch.object(openrecon_build, 'evict_persistent_dind_builder_images') as evict_mock,
+                mock.patch.object(openrecon_build.subprocess, 'Popen', side_effect=[FakeProcess(0), FakeProcess(1)]) as popen_mock,
+                mock.patch.object(openrecon_build.time, 'sleep'),
+                contextlib.redirect_stdout(output),
+            ):
+                exit_code = openrecon_build.run_multi_recipe_build(
+                    ['--recipes', 'qsmxt,musclemap', '--jobs', '2', '--package-selection', 'both', '--log-dir', tmpdir],
+                )
+
+        self.assertEqual(exit_code, 1)
+        ensure_builder_mock.assert_called_once_with('openrecon-dind-builder', False, registry_mirror=None)
+        evict_mock.assert_called_once()
+        child_env = popen_mock.call_args_list[0].kwargs['env']
+        self.assertEqual(child_env['OPENRECON_DIND_BUILDER'], 'persistent')
+        self.assertEqual(child_env['OPENRECON_DIND_BUILDER_EVICTION'], 'false')
+        self.assertEqual(child_env['BUILD_PACKAGE_SELECTION'], 'both')
+        self.assertIs(popen_mock.call_args_list[0].kwargs['stdin'], openrecon_build.subprocess.DEVNULL)
+        self.assertTrue(str(popen_mock.call_args_list[1].kwargs['cwd']).endswith('musclemap'))
+        self.assertRegex(output.getvalue(), r'qsmxt\s+ok')
+        self.assertRegex(output.getvalue(), r'musclemap\s+failed \(1\)')
+
+    def test_terminating_a_recipe_build_stops_its_whole_process_group(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            child_pid_path = pathlib.Path(tmpdir) / 'child.pid'
+            process = subprocess.Popen(
+                ['sh', '-c', f'sleep 60 & echo $! > {child_pid_path}; wait'],
+                start_new_session=True,
+            )
+            while not child_pid_path.exists() or not child_pid_path.read_text().strip():
+                time.sleep(0.01)
+            child_pid = int(child_pid_path.read_text())
+
+            openrecon_build.terminate_process_group(process, timeout=5)
+
+        self.assertIsNotNone(process.returncode)
+        # The orphaned child may linger as a zombie until init reaps it.
+        try:
+            child_state = pathlib.Path(f'/proc/{child_pid}/stat').read_text().rsplit(')', 1)[1].split()[0]
+        except FileNotFoundError:
+            child_state = None
+        self.assertIn(child_state, (None, 'Z'))
+
     def test_retries_transient_dind_wrapper_start_failure(self):
         class FakeStdout:
             def __init__(self, lines):
@@ -553,6 +1190,31 @@ class OpenReconLabelValidationTests(unittest.TestCase):
         self.assertIn('python3 python python3.11', dockerfile_text)
         self.assertIn('OPENRECON_PYTHON', dockerfile_text)
         self.assertNotIn('exec python3 /opt/code/python-ismrmrd-server/main.py', dockerfile_text)
+        run_line = next(line for line in dockerfile_text.splitlines() if line.startswith('RUN '))
+        self.assertEqual(json.loads(run_line[4:]), openrecon_build.create_openrecon_bake_command(['validconfig']))
+        self.assertLess(dockerfile_text.index('RUN '), dockerfile_text.index('CMD '))
+
+    def test_bake_precompiles_server_and_config_modules_with_checked_hashes(self):
+        script = openrecon_build.create_openrecon_bake_script(['musclemap', 'grid'])
+        bytecode_python = openrecon_build.create_openrecon_bytecode_python()
+
+        self.assertIn(
+            '"$openrecon_python" -c ' + shlex.quote(bytecode_python) + ' \'["musclemap", "grid"]\' /etc/openrecon-bytecode-paths',
+            script,
+        )
+        self.assertIn('PycInvalidationMode.CHECKED_HASH', bytecode_python)
+        self.assertIn('compileall.compile_dir(server_dir', bytecode_python)
+        self.assertIn('importlib.util.find_spec(config_module_name)', bytecode_python)
+        self.assertLess(script.index('> /etc/openrecon-python'), script.index('"$openrecon_python" -c'))
+
+    def test_runtime_uses_baked_python_and_falls_back_to_the_resolver(self):
+        command = openrecon_build.create_openrecon_python_runtime_command('/tmp/server.log')
+
+        self.assertIn('[ "$ld_dir" -nt /etc/ld.so.cache ]', command)
+        self.assertIn('if ! openrecon_ld_cache_is_fresh; then\n    /usr/sbin/ldconfig', command)
+        self.assertIn('[ -z "${OPENRECON_PYTHON:-}" ] && [ -r /etc/openrecon-python ]', command)
+        self.assertIn('if [ -n "$openrecon_baked_python" ] && [ -x "$openrecon_baked_python" ]; then', command)
+        self.assertLess(command.index('OPENRECON_PYTHON="$openrecon_baked_python"'), command.index('OPENRECON_PYTHON="$(resolve_openrecon_python)"'))
 
     def test_python_resolver_preserves_explicit_override(self):
         resolver = openrecon_build.create_openrecon_python_resolver_script()
@@ -577,6 +1239,204 @@ class OpenReconLabelValidationTests(unittest.TestCase):
         self.assertIn('python3 python python3.11', startup_script)
         self.assertIn('OPENRECON_FIRE_VALIDATE_STARTUP', startup_script)
 
+    def test_build_cache_key_tracks_label_base_image_and_fire_overrides(self):
+        label = base_label([config_parameter()])
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            recipe_dir = pathlib.Path(tmpdir)
+            (recipe_dir / 'README.md').write_text('# test\n')
+            (recipe_dir / 'README.pdf').write_text('pdf rendered at build time')
+
+            def cache_key(json_data=label, base_image_id='sha256:base'):
+                return openrecon_build.compute_build_cache_key(
+                    json_data,
+                    base_image_id,
+                    'both',
+                    recipe_dir / 'README.pdf',
+                    recipe_dir=recipe_dir,
+                )
+
+            with mock.patch.dict(openrecon_build.os.environ, {}, clear=False):
+                for name in ('fireFreeSpaceMb', openrecon_build.OPENRECON_TAR_BUILDER_ENV, openrecon_build.OPENRECON_ZIP_PACKAGER_ENV):
+                    openrecon_build.os.environ.pop(name, None)
+                key = cache_key()
+                self.assertEqual(key, cache_key())
+
+                (recipe_dir / 'README.pdf').write_text('pdf rendered again')
+                self.assertEqual(key, cache_key())
+
+                self.assertNotEqual(key, cache_key(base_image_id='sha256:other'))
+                self.assertNotEqual(key, cache_key(json_data=base_label([config_parameter(default='other')])))
+
+                (recipe_dir / 'README.md').write_text('# changed\n')
+                changed_readme_key = cache_key()
+                self.assertNotEqual(key, changed_readme_key)
+
+                openrecon_build.os.environ['fireFreeSpaceMb'] = '500'
+                fire_override_key = cache_key()
+                self.assertNotEqual(changed_readme_key, fire_override_key)
+
+                openrecon_build.os.environ[openrecon_build.OPENRECON_TAR_BUILDER_ENV] = 'rewrite'
+                tar_builder_key = cache_key()
+                self.assertNotEqual(fire_override_key, tar_builder_key)
+
+                openrecon_build.os.environ[openrecon_build.OPENRECON_ZIP_PACKAGER_ENV] = 'stream'
+                self.assertNotEqual(tar_builder_key, cache_key())
+
+    def test_build_cache_round_trips_openrecon_zip_and_fire_bundle(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir = pathlib.Path(tmpdir)
+            build_dir = tmpdir / 'build'
+            zip_path = build_dir / 'openrecon' / 'OpenRecon_test_V1.zip'
+            bundle_path = build_dir / 'fire' / 'FIRE_test_V1'
+            (bundle_path / 'Ice' / 'fire' / 'chroot').mkdir(parents=True)
+            zip_path.parent.mkdir(parents=True)
+            zip_path.write_text('zip')
+            (bundle_path / 'Ice' / 'fire' / 'chroot' / 'FIRE_test_V1.img').write_text('img')
+            cache_dir = tmpdir / 'cache'
+
+            self.assertIsNone(openrecon_build.lookup_build_cache_entry(cache_dir, 'abc'))
+            openrecon_build.store_build_cache_entry(
+                cache_dir,
+                'abc',
+                [('openrecon', zip_path), ('fire', bundle_path)],
+                'both',
+            )
+            entry_dir = openrecon_build.lookup_build_cache_entry(cache_dir, 'abc')
+            self.assertIsNotNone(entry_dir)
+
+            output_dir = tmpdir / 'restored'
+            restored = openrecon_build.restore_build_cache_entry(entry_dir, output_dir)
+
+            self.assertEqual([kind for kind, _ in restored], ['openrecon', 'fire'])
+            self.assertEqual((output_dir / 'openrecon' / zip_path.name).read_text(), 'zip')
+            self.assertEqual(
+                (output_dir / 'fire' / bundle_path.name / 'Ice' / 'fire' / 'chroot' / 'FIRE_test_V1.img').read_text(),
+                'img',
+            )
+
+    def test_build_cache_hit_enforces_the_stored_cold_start_budget(self):
+        report = {
+            'image': 'openrecon_test:v1',
+            'samples': 1,
+            'accept_seconds': {'p50': 1.0, 'p90': 1.0, 'max': 1.0},
+            'handshake_seconds': {'p50': 2.0, 'p90': 4.0, 'max': 4.0},
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir = pathlib.Path(tmpdir)
+            zip_path = tmpdir / 'OpenRecon_test_V1.zip'
+            zip_path.write_text('zip')
+            cache_dir = tmpdir / 'cache'
+            openrecon_build.store_build_cache_entry(cache_dir, 'plain', [('openrecon', zip_path)], 'openrecon')
+            openrecon_build.store_build_cache_entry(
+                cache_dir,
+                'benchmarked',
+                [('openrecon', zip_path)],
+                'openrecon',
+                cold_start_benchmark=report,
+            )
+
+            with (
+                mock.patch.object(openrecon_build.sys, 'path', [str(BUILD_PY.parent), *openrecon_build.sys.path]),
+                contextlib.redirect_stdout(io.StringIO()),
+            ):
+                self.assertIsNone(openrecon_build.check_cached_cold_start_budget(cache_dir / 'plain', 5))
+                stored = openrecon_build.check_cached_cold_start_budget(cache_dir / 'benchmarked', 5)
+                with self.assertRaisesRegex(Exception, 'Cold-start budget exceeded'):
+                    openrecon_build.check_cached_cold_start_budget(cache_dir / 'benchmarked', 3)
+
+        self.assertEqual(stored['budget']['seconds'], 5)
+
+    def test_benchmark_cleanup_only_removes_tags_it_created(self):
+        def cleanup(previous_image_id, loaded_image_id):
+            with (
+                mock.patch.object(openrecon_build, 'resolve_docker_image_id', return_value=loaded_image_id),
+                mock.patch.object(openrecon_build.subprocess, 'run') as run,
+            ):
+                openrecon_build.remove_benchmark_image('openrecon_test:v1', previous_image_id)
+            return [call.args[0] for call in run.call_args_list]
+
+        self.assertEqual(cleanup(None, 'sha256:new'), [['docker', 'image', 'rm', 'openrecon_test:v1']])
+        self.assertEqual(cleanup('sha256:same', 'sha256:same'), [])
+        self.assertEqual(
+            cleanup('sha256:old', 'sha256:new'),
+            [
+                ['docker', 'tag', 'sha256:old', 'openrecon_test:v1'],
+                ['docker', 'image', 'rm', 'sha256:new'],
+            ],
+        )
+
+    def test_fire_bundle_stage_moves_image_without_copying(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir = pathlib.Path(tmpdir)
+            fire_img = tmpdir / 'FIRE_test_V1.img'
+            fire_img.write_bytes(b'img')
+            docs = tmpdir / 'OpenRecon_test_V1.pdf'
+            docs.write_text('pdf')
+            image_inode = fire_img.stat().st_ino
+            stage_dir = tmpdir / 'fire' / 'FIRE_test_V1'
+
+            openrecon_build.build_fire_bundle_stage(
+                stage_dir=stage_dir,
+                fire_img_path=fire_img,
+                fire_ini_name=openrecon_build.get_fire_ini_filename('test'),
+                fire_ini_text='[chroot]\n',
+                install_text='install\n',
+                docs_source_path=docs,
+                json_data=base_label([config_parameter()]),
+                package_name='test',
+                recipe_dir=tmpdir,
+                move_image=True,
+            )
+
+            bundled_img = stage_dir / 'Ice' / 'fire' / 'chroot' / fire_img.name
+            self.assertFalse(fire_img.exists())
+            self.assertEqual(bundled_img.read_bytes(), b'img')
+            self.assertEqual(bundled_img.stat().st_ino, image_inode)
+
+    def test_move_file_falls_back_to_copy_across_filesystems(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir = pathlib.Path(tmpdir)
+            source = tmpdir / 'FIRE_test_V1.img'
+            source.write_bytes(b'img')
+            target = tmpdir / 'bundle.img'
+            cross_device = OSError(openrecon_build.errno.EXDEV, 'Invalid cross-device link')
+
+            with (
+                mock.patch.object(openrecon_build.os, 'replace', side_effect=cross_device),
+                mock.patch.object(openrecon_build, 'reflink_file', return_value=False) as reflink_mock,
+            ):
+                openrecon_build.move_file(source, target)
+
+            reflink_mock.assert_called_once_with(source, target)
+            self.assertFalse(source.exists())
+            self.assertEqual(target.read_bytes(), b'img')
+
+    def test_sparse_copy_preserves_holes_and_content(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir = pathlib.Path(tmpdir)
+            source = tmpdir / 'FIRE_test_V1.img'
+            with open(source, 'wb') as handle:
+                handle.truncate(64 * 1024 * 1024)
+                handle.seek(32 * 1024 * 1024)
+                handle.write(b'superblock')
+            target_dir = tmpdir / 'chroot'
+            target_dir.mkdir()
+
+            copied = openrecon_build.copy2_sparse(source, target_dir)
+            target = pathlib.Path(copied)
+
+            self.assertEqual(target, target_dir / source.name)
+            self.assertEqual(target.stat().st_size, source.stat().st_size)
+            with open(target, 'rb') as handle:
+                handle.seek(32 * 1024 * 1024)
+                self.assertEqual(handle.read(10), b'superblock')
+            self.assertLessEqual(
+                openrecon_build.get_path_allocated_bytes(target),
+                openrecon_build.get_path_allocated_bytes(source) + 1024 * 1024,
+            )
+            self.assertLess(openrecon_build.get_path_allocated_bytes(target), source.stat().st_size)
+
     def test_fire_startup_executable_supports_conda_override(self):
         command = '/opt/conda/bin/python3 /opt/code/python-ismrmrd-server/main.py -v -l "$LOG_PATH"'
 
@@ -0,0 +1,142 @@
+import contextlib
+import importlib.util
+import io
+import pathlib
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+PROBE_IMAGE_PY = REPO_ROOT / 'recipes' / 'probeImage.py'
+SPEC = importlib.util.spec_from_file_location('probe_image', PROBE_IMAGE_PY)
+probe_image = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(probe_image)
+
+STATIC_INSPECTION = {
+    'config': {'config': {'Env': ['PATH=/opt/conda/bin:/usr/local/cuda/bin:/usr/bin:/bin'], 'User': ''}},
+    'files': {
+        '/etc/passwd': b'root:x:0:0:root:/root:/bin/bash\nneuro:x:1000:1000::/home/neuro:/bin/bash\n',
+        '/usr/local/cuda-11.8/bin/nvcc': None,
+        '/usr/local/cuda-11.8/version.json': b'{"cuda": {"name": "CUDA SDK", "version": "11.8.0"}}',
+        '/opt/conda/bin/python3.10': None,
+        '/opt/conda/lib/python3.10/site-packages/torch/version.py': b"__version__ = '2.1.0'\ncuda: Optional[str] = '11.8'\n",
+        '/opt/conda/lib/python3.10/site-packages/ismrmrd/__init__.py': None,
+    },
+    'symlinks': {'/usr/local/cuda': 'cuda-11.8', '/opt/conda/bin/python3': 'python3.10'},
+}
+SHELL_WARNING = 'bash: /opt/conda/lib/libtinfo.so.6: no version information available (required by bash)\n'
+PROBE_OUTPUT = (
+    SHELL_WARNING
+    + '##openrecon-probe uid\n'
+    + SHELL_WARNING
+    + '0\n'
+    + '##openrecon-probe username\nroot\n'
+    + '##openrecon-probe nvcc\n'
+    + 'nvcc: NVIDIA (R) Cuda compiler driver\nCuda compilation tools, release 11.8, V11.8.89\n'
+    + '##openrecon-probe pythons\n'
+    + '/opt/conda/bin/python3 3.10.12\n/opt/conda/bin/python3 3.10.12\n/usr/bin/python3 3.8.10\n'
+    + '##openrecon-probe python-modules\n'
+    + 'Some torch warning\n{"torch_cuda": "11.8", "ismrmrd": true}\n'
+    + '##openrecon-probe ismrmrd-server\npresent\n'
+)
+
+
+class ProbeImageTests(unittest.TestCase):
+    def test_parses_uid_and_pytorch_cuda_after_shell_warning(self):
+        self.assertEqual(probe_image.parse_user_id(SHELL_WARNING + '0\n'), 0)
+        self.assertEqual(probe_image.parse_pytorch_cuda_version(SHELL_WARNING + '11.8\n'), '11.8')
+        self.assertIsNone(probe_image.parse_pytorch_cuda_version(SHELL_WARNING + 'None\n'))
+        with self.assertRaises(ValueError):
+            probe_image.parse_user_id(SHELL_WARNING)
+
+    def test_parses_every_probe_section(self):
+        self.assertEqual(
+            probe_image.parse_probe_output(PROBE_OUTPUT),
+            {
+                'uid': 0,
+                'username': 'root',
+                'nvcc_cuda_version': '11.8',
+                'torch_cuda_version': '11.8',
+                'python_interpreters': [
+                    {'path': '/opt/conda/bin/python3', 'version': '3.10.12'},
+                    {'path': '/usr/bin/python3', 'version': '3.8.10'},
+                ],
+                'ismrmrd_importable': True,
+                'ismrmrd_server_present': True,
+            },
+        )
+
+    def test_probe_script_runs_in_a_plain_shell(self):
+        result = subprocess.run(['sh', '-c', probe_image.PROBE_SCRIPT], capture_output=True, text=True)
+
+        probe = probe_image.parse_probe_output(result.stdout)
+        self.assertIsInstance(probe['uid'], int)
+        self.assertIn(probe['ismrmrd_server_present'], {True, False})
+
+    def test_probe_runs_one_container_and_is_cached_by_image_id_and_method(self):
+        completed = subprocess.CompletedProcess([], 0, stdout=PROBE_OUTPUT, stderr='')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with (
+                mock.patch.object(probe_image, 'resolve_image_id', return_value='sha256:abc'),
+                mock.patch.object(probe_image.subprocess, 'run', return_value=completed) as run_mock,
+                contextlib.redirect_stdout(io.StringIO()),
+            ):
+                first = probe_image.probe_image('base:test', cache_dir=tmpdir)
+                second = probe_image.probe_image('base:test', cache_dir=tmpdir)
+
+            self.assertTrue((pathlib.Path(tmpdir) / 'sha256_abc.container.json').is_file())
+
+            # A static probe of the same image does not reuse the container result.
+            with (
+                mock.patch.object(probe_image, 'resolve_image_id', return_value='sha256:abc'),
+                mock.patch.object(probe_image, 'inspect_image_statically', return_value={'uid': 0}) as inspect_mock,
+                contextlib.redirect_stdout(io.StringIO()),
+            ):
+                static = probe_image.probe_image('base:test', cache_dir=tmpdir, method='static')
+
+        run_mock.assert_called_once()
+        self.assertEqual(run_mock.call_args.args[0][:5], ['docker', 'run', '--rm', '--platform', 'linux/amd64'])
+        self.assertEqual(first, second)
+        self.assertEqual(second['image_id'], 'sha256:abc')
+        inspect_mock.assert_called_once()
+        self.assertEqual(static['method'], 'static')
+
+    def test_derives_probe_from_image_layers(self):
+        with mock.patch.object(probe_image.sys, 'path', [str(PROBE_IMAGE_PY.parent), *probe_image.sys.path]):
+            self.assertEqual(
+                probe_image.derive_static_probe(STATIC_INSPECTION),
+                {
+                    'uid': 0,
+                    'username': 'root',
+                    'nvcc_cuda_version': '11.8',
+                    'torch_cuda_version': '11.8',
+                    'python_interpreters': [{'path': '/opt/conda/bin/python3', 'version': '3.10'}],
+                    'ismrmrd_importable': True,
+                    'ismrmrd_server_present': False,
+                },
+            )
+            inspection = dict(STATIC_INSPECTION, config={'config': {'User': 'neuro'}})
+            self.assertEqual(probe_image.derive_static_probe(inspection)['uid'], 1000)
+            inspection = dict(STATIC_INSPECTION, config={'config': {'User': 'missing'}})
+            with self.assertRaises(ValueError):
+                probe_image.derive_static_probe(inspection)
+
+    def test_static_probe_falls_back_to_a_container(self):
+        completed = subprocess.CompletedProcess([], 0, stdout=PROBE_OUTPUT, stderr='')
+        with (
+            mock.patch.object(probe_image, 'resolve_image_id', return_value='sha256:abc'),
+            mock.patch.object(probe_image, 'inspect_image_statically', side_effect=ValueError('no nvcc version')),
+            mock.patch.object(probe_image.subprocess, 'run', return_value=completed) as run_mock,
+            contextlib.redirect_stdout(io.StringIO()),
+        ):
+            probe = probe_image.probe_image('base:test', method='static')
+
+        run_mock.assert_called_once()
+        self.assertEqual(probe['method'], 'container')
+        self.assertEqual(probe['nvcc_cuda_version'], '11.8')
+
+
+if __name__ == '__main__':
+    unittest.main()
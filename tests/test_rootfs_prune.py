@@ -0,0 +1,145 @@
+import importlib.util
+import io
+import pathlib
+import tarfile
+import unittest
+
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+ROOTFS_PRUNE_PY = REPO_ROOT / 'recipes' / 'rootfsPrune.py'
+SPEC = importlib.util.spec_from_file_location('rootfs_prune', ROOTFS_PRUNE_PY)
+rootfs_prune = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(rootfs_prune)
+
+
+def rootfs_tar_bytes(entries):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w', format=tarfile.PAX_FORMAT) as archive:
+        for name, kind, value in entries:
+            member = tarfile.TarInfo(name)
+            if kind == 'dir':
+                member.type = tarfile.DIRTYPE
+                archive.addfile(member)
+            elif kind == 'file':
+                member.size = len(value)
+                archive.addfile(member, io.BytesIO(value))
+            elif kind == 'hardlink':
+                member.type = tarfile.LNKTYPE
+                member.linkname = value
+                archive.addfile(member)
+    return buffer.getvalue()
+
+
+def prune(entries, rules):
+    target = io.BytesIO()
+    report = rootfs_prune.prune_rootfs_tar(io.BytesIO(rootfs_tar_bytes(entries)), target, rules)
+    with tarfile.open(fileobj=io.BytesIO(target.getvalue()), mode='r') as archive:
+        members = {
+            member.name: archive.extractfile(member).read() if member.isfile() else member.type
+            for member in archive
+        }
+    return report, members
+
+
+class RootfsPruneTests(unittest.TestCase):
+    def test_rejects_unknown_presets_and_relative_patterns(self):
+        self.assertEqual(
+            rootfs_prune.parse_prune_rules(['@docs', '# comment', '', '/opt/cache/*', '@docs']),
+            ['@docs', '/opt/cache/*'],
+        )
+        with self.assertRaisesRegex(ValueError, 'Valid presets: @conda-pkgs'):
+            rootfs_prune.parse_prune_rules(['@nope'])
+        with self.assertRaisesRegex(ValueError, 'absolute path glob'):
+            rootfs_prune.parse_prune_rules(['opt/cache'])
+
+    def test_prunes_directory_subtrees_and_reports_bytes_per_rule(self):
+        report, members = prune(
+            [
+                ('root/.cache/pip', 'dir', None),
+                ('root/.cache/pip/wheel.whl', 'file', b'w' * 100),
+                ('usr/share/doc/pkg/README', 'file', b'r' * 10),
+                ('opt/code/main.py', 'file', b'print(1)\n'),
+            ],
+            ['@pip-cache', '@docs'],
+        )
+
+        self.assertEqual(set(members), {'opt/code/main.py'})
+        self.assertEqual(report['rules']['@pip-cache'], {'members': 2, 'bytes': 100})
+        self.assertEqual(report['rules']['@docs'], {'members': 1, 'bytes': 10})
+        self.assertEqual(report['pruned_bytes'], 110)
+
+    def test_kept_hard_link_to_pruned_file_becomes_regular_file(self):
+        _, members = prune(
+            [
+                ('opt/conda/pkgs/numpy/lib.so', 'file', b'elf'),
+                ('opt/conda/pkgs/numpy/other.so', 'hardlink', 'opt/conda/pkgs/numpy/lib.so'),
+                ('opt/conda/lib/lib.so', 'hardlink', 'opt/conda/pkgs/numpy/lib.so'),
+                ('opt/conda/lib64/lib.so', 'hardlink', 'opt/conda/pkgs/numpy/lib.so'),
+            ],
+            ['@conda-pkgs'],
+        )
+
+        self.assertEqual(members['opt/conda/lib/lib.so'], b'elf')
+        self.assertEqual(members['opt/conda/lib64/lib.so'], tarfile.LNKTYPE)
+        self.assertNotIn('opt/conda/pkgs/numpy/other.so', members)
+
+        # The link to the second pruned file follows the relinking of the first.
+        _, members = prune(
+            [
+                ('drop/a', 'file', b'AAAA'),
+                ('drop/b', 'file', b'BBBB'),
+                ('keep/la', 'hardlink', 'drop/a'),
+                ('drop/c', 'file', b'CCCC'),
+                ('keep/lb', 'hardlink', 'drop/b'),
+            ],
+            ['/drop/*'],
+        )
+
+        self.assertEqual(members['keep/la'], b'AAAA')
+        self.assertEqual(members['keep/lb'], b'BBBB')
+
+    def test_stale_pycache_only_matches_other_interpreters(self):
+        self.assertTrue(rootfs_prune.is_stale_pycache('/opt/conda/lib/python3.11/site-packages/a/__pycache__/b.cpython-38.pyc'))
+        self.assertFalse(rootfs_prune.is_stale_pycache('/opt/conda/lib/python3.11/site-packages/a/__pycache__/b.cpython-311.pyc'))
+        self.assertFalse(rootfs_prune.is_stale_pycache('/opt/code/__pycache__/main.cpython-38.pyc'))
+
+    def test_docker_import_changes_restore_image_config(self):
+        args = rootfs_prune.create_docker_import_changes({
+            'Env': ['PATH=/usr/bin', 'PS1=$ '],
+            'Labels': {'com.siemens-healthineers.magneticresonance.openrecon.metadata': 'abc'},
+            'WorkingDir': '/opt/code',
+            'Cmd': ['/bin/bash', '-c', 'exec server'],
+        })
+
+        self.assertEqual(args[::2], ['--change'] * 5)
+        self.assertIn('ENV PATH="/usr/bin"', args)
+        self.assertIn('ENV PS1="\\$ "', args)
+        self.assertIn('LABEL "com.siemens-healthineers.magneticresonance.openrecon.metadata"="abc"', args)
+        self.assertIn('WORKDIR /opt/code', args)
+        self.assertIn('CMD ["/bin/bash", "-c", "exec server"]', args)
+
+    def test_import_changes_carry_volumes_healthcheck_and_stop_signal(self):
+        config = {
+            'Volumes': {'/data': {}, '/cache': {}},
+            'StopSignal': 'SIGINT',
+            'Healthcheck': {'Test': ['CMD-SHELL', 'nc -z localhost 9002'], 'Interval': 30_000_000_000, 'Retries': 3},
+            'Shell': ['/bin/bash', '-c'],
+            'StopTimeout': 20,
+            'Hostname': 'abc123',
+            'AttachStdout': False,
+        }
+
+        args = rootfs_prune.create_docker_import_changes(config)
+
+        self.assertIn('VOLUME ["/cache", "/data"]', args)
+        self.assertIn('STOPSIGNAL SIGINT', args)
+        self.assertIn('HEALTHCHECK --interval=30s --retries=3 CMD nc -z localhost 9002', args)
+        self.assertEqual(
+            rootfs_prune.create_healthcheck_change({'Test': ['CMD', 'true'], 'Timeout': 1_500_000_000}),
+            'HEALTHCHECK --timeout=1500ms CMD ["true"]',
+        )
+        self.assertEqual(rootfs_prune.get_dropped_import_config_keys(config), ['Shell', 'StopTimeout'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import importlib.util
+import io
+import pathlib
+import random
+import struct
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+ZIP_STREAM_PY = REPO_ROOT / 'recipes' / 'zipStream.py'
+SPEC = importlib.util.spec_from_file_location('zip_stream', ZIP_STREAM_PY)
+zip_stream = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(zip_stream)
+
+
+def sample_payload():
+    rng = random.Random(7)
+    text = b''.join(b'layer %d: %s\n' % (index, b'abc' * (index % 17)) for index in range(20000))
+    return text + rng.randbytes(200000) + text
+
+
+class ZipStreamTests(unittest.TestCase):
+    def test_parallel_deflate_chunks_form_one_stream(self):
+        payload = sample_payload()
+        deflater = zip_stream.ParallelDeflater(level=6, threads=3, chunk_bytes=64 * 1024)
+        compressed = b''.join(
+            deflater.compress(payload[offset:offset + 10000]) for offset in range(0, len(payload), 10000)
+        ) + deflater.flush()
+
+        self.assertEqual(zip_stream.zlib.decompress(compressed, -15), payload)
+        self.assertLess(len(compressed), len(payload) // 2)
+
+    def test_streamed_entry_and_appended_file_round_trip(self):
+        payload = sample_payload()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir = pathlib.Path(tmpdir)
+            zip_path = tmpdir / 'OpenRecon_test_V1.zip'
+            pdf_path = tmpdir / 'OpenRecon_test_V1.pdf'
+            pdf_path.write_bytes(b'%PDF-1.4\n')
+
+            with open(zip_path, 'wb') as output, zip_stream.StreamingZipWriter(output) as archive:
+                progress = []
+                entry = archive.write_stream(
+                    'OpenRecon_test_V1.tar',
+                    io.BytesIO(payload),
+                    threads=2,
+                    progress=lambda size, compressed_size: progress.append(size),
+                )
+            zip_stream.append_file_to_zip(zip_path, pdf_path)
+
+            self.assertEqual(entry.size, len(payload))
+            self.assertEqual(progress[-1], len(payload))
+            with zipfile.ZipFile(zip_path) as archive:
+                self.assertIsNone(archive.testzip())
+                self.assertEqual(archive.namelist(), ['OpenRecon_test_V1.tar', 'OpenRecon_test_V1.pdf'])
+                self.assertEqual(archive.read('OpenRecon_test_V1.tar'), payload)
+                self.assertEqual(archive.read('OpenRecon_test_V1.pdf'), b'%PDF-1.4\n')
+
+    def test_local_and_central_records_carry_the_same_zip64_extra(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir = pathlib.Path(tmpdir)
+            zip_path = tmpdir / 'OpenRecon_test_V1.zip'
+            pdf_path = tmpdir / 'OpenRecon_test_V1.pdf'
+            pdf_path.write_bytes(b'%PDF-1.4\n')
+            with open(zip_path, 'wb') as output, zip_stream.StreamingZipWriter(output) as archive:
+                archive.write_stream('OpenRecon_test_V1.tar', io.BytesIO(sample_payload()), threads=1)
+            zip_stream.append_file_to_zip(zip_path, pdf_path)
+
+            data = zip_path.read_bytes()
+            with zipfile.ZipFile(zip_path) as archive:
+                infos = archive.infolist()
+            for info in infos:
+                name_length, extra_length = struct.unpack_from('<HH', data, info.header_offset + 26)
+                local_extra_offset = info.header_offset + 30 + name_length
+                local_extra = data[local_extra_offset:local_extra_offset + extra_length]
+                self.assertEqual(local_extra[:2], b'\x01\x00', info.filename)
+                self.assertEqual(info.extra[:2], b'\x01\x00', info.filename)
+                self.assertEqual(struct.unpack_from('<QQ', local_extra, 4), struct.unpack_from('<QQ', info.extra, 4))
+
+    def test_writes_zip64_records_when_sizes_exceed_the_limit(self):
+        payload = b'x' * 5000
+        output = io.BytesIO()
+        with mock.patch.object(zip_stream, 'ZIP64_LIMIT', 1000):
+            with zip_stream.StreamingZipWriter(output) as archive:
+                archive.write_stream('big.tar', io.BytesIO(payload), compress=False)
+
+        data = output.getvalue()
+        self.assertIn(b'PK\x06\x06', data)
+        self.assertIn(b'PK\x06\x07', data)
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertEqual(archive.read('big.tar'), payload)
+
+    def test_benchmark_samples_files_directories_and_zip_entries(self):
+        payload = sample_payload()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir = pathlib.Path(tmpdir)
+            bundle_dir = tmpdir / 'FIRE_test'
+            (bundle_dir / 'Ice').mkdir(parents=True)
+            (bundle_dir / 'FIRE_test.img').write_bytes(payload)
+            (bundle_dir / 'Ice' / 'fire.ini').write_bytes(b'[FIRE]\n')
+            zip_path = tmpdir / 'OpenRecon_test.zip'
+            with open(zip_path, 'wb') as output, zip_stream.StreamingZipWriter(output) as archive:
+                archive.write_stream('OpenRecon_test.tar', io.BytesIO(payload))
+
+            for path in (bundle_dir, zip_path):
+                results = zip_stream.benchmark_compression(
+                    [str(path)], threads=2, sample_every=2, chunk_bytes=16 * 1024,
+                )
+                by_profile = {result['profile']: result for result in results}
+
+                self.assertEqual(list(by_profile), ['store', 'fast', 'default', 'max'])
+                self.assertEqual(by_profile['store']['ratio'], 1.0)
+                self.assertGreater(by_profile['fast']['ratio'], by_profile['max']['ratio'])
+                self.assertLess(results[0]['sample_bytes'], results[0]['total_bytes'])
+                self.assertGreaterEqual(results[0]['total_bytes'], len(payload))
+
+    def test_rejects_unknown_compression_profile(self):
+        with self.assertRaisesRegex(ValueError, 'Valid profiles: store, fast, default, max'):
+            zip_stream.get_compression_profile('ultra')
+
+
+if __name__ == '__main__':
+    unittest.main()